@@ -1,12 +1,28 @@
-import pygame
+import time
+_PROCESS_START = time.perf_counter()  # Reference for the cold-start measurement
+
+import argparse
 import random
 import sys
-import math
 import os
+import json
 from pacman_ai import PacmanAI
+from frame_profiler import FrameProfiler
+from governor import DepthGovernor
+from ghost_steering import GhostSteering
+
+# pygame, the window, the ghost images and the fonts are only set up on the
+# first render (init_display). Headless games (run_headless) never import pygame.
+pygame = None
+screen = None
+clock = None
+ghost_images = None
+sprite_atlas = None
+_fonts = {}
 
-# Initialize pygame
-pygame.init()
+# Game clock: the game time is counted in frames, whatever the real frame rate
+FPS = 30
+GAME_TIMEOUT_SECONDS = 600
 
 # Grid settings
 GRID_SIZE = 30
@@ -27,11 +43,6 @@ CYAN = (0, 255, 255)
 ORANGE = (255, 165, 0)
 BLUE_GHOST = (0, 0, 200)  # Color for frightened ghosts
 
-# Create the screen
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Pacman Grid Game")
-clock = pygame.time.Clock()
-
 # Game map (1 = wall, 0 = path with food, 2 = empty path, 3 = power pellet)
 game_map = [
     [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1],
@@ -65,6 +76,19 @@ GHOST_HOME_X_MAX = 11
 GHOST_HOME_Y_MIN = 8
 GHOST_HOME_Y_MAX = 10
 
+# Start cells and the cell in front of the ghost home door
+PACMAN_START = (9, 16)
+GHOST_STARTS = {
+    "BLINKY": (10, 9),
+    "PINKY": (8, 9),
+    "INKY": (10, 10),
+    "CLYDE": (8, 10)
+}
+HOME_EXIT = (9, 7)  # Home entrance + 1
+
+# Map as loaded, to put the food back on restart
+_initial_map = [row[:] for row in game_map]
+
 # Count total food and power pellets
 total_food = sum(row.count(0) for row in game_map) + sum(row.count(3) for row in game_map)
 
@@ -81,6 +105,49 @@ GHOST_CORNERS = {
     "CLYDE": (1, GRID_HEIGHT - 2)   # Bottom-left
 }
 
+# Ghost body colors (fallback sprites when the images are missing)
+GHOST_COLORS = {
+    "BLINKY": RED,
+    "PINKY": PINK,
+    "INKY": CYAN,
+    "CLYDE": ORANGE
+}
+
+# Directions that have their own sprite frames
+SPRITE_DIRECTIONS = ("UP", "DOWN", "LEFT", "RIGHT")
+
+# Ghost steering tables, built on first use (see ghost_steering.py)
+_ghost_steering = None
+
+def get_ghost_steering():
+    global _ghost_steering
+    if _ghost_steering is None:
+        _ghost_steering = GhostSteering(
+            game_map, (GHOST_HOME_X_MIN, GHOST_HOME_X_MAX, GHOST_HOME_Y_MIN, GHOST_HOME_Y_MAX))
+    return _ghost_steering
+
+def load_maze(maze):
+    """
+    Play on `maze` (a maze_gen.Maze) instead of the built-in map. Call it before
+    the first game and before the window opens (its size follows the maze).
+    """
+    global game_map, _initial_map, total_food, GRID_WIDTH, GRID_HEIGHT, WIDTH, HEIGHT
+    global GHOST_HOME_X_MIN, GHOST_HOME_X_MAX, GHOST_HOME_Y_MIN, GHOST_HOME_Y_MAX
+    global GHOST_CORNERS, PACMAN_START, GHOST_STARTS, HOME_EXIT, _ghost_steering
+    if screen is not None:
+        raise RuntimeError("load_maze() must be called before the display is opened")
+    game_map = [row[:] for row in maze.grid]
+    _initial_map = [row[:] for row in maze.grid]
+    total_food = count_remaining_food()
+    GRID_WIDTH, GRID_HEIGHT = maze.width, maze.height
+    WIDTH, HEIGHT = GRID_SIZE * GRID_WIDTH, GRID_SIZE * GRID_HEIGHT
+    GHOST_HOME_X_MIN, GHOST_HOME_X_MAX, GHOST_HOME_Y_MIN, GHOST_HOME_Y_MAX = maze.ghost_home
+    GHOST_CORNERS = dict(maze.ghost_corners)
+    PACMAN_START = maze.pacman_start
+    GHOST_STARTS = dict(maze.ghost_starts)
+    HOME_EXIT = maze.home_exit
+    _ghost_steering = None
+
 # Function to load ghost images
 def load_ghost_images():
     # Dictionary to store all ghost images
@@ -119,13 +186,29 @@ def load_ghost_images():
         # If any image fails to load, return None to use fallback rendering
         return None
 
-# Try to load ghost images
-ghost_images = load_ghost_images()
+def init_display():
+    """Import pygame, open the window and load the images. Does nothing after the first call."""
+    global pygame, screen, clock, ghost_images, sprite_atlas
+    if screen is not None:
+        return
+    import pygame
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Pacman Grid Game")
+    clock = pygame.time.Clock()
+    ghost_images = load_ghost_images()
+    sprite_atlas = build_sprite_atlas()
+
+def get_font(size, system=False):
+    """Font cache: fonts are built once instead of on every frame."""
+    key = (size, system)
+    if key not in _fonts:
+        _fonts[key] = pygame.font.SysFont(None, size) if system else pygame.font.Font(None, size)
+    return _fonts[key]
 
 class Pacman:
     def __init__(self):
-        self.grid_x = 9
-        self.grid_y = 16
+        self.grid_x, self.grid_y = PACMAN_START
         self.direction = None
         self.next_direction = None  # Store the next direction for smoother control
         self.score = 0
@@ -229,6 +312,18 @@ class Pacman:
                 
         return False  # No power pellet eaten
     
+    def frames_to_event(self):
+        """Frames until the next update() that does more than count (1 = this frame)."""
+        return max(1, self.speed - self.move_counter)
+    
+    def skip_frames(self, frames):
+        """Apply `frames` idle updates at once (fewer than frames_to_event())."""
+        self.move_counter += frames
+        self.mouth_change_timer += frames
+        if (self.mouth_change_timer // 10) % 2:
+            self.mouth_open = not self.mouth_open
+        self.mouth_change_timer %= 10
+    
     def move(self, direction):
         # Store the next direction if we're already moving
         if self.moving:
@@ -273,52 +368,13 @@ class Pacman:
         if game_map[next_y][next_x] != 1:
             self.moving = True
     
+    def sprite_key(self):
+        if not self.mouth_open:
+            return ("PACMAN", None, False)
+        return ("PACMAN", self.direction if self.direction in SPRITE_DIRECTIONS else None, True)
+    
     def draw(self):
-        x = self.grid_x * GRID_SIZE
-        y = self.grid_y * GRID_SIZE
-        
-        # Draw Pacman as a circle with a mouth
-        if self.mouth_open:
-            # Draw with mouth open based on direction
-            if self.direction == "RIGHT":
-                pygame.draw.circle(screen, YELLOW, (x + GRID_SIZE//2, y + GRID_SIZE//2), GRID_SIZE//2)
-                pygame.draw.polygon(screen, BLACK, [
-                    (x + GRID_SIZE//2, y + GRID_SIZE//2),
-                    (x + GRID_SIZE, y + GRID_SIZE//4),
-                    (x + GRID_SIZE, y + GRID_SIZE - GRID_SIZE//4)
-                ])
-            elif self.direction == "LEFT":
-                pygame.draw.circle(screen, YELLOW, (x + GRID_SIZE//2, y + GRID_SIZE//2), GRID_SIZE//2)
-                pygame.draw.polygon(screen, BLACK, [
-                    (x + GRID_SIZE//2, y + GRID_SIZE//2),
-                    (x, y + GRID_SIZE//4),
-                    (x, y + GRID_SIZE - GRID_SIZE//4)
-                ])
-            elif self.direction == "UP":
-                pygame.draw.circle(screen, YELLOW, (x + GRID_SIZE//2, y + GRID_SIZE//2), GRID_SIZE//2)
-                pygame.draw.polygon(screen, BLACK, [
-                    (x + GRID_SIZE//2, y + GRID_SIZE//2),
-                    (x + GRID_SIZE//4, y),
-                    (x + GRID_SIZE - GRID_SIZE//4, y)
-                ])
-            elif self.direction == "DOWN":
-                pygame.draw.circle(screen, YELLOW, (x + GRID_SIZE//2, y + GRID_SIZE//2), GRID_SIZE//2)
-                pygame.draw.polygon(screen, BLACK, [
-                    (x + GRID_SIZE//2, y + GRID_SIZE//2),
-                    (x + GRID_SIZE//4, y + GRID_SIZE),
-                    (x + GRID_SIZE - GRID_SIZE//4, y + GRID_SIZE)
-                ])
-            else:
-                # Default to right direction if no direction set
-                pygame.draw.circle(screen, YELLOW, (x + GRID_SIZE//2, y + GRID_SIZE//2), GRID_SIZE//2)
-                pygame.draw.polygon(screen, BLACK, [
-                    (x + GRID_SIZE//2, y + GRID_SIZE//2),
-                    (x + GRID_SIZE, y + GRID_SIZE//4),
-                    (x + GRID_SIZE, y + GRID_SIZE - GRID_SIZE//4)
-                ])
-        else:
-            # Draw as a full circle when mouth is closed
-            pygame.draw.circle(screen, YELLOW, (x + GRID_SIZE//2, y + GRID_SIZE//2), GRID_SIZE//2)
+        sprite_atlas.draw(screen, self.sprite_key(), (self.grid_x * GRID_SIZE, self.grid_y * GRID_SIZE))
 
 class Ghost:
     def __init__(self, grid_x, grid_y, color, name):
@@ -464,13 +520,39 @@ class Ghost:
         
         # Update draw priority based on position (for proper z-index)
         self.draw_priority = self.grid_y * 100 + self.grid_x
+    
+    def frames_to_event(self):
+        """
+        Frames until the next update() that does more than count: a move frame, or
+        the end of frightened mode (which makes the ghost slower). 1 = this frame.
+        """
+        frames = max(1, self.speed - self.move_counter)
+        if self.frightened and self.frightened_timer < frames:
+            frames = max(1, self.frightened_timer)
+        return frames
+    
+    def skip_frames(self, frames):
+        """Apply `frames` idle updates at once (fewer than frames_to_event())."""
+        self.move_counter += frames
+        if not self.frightened:
+            return
+        timer = self.frightened_timer
+        self.frightened_timer -= frames
+        # Flashing starts on the first frame that brings the timer to 30 or less
+        flashing_frames = frames if self.flashing else min(frames, max(0, frames - (timer - 31)))
+        if flashing_frames:
+            self.flashing = True
+            self.flash_timer += flashing_frames
+            if (self.flash_timer // 5) % 2:
+                self.flash_state = not self.flash_state
+            self.flash_timer %= 5
         
     def move_in_home(self):
         """Special movement logic for ghosts inside the home"""
         self.moving = True
         
         # Define the exit point
-        exit_x, exit_y = 9, 7  # Home entrance + 1
+        exit_x, exit_y = HOME_EXIT
         
         # Calculate the best direction to reach the exit
         if self.grid_x < exit_x:
@@ -536,16 +618,8 @@ class Ghost:
         
         # If eaten, head back to the ghost house
         if self.eaten:
-            # Define specific starting positions for each ghost
-            ghost_start_positions = {
-                "BLINKY": (10, 9),
-                "PINKY": (8, 9),
-                "INKY": (10, 10),
-                "CLYDE": (8, 10)
-            }
-        
             # Get this ghost's specific starting position
-            target_x, target_y = ghost_start_positions[self.name]
+            target_x, target_y = GHOST_STARTS[self.name]
             if self.grid_x == target_x and self.grid_y == target_y:
                 self.eaten = False
                 self.frightened = False
@@ -641,10 +715,10 @@ class Ghost:
                     self.target_x, self.target_y = pacman.grid_x, pacman.grid_y
             
             elif self.name == "CLYDE":  # Orange ghost - alternates between chase and scatter
-                # Calculate distance to Pacman
-                distance = math.sqrt((self.grid_x - pacman.grid_x)**2 + (self.grid_y - pacman.grid_y)**2)
+                # Calculate squared distance to Pacman
+                distance = (self.grid_x - pacman.grid_x)**2 + (self.grid_y - pacman.grid_y)**2
                 
-                if distance > 8:  # If far from Pacman, chase him
+                if distance > 8 * 8:  # If far from Pacman, chase him
                     self.target_x, self.target_y = pacman.grid_x, pacman.grid_y
                 else:  # If close to Pacman, go to scatter corner
                     self.target_x, self.target_y = GHOST_CORNERS["CLYDE"]
@@ -655,111 +729,19 @@ class Ghost:
 
     
     def choose_direction_to_target(self, target_x, target_y):
-        # Get valid directions (no walls)
-        valid_directions = self.get_valid_directions()
-        
-        # Remove the opposite direction to avoid reversing
-        opposite = self.get_opposite_direction()
-        if opposite in valid_directions and len(valid_directions) > 1:
-            valid_directions.remove(opposite)
-        
-        # If no valid directions, stay in place
-        if not valid_directions:
-            return
-        
-        # Find the direction that minimizes distance to target
-        best_direction = None
-        min_distance = float('inf')
-        
-        # Priority order for tie-breaking (Up > Left > Down > Right)
-        priority_order = ["UP", "LEFT", "DOWN", "RIGHT"]
-        
-        for direction in valid_directions:
-            next_x, next_y = self.grid_x, self.grid_y
-            
-            if direction == "UP":
-                next_y -= 1
-            elif direction == "DOWN":
-                next_y += 1
-            elif direction == "LEFT":
-                next_x -= 1
-            elif direction == "RIGHT":
-                next_x += 1
-                
-            # Wrap around the screen (tunnel)
-            if next_x < 0:
-                next_x = GRID_WIDTH - 1
-            elif next_x >= GRID_WIDTH:
-                next_x = 0
-            if next_y < 0:
-                next_y = GRID_HEIGHT - 1
-            elif next_y >= GRID_HEIGHT:
-                next_y = 0
-                
-            # NEW: Check if ghost is trying to enter the ghost home after leaving it
-            is_entering_ghost_home = (
-                GHOST_HOME_X_MIN <= next_x <= GHOST_HOME_X_MAX and
-                GHOST_HOME_Y_MIN <= next_y <= GHOST_HOME_Y_MAX
-            )
-            
-            # NEW: Skip this direction if it would enter the ghost home (unless eaten)
-            if self.left_ghost_home and is_entering_ghost_home and not self.eaten:
-                continue
-                
-            # Calculate Euclidean distance to target
-            distance = math.sqrt((next_x - target_x)**2 + (next_y - target_y)**2)
-            
-            # If this direction gives a shorter distance, or it's the same but higher priority
-            if distance < min_distance or (distance == min_distance and priority_order.index(direction) < priority_order.index(best_direction)):
-                min_distance = distance
-                best_direction = direction
+        # Closest non-reversing move to the target (squared distance, ties: Up > Left > Down > Right)
+        best_direction = get_ghost_steering().choose(
+            (self.grid_x, self.grid_y), self.direction,
+            self.left_ghost_home and not self.eaten, target_x, target_y)
         
         # If we found a valid direction, use it
         if best_direction:
             self.direction = best_direction
     
     def get_valid_directions(self):
-        valid_directions = []
-        
-        # Check each direction
-        directions = ["UP", "DOWN", "LEFT", "RIGHT"]
-        for direction in directions:
-            next_x, next_y = self.grid_x, self.grid_y
-            
-            if direction == "UP":
-                next_y -= 1
-            elif direction == "DOWN":
-                next_y += 1
-            elif direction == "LEFT":
-                next_x -= 1
-            elif direction == "RIGHT":
-                next_x += 1
-                
-            # Wrap around the screen (tunnel)
-            if next_x < 0:
-                next_x = GRID_WIDTH - 1
-            elif next_x >= GRID_WIDTH:
-                next_x = 0
-            if next_y < 0:
-                next_y = GRID_HEIGHT - 1
-            elif next_y >= GRID_HEIGHT:
-                next_y = 0
-                
-            # NEW: Check if ghost is trying to enter the ghost home after leaving it
-            is_entering_ghost_home = (
-                GHOST_HOME_X_MIN <= next_x <= GHOST_HOME_X_MAX and
-                GHOST_HOME_Y_MIN <= next_y <= GHOST_HOME_Y_MAX
-            )
-            
-            # NEW: Skip this direction if it would enter the ghost home (unless eaten)
-            if self.left_ghost_home and is_entering_ghost_home and not self.eaten:
-                continue
-                
-            # If the next position is not a wall, it's a valid direction
-            if game_map[next_y][next_x] != 1:
-                valid_directions.append(direction)
-        
-        return valid_directions
+        # Directions without a wall (nor the ghost home once left, unless eaten)
+        return get_ghost_steering().valid_directions(
+            (self.grid_x, self.grid_y), self.left_ghost_home and not self.eaten)
     
     def get_opposite_direction(self):
         if self.direction == "UP":
@@ -791,73 +773,146 @@ class Ghost:
         # Eaten ghosts move faster to return to the ghost house
         self.speed = 2
     
-    def draw(self):
-        x = self.grid_x * GRID_SIZE
-        y = self.grid_y * GRID_SIZE
-        
-        # Use images if available, otherwise fall back to shapes
-        if ghost_images:
-            # Choose the appropriate image based on ghost state
-            if self.eaten:
-                image = ghost_images["EATEN"]
-            elif self.frightened:
-                if self.flashing:
-                    image = ghost_images["FRIGHTENED_FLASH"] if self.flash_state else ghost_images["FRIGHTENED"]
-                else:
-                    image = ghost_images["FRIGHTENED"]
+    def sprite_key(self):
+        if self.eaten:
+            state = "EATEN"
+        elif self.frightened:
+            # The images and the fallback shapes flash in opposite phases
+            if ghost_images:
+                flash = self.flashing and self.flash_state
             else:
-                image = ghost_images[self.name]
-            
-            # Draw the image
-            screen.blit(image, (x, y))
+                flash = self.flashing and not self.flash_state
+            state = "FRIGHTENED_FLASH" if flash else "FRIGHTENED"
         else:
-            # Fallback to shape-based rendering if images aren't available
-            # Choose color based on state
-            color = self.color
-            if self.frightened:
-                if self.flashing:
-                    # Flash between blue and white
-                    color = BLUE_GHOST if self.flash_state else WHITE
-                else:
-                    color = BLUE_GHOST
-            elif self.eaten:
-                color = WHITE
-            
-            # Draw ghost body as a circle
-            pygame.draw.circle(screen, color, (x + GRID_SIZE//2, y + GRID_SIZE//2), GRID_SIZE//2)
-            
-            # If eaten, don't draw eyes
-            if self.eaten:
-                return
-            
-            # Draw eyes
-            eye_radius = GRID_SIZE // 6
-            left_eye_x = x + GRID_SIZE // 3
-            right_eye_x = x + 2 * GRID_SIZE // 3
-            eye_y = y + GRID_SIZE // 3
-            
-            pygame.draw.circle(screen, WHITE, (left_eye_x, eye_y), eye_radius)
-            pygame.draw.circle(screen, WHITE, (right_eye_x, eye_y), eye_radius)
+            state = self.name
+        # Only the fallback shapes of a normal ghost look where it is going
+        if ghost_images or state != self.name:
+            return ("GHOST", state, None)
+        return ("GHOST", state, self.direction if self.direction in SPRITE_DIRECTIONS else None)
+    
+    def draw(self):
+        sprite_atlas.draw(screen, self.sprite_key(), (self.grid_x * GRID_SIZE, self.grid_y * GRID_SIZE))
+
+def render_pacman(surface, x, y, direction, mouth_open):
+    """Draw one Pacman frame at pixel (x, y) (used to fill the sprite atlas)."""
+    # Draw Pacman as a circle with a mouth
+    if mouth_open:
+        # Draw with mouth open based on direction
+        if direction == "RIGHT":
+            pygame.draw.circle(surface, YELLOW, (x + GRID_SIZE//2, y + GRID_SIZE//2), GRID_SIZE//2)
+            pygame.draw.polygon(surface, BLACK, [
+                (x + GRID_SIZE//2, y + GRID_SIZE//2),
+                (x + GRID_SIZE, y + GRID_SIZE//4),
+                (x + GRID_SIZE, y + GRID_SIZE - GRID_SIZE//4)
+            ])
+        elif direction == "LEFT":
+            pygame.draw.circle(surface, YELLOW, (x + GRID_SIZE//2, y + GRID_SIZE//2), GRID_SIZE//2)
+            pygame.draw.polygon(surface, BLACK, [
+                (x + GRID_SIZE//2, y + GRID_SIZE//2),
+                (x, y + GRID_SIZE//4),
+                (x, y + GRID_SIZE - GRID_SIZE//4)
+            ])
+        elif direction == "UP":
+            pygame.draw.circle(surface, YELLOW, (x + GRID_SIZE//2, y + GRID_SIZE//2), GRID_SIZE//2)
+            pygame.draw.polygon(surface, BLACK, [
+                (x + GRID_SIZE//2, y + GRID_SIZE//2),
+                (x + GRID_SIZE//4, y),
+                (x + GRID_SIZE - GRID_SIZE//4, y)
+            ])
+        elif direction == "DOWN":
+            pygame.draw.circle(surface, YELLOW, (x + GRID_SIZE//2, y + GRID_SIZE//2), GRID_SIZE//2)
+            pygame.draw.polygon(surface, BLACK, [
+                (x + GRID_SIZE//2, y + GRID_SIZE//2),
+                (x + GRID_SIZE//4, y + GRID_SIZE),
+                (x + GRID_SIZE - GRID_SIZE//4, y + GRID_SIZE)
+            ])
+        else:
+            # Default to right direction if no direction set
+            pygame.draw.circle(surface, YELLOW, (x + GRID_SIZE//2, y + GRID_SIZE//2), GRID_SIZE//2)
+            pygame.draw.polygon(surface, BLACK, [
+                (x + GRID_SIZE//2, y + GRID_SIZE//2),
+                (x + GRID_SIZE, y + GRID_SIZE//4),
+                (x + GRID_SIZE, y + GRID_SIZE - GRID_SIZE//4)
+            ])
+    else:
+        # Draw as a full circle when mouth is closed
+        pygame.draw.circle(surface, YELLOW, (x + GRID_SIZE//2, y + GRID_SIZE//2), GRID_SIZE//2)
+
+def render_ghost(surface, x, y, color, eyes=True, pupils=True, direction=None):
+    """Draw one fallback ghost frame at pixel (x, y) (used when the images are missing)."""
+    # Draw ghost body as a circle
+    pygame.draw.circle(surface, color, (x + GRID_SIZE//2, y + GRID_SIZE//2), GRID_SIZE//2)
+    
+    # If eaten, don't draw eyes
+    if not eyes:
+        return
+    
+    # Draw eyes
+    eye_radius = GRID_SIZE // 6
+    left_eye_x = x + GRID_SIZE // 3
+    right_eye_x = x + 2 * GRID_SIZE // 3
+    eye_y = y + GRID_SIZE // 3
+    
+    pygame.draw.circle(surface, WHITE, (left_eye_x, eye_y), eye_radius)
+    pygame.draw.circle(surface, WHITE, (right_eye_x, eye_y), eye_radius)
+    
+    # Draw pupils based on direction (unless frightened)
+    if pupils:
+        pupil_radius = eye_radius // 2
+        left_pupil_x, right_pupil_x = left_eye_x, right_eye_x
+        pupil_y = eye_y
+        
+        if direction == "LEFT":
+            left_pupil_x -= pupil_radius
+            right_pupil_x -= pupil_radius
+        elif direction == "RIGHT":
+            left_pupil_x += pupil_radius
+            right_pupil_x += pupil_radius
+        elif direction == "UP":
+            pupil_y -= pupil_radius
+        elif direction == "DOWN":
+            pupil_y += pupil_radius
             
-            # Draw pupils based on direction (unless frightened)
-            if not self.frightened:
-                pupil_radius = eye_radius // 2
-                left_pupil_x, right_pupil_x = left_eye_x, right_eye_x
-                pupil_y = eye_y
-                
-                if self.direction == "LEFT":
-                    left_pupil_x -= pupil_radius
-                    right_pupil_x -= pupil_radius
-                elif self.direction == "RIGHT":
-                    left_pupil_x += pupil_radius
-                    right_pupil_x += pupil_radius
-                elif self.direction == "UP":
-                    pupil_y -= pupil_radius
-                elif self.direction == "DOWN":
-                    pupil_y += pupil_radius
-                    
-                pygame.draw.circle(screen, BLACK, (left_pupil_x, pupil_y), pupil_radius)
-                pygame.draw.circle(screen, BLACK, (right_pupil_x, pupil_y), pupil_radius)
+        pygame.draw.circle(surface, BLACK, (left_pupil_x, pupil_y), pupil_radius)
+        pygame.draw.circle(surface, BLACK, (right_pupil_x, pupil_y), pupil_radius)
+
+def build_sprite_atlas():
+    """
+    Pre-render every Pacman and ghost frame into one atlas converted to the
+    display format: each sprite is then drawn with a single blit.
+    """
+    from sprite_atlas import SpriteAtlas
+    
+    directions = SPRITE_DIRECTIONS + (None,)
+    frames = {}
+    for direction in directions:
+        frames[("PACMAN", direction, True)] = lambda surface, x, y, d=direction: render_pacman(surface, x, y, d, True)
+    frames[("PACMAN", None, False)] = lambda surface, x, y: render_pacman(surface, x, y, None, False)
+    
+    images = {}
+    if ghost_images:
+        # One frame per image, whatever the direction
+        for state, image in ghost_images.items():
+            images[("GHOST", state, None)] = image
+    else:
+        # Fallback shapes: body color per state, pupils per direction
+        for name, color in GHOST_COLORS.items():
+            for direction in directions:
+                frames[("GHOST", name, direction)] = \
+                    lambda surface, x, y, c=color, d=direction: render_ghost(surface, x, y, c, direction=d)
+        frames[("GHOST", "FRIGHTENED", None)] = \
+            lambda surface, x, y: render_ghost(surface, x, y, BLUE_GHOST, pupils=False)
+        frames[("GHOST", "FRIGHTENED_FLASH", None)] = \
+            lambda surface, x, y: render_ghost(surface, x, y, WHITE, pupils=False)
+        frames[("GHOST", "EATEN", None)] = \
+            lambda surface, x, y: render_ghost(surface, x, y, WHITE, eyes=False)
+    
+    atlas = SpriteAtlas(GRID_SIZE, list(frames) + list(images))
+    for key, render in frames.items():
+        render(atlas.surface, *atlas.origin(key))
+    for key, image in images.items():
+        atlas.put_image(key, image)
+    return atlas.finalize()
 
 def draw_map():
     for y in range(GRID_HEIGHT):
@@ -891,23 +946,15 @@ def check_collision(pacman, ghosts):
     return False
 
 def reset_positions(pacman, ghosts):
-    pacman.grid_x = 9
-    pacman.grid_y = 16
+    pacman.grid_x, pacman.grid_y = PACMAN_START
     pacman.direction = None
     pacman.moving = False
     pacman.move_counter = 0
     pacman.left_ghost_home = True  # Pacman starts outside the ghost home
     
     # Reset ghost positions
-    ghost_positions = [
-        (10, 9, RED, "BLINKY"),
-        (8, 9, PINK, "PINKY"),
-        (10, 10, CYAN, "INKY"),
-        (8, 10, ORANGE, "CLYDE")
-    ]
-    
-    for i, ghost in enumerate(ghosts):
-        ghost.grid_x, ghost.grid_y, _, _ = ghost_positions[i]
+    for ghost in ghosts:
+        ghost.grid_x, ghost.grid_y = GHOST_STARTS[ghost.name]
         ghost.direction = random.choice(["UP", "DOWN", "LEFT", "RIGHT"])
         ghost.moving = False
         ghost.frightened = False
@@ -925,7 +972,7 @@ def reset_positions(pacman, ghosts):
             ghost.speed = 6
 
 def draw_score(score, lives, remaining_food, ai):
-    font = pygame.font.SysFont(None, 24)
+    font = get_font(24, system=True)
     score_text = font.render(f"Score: {score}", True, WHITE)
     lives_text = font.render(f"Lives: {lives}", True, WHITE)
     food_text = font.render(f"Food: {remaining_food}", True, WHITE)
@@ -940,7 +987,7 @@ def draw_ai_mode(screen, ai):
     Affiche le mode actuel de l'IA en vert sur l'écran.
     """
     # Créer une police
-    font = pygame.font.Font(None, 24)
+    font = get_font(24)
     
     # Obtenir le mode actuel
     mode = ai.get_current_mode()
@@ -958,168 +1005,429 @@ def draw_ai_mode(screen, ai):
     pygame.draw.rect(screen, BLACK, background_rect)
     screen.blit(mode_text, text_rect)
 
-def main():
-    pacman = Pacman()
+def draw_profile_hud(screen, profiler):
+    """
+    Draw the rolling per-phase frame timings (ms) under the AI status.
+    """
+    if not profiler.enabled:
+        return
+    font = get_font(18)
+    y = 50
+    for line in profiler.hud_lines():
+        text = font.render(line, True, GREEN)
+        text_rect = text.get_rect(topleft=(10, y))
+        pygame.draw.rect(screen, BLACK, text_rect.inflate(4, 2))
+        screen.blit(text, text_rect)
+        y += 14
+
+# Mode timers
+MODE_DURATIONS = [
+    (SCATTER, 7 * 30),  # 7 seconds at 30 FPS
+    (CHASE, 20 * 30),   # 20 seconds at 30 FPS
+    (SCATTER, 7 * 30),
+    (CHASE, 20 * 30),
+    (SCATTER, 5 * 30),
+    (CHASE, 20 * 30),
+    (SCATTER, 5 * 30),
+    (CHASE, float('inf'))  # Permanent chase mode
+]
+
+def create_ghosts():
+    # Create ghosts with different colors and names
+    return [
+        Ghost(*GHOST_STARTS["BLINKY"], RED, "BLINKY"),
+        Ghost(*GHOST_STARTS["PINKY"], PINK, "PINKY"),
+        Ghost(*GHOST_STARTS["INKY"], CYAN, "INKY"),
+        Ghost(*GHOST_STARTS["CLYDE"], ORANGE, "CLYDE")
+    ]
+
+def count_remaining_food():
+    return sum(row.count(0) for row in game_map) + sum(row.count(3) for row in game_map)
+
+def restore_food():
+    # Reset the map (put the food and the power pellets back where they were)
+    for y in range(GRID_HEIGHT):
+        game_map[y][:] = _initial_map[y]
+
+def save_result(result_data, path="pacman_result.json"):
+    # ✍️ Écris dans un fichier JSON
+    results = []
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            try:
+                results = json.load(f)
+            except json.JSONDecodeError:
+                results = []
+
+    results.append(result_data)
+
+    with open(path, "w") as f:
+        json.dump(results, f, indent=4)
+
+class GameSession:
+    """
+    State and rules of one game, without any display or input handling.
+    main() drives it with the keyboard and renders every frame; run_headless()
+    only calls step().
+    """
+    def __init__(self, pacman_ai=None, governed=False):
+        # Initialiser l'IA de Pacman
+        self.pacman_ai = pacman_ai if pacman_ai is not None else PacmanAI(depth=3)
+        
+        # Adjust the search depth to keep the decision latency under the frame budget
+        # (governed=True: main() without a seed only; the depth then follows the
+        # wall-clock latency, so the game cannot be played again from its seed)
+        self.governor = DepthGovernor(self.pacman_ai) if governed else None
+        
+        # Replay of every played frame (replay.ReplayWriter, see record())
+        self.recorder = None
+        
+        # Activer/désactiver l'IA
+        self.use_ai = True
+        self.frames = 0
+        self.startup_ms = None  # Cold start to the end of the first step
+        self.reset()
+
+    def reset(self):
+        self.game_over = False
+        self.win = False
+        self.pacman = Pacman()
+        self.ghosts = create_ghosts()
+        self.mode_timer = 0
+        self.mode_index = 0
+        self.current_mode, self.mode_duration = MODE_DURATIONS[self.mode_index]
+        self.remaining_food = count_remaining_food()
+        
+        # Set initial ghost mode
+        for ghost in self.ghosts:
+            ghost.mode = self.current_mode
+
+    def restart(self):
+        """New game on the same map (R key)."""
+        self.reset()
+        self.frames = 0
+        restore_food()
+
+    @property
+    def over(self):
+        return self.game_over or self.win
+
+    @property
+    def game_seconds(self):
+        """Simulated game time: frames played at FPS, independent of the real speed."""
+        return self.frames / FPS
+
+    @property
+    def timed_out(self):
+        return self.frames >= GAME_TIMEOUT_SECONDS * FPS
+
+    def step(self, profiler):
+        """Advance the game by one frame."""
+        if not self.over:
+            self._update(profiler)
+        self.frames += 1
+        if self.startup_ms is None:
+            self.startup_ms = (time.perf_counter() - _PROCESS_START) * 1000.0
+
+    def frames_to_event(self):
+        """
+        Frames until the next one where something happens: an AI decision, a
+        Pacman or ghost move, the end of frightened mode or a mode change.
+        """
+        frames = min(actor.frames_to_event() for actor in [self.pacman, *self.ghosts])
+        if self.use_ai and not self.pacman.moving:
+            return 1
+        return min(frames, max(1, self.mode_duration - self.mode_timer))
+
+    def advance(self, profiler):
+        """
+        Jump to the next frame where something happens and play it. The frames in
+        between only count down timers: they are applied at once, so the game
+        plays out exactly as with step() but with far fewer update() calls.
+        """
+        if self.over:
+            self.step(profiler)
+            return
+        # Never skip past the timeout: the game must stop on its last frame
+        idle = min(self.frames_to_event() - 1, max(0, GAME_TIMEOUT_SECONDS * FPS - self.frames - 1))
+        if idle and self.recorder is not None:
+            # The replay keeps one record per frame: the idle frames are skipped
+            # one at a time, each written like a frame played by step()
+            for _ in range(idle):
+                self._skip_frames(1)
+                self.recorder.write(self)
+                self.frames += 1
+        elif idle:
+            self._skip_frames(idle)
+            self.frames += idle
+        if not self.over:
+            self._update(profiler, skip_idle=True)
+        self.frames += 1
+        if self.startup_ms is None:
+            self.startup_ms = (time.perf_counter() - _PROCESS_START) * 1000.0
+
+    def _skip_frames(self, frames):
+        """Count `frames` idle frames (fewer than frames_to_event()) on every timer."""
+        self.mode_timer += frames
+        self.pacman.skip_frames(frames)
+        for ghost in self.ghosts:
+            ghost.skip_frames(frames)
+
+    def _update(self, profiler, skip_idle=False):
+        """
+        Play one frame. With skip_idle, actors with nothing to do this frame only
+        count it (skip_frames) instead of running update().
+        """
+        pacman, ghosts = self.pacman, self.ghosts
+        decision_ms = None
+        
+        # Update mode timer
+        self.mode_timer += 1
+        if self.mode_timer >= self.mode_duration:
+            self.mode_timer = 0
+            self.mode_index = (self.mode_index + 1) % len(MODE_DURATIONS)
+            self.current_mode, self.mode_duration = MODE_DURATIONS[self.mode_index]
+            
+            # Update ghost modes
+            for ghost in ghosts:
+                if not ghost.frightened:  # Don't change mode if frightened
+                    ghost.mode = self.current_mode
+        
+        # AI control
+        if self.use_ai and not pacman.moving:
+            # Créer l'état du jeu pour l'IA
+            game_state = {
+                "pacman": pacman,
+                "ghosts": ghosts,
+                "game_map": game_map,
+                "ghost_home_coords": (GHOST_HOME_X_MIN, GHOST_HOME_X_MAX, GHOST_HOME_Y_MIN, GHOST_HOME_Y_MAX)
+            }
+            
+            # Obtenir le mouvement de l'IA
+            decision_start = time.perf_counter()
+            ai_move = self.pacman_ai.get_move(game_state)
+            decision_ms = (time.perf_counter() - decision_start) * 1000.0
+            if self.governor is not None:
+                self.governor.record(decision_ms, frame=self.frames)
+            profiler.annotate(decision_ms=round(decision_ms, 3), **self.pacman_ai.search_stats())
+            
+            # Appliquer le mouvement
+            if ai_move:
+                pacman.move(ai_move)
+        profiler.mark("get_move")
+        if self.governor is not None:
+            profiler.annotate(**self.governor.state())
+
+        # Update pacman
+        if skip_idle and pacman.frames_to_event() > 1:
+            pacman.skip_frames(1)
+            power_pellet_eaten = False
+        else:
+            power_pellet_eaten = pacman.update()
+        profiler.mark("pacman_update")
+        
+        # If a power pellet was eaten, set all ghosts to frightened mode
+        if power_pellet_eaten:
+            for ghost in ghosts:
+                if not ghost.eaten:  # Don't frighten ghosts that are already eaten
+                    ghost.set_frightened(150)  # 5 seconds at 30 FPS
+        
+        # Update ghosts
+        for ghost in ghosts:
+            if skip_idle and ghost.frames_to_event() > 1:
+                ghost.skip_frames(1)
+            else:
+                ghost.update(pacman, ghosts)
+        profiler.mark("ghost_update")
+        
+        # Check for collision with ghosts
+        if check_collision(pacman, ghosts):
+            pacman.lives -= 1
+            if pacman.lives <= 0:
+                self.game_over = True
+            else:
+                reset_positions(pacman, ghosts)
+        
+        # Check if all food is eaten
+        self.remaining_food = count_remaining_food()
+        if self.remaining_food == 0:
+            self.win = True
+        profiler.mark("collision")
+        
+        if self.recorder is not None:
+            self.recorder.write(self, decision_ms)
+
+    def replay_config(self):
+        """Engine configuration stored in the header of replay files."""
+        ai = self.pacman_ai
+        return {
+            "fps": FPS,
+            "grid": [GRID_WIDTH, GRID_HEIGHT],
+            "ghost_home": [GHOST_HOME_X_MIN, GHOST_HOME_X_MAX, GHOST_HOME_Y_MIN, GHOST_HOME_Y_MAX],
+            "ghosts": [ghost.name for ghost in self.ghosts],
+            "mode_durations": MODE_DURATIONS,
+            "timeout_seconds": GAME_TIMEOUT_SECONDS,
+            "ai": {
+                "depth": ai.depth,
+                "governed": self.governor is not None,
+                "timeline": ai.timeline,
+                "ghost_fidelity": ai.ghost_fidelity,
+                "astar_heuristic": ai.astar_heuristic,
+            },
+        }
+
+    def record(self, path, seed=None, **config):
+        """Record the game from now on into the replay file at `path` (extra config in the header)."""
+        from compiled_map import map_key
+        from replay import ReplayWriter
+        
+        self.recorder = ReplayWriter(path, len(self.ghosts), map_key(game_map), seed=seed,
+                                     config={**self.replay_config(), **config})
+        return self.recorder
+
+    def close(self):
+        """Finish the replay file, if any."""
+        if self.recorder is not None:
+            self.recorder.close()
+
+    def result(self, timeout):
+        # ⏱️ Temps de jeu simulé (comparable quelle que soit la vitesse)
+        game_duration_sec = self.game_seconds
     
-    # Initialiser l'IA de Pacman
-    pacman_ai = PacmanAI(depth=3)
+        # 📄 Prépare les données
+        result_data = {
+            "score": self.pacman.score,
+            "lives": self.pacman.lives,
+            "time": round(game_duration_sec, 2),
+            "result": "win" if self.win else "lose",
+            "time out": "true" if timeout else "false"
+        }
+        # Partie gouvernée: réglage final et journal des changements de profondeur
+        if self.governor is not None:
+            result_data["governor"] = self.governor.report()
+        return result_data
+
+def _report_startup(session, profiler):
+    """
+    Cold start to the end of the first step: a column of the profiler trace and,
+    when profiling, a line on stderr (stdout carries the game result).
+    """
+    profiler.annotate(startup_ms=round(session.startup_ms, 1))
+    if profiler.enabled:
+        print(f"Cold start to first step: {session.startup_ms:.1f} ms", file=sys.stderr)
+
+def run_headless(replay=None, seed=None, **replay_config):
+    """
+    Play one AI game without pygame: no window, no images, no fonts. The result
+    is appended to pacman_result.json like a windowed game. Nothing is drawn, so
+    the game jumps from event to event (GameSession.advance) instead of playing
+    every frame. The search depth is fixed (no DepthGovernor): the same seed
+    plays the same game.
     
-    # Activer/désactiver l'IA
-    use_ai = True
+    Args:
+        replay: Replay file to record the game into (see replay.py), None for none
+        seed: Random seed of the game, stored in the replay header
+        replay_config: Extra configuration stored in the replay header
+    """
+    session = GameSession()
+    if replay:
+        session.record(replay, seed=seed, **replay_config)
+    profiler = FrameProfiler()
     
-    # Create ghosts with different colors and names
-    ghosts = [
-        Ghost(10, 9, RED, "BLINKY"),
-        Ghost(8, 9, PINK, "PINKY"),
-        Ghost(10, 10, CYAN, "INKY"),
-        Ghost(8, 10, ORANGE, "CLYDE")
-    ]
+    while True:
+        profiler.begin()
+        first_step = session.startup_ms is None
+        session.advance(profiler)
+        if first_step:
+            _report_startup(session, profiler)
+        profiler.end()
+        
+        timeout = session.timed_out
+        if timeout or session.over:
+            result_data = session.result(timeout)
+            save_result(result_data)
+            session.close()
+            profiler.dump()
+            return result_data
+
+def main(speed=1.0, render_stride=1, replay=None, seed=None, **replay_config):
+    """
+    Windowed game.
     
-    game_over = False
-    win = False
+    Args:
+        speed: Game speed multiplier (0 = as fast as possible)
+        render_stride: Frames simulated per rendered frame
+        replay, seed, replay_config: Replay recording, as for run_headless()
+    """
+    init_display()
+    # Seeded games keep a fixed depth so they can be played again
+    session = GameSession(governed=seed is None)
+    if replay:
+        session.record(replay, seed=seed, **replay_config)
+    
+    # render_stride frames per loop, paced so the game runs `speed` times faster than FPS
+    render_fps = FPS * speed / render_stride
     
     # Game instructions
-    font = pygame.font.SysFont(None, 24)
+    font = get_font(24, system=True)
     instructions = font.render("Press arrow keys to move / A to toggle AI", True, WHITE)
     
-    # Mode timers
-    mode_timer = 0
-    mode_durations = [
-        (SCATTER, 7 * 30),  # 7 seconds at 30 FPS
-        (CHASE, 20 * 30),   # 20 seconds at 30 FPS
-        (SCATTER, 7 * 30),
-        (CHASE, 20 * 30),
-        (SCATTER, 5 * 30),
-        (CHASE, 20 * 30),
-        (SCATTER, 5 * 30),
-        (CHASE, float('inf'))  # Permanent chase mode
-    ]
-    mode_index = 0
-    current_mode, mode_duration = mode_durations[mode_index]
-    
-    # Set initial ghost mode
-    for ghost in ghosts:
-        ghost.mode = current_mode
+    # Frame phase timings (PACMAN_PROFILE env var or P key)
+    profiler = FrameProfiler()
     
     while True:
+        profiler.begin()
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                session.close()
+                profiler.dump()
                 pygame.quit()
                 sys.exit()
             
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_q:
+                    session.close()
+                    profiler.dump()
                     pygame.quit()
                     sys.exit()
-                if not game_over and not win:
+                if event.key == pygame.K_p:
+                    profiler.toggle()
+                if not session.over:
                     if event.key == pygame.K_a:
                         # Toggle AI
-                        use_ai = not use_ai
-                        instructions = font.render(f"{'AI active' if use_ai else 'Manual control'} / A to toggle", True, WHITE)
+                        session.use_ai = not session.use_ai
+                        instructions = font.render(f"{'AI active' if session.use_ai else 'Manual control'} / A to toggle", True, WHITE)
                     
                     # Manual control when AI is off
-                    if not use_ai:
+                    if not session.use_ai:
                         if event.key == pygame.K_UP:
-                            pacman.move("UP")
+                            session.pacman.move("UP")
                         elif event.key == pygame.K_DOWN:
-                            pacman.move("DOWN")
+                            session.pacman.move("DOWN")
                         elif event.key == pygame.K_LEFT:
-                            pacman.move("LEFT")
+                            session.pacman.move("LEFT")
                         elif event.key == pygame.K_RIGHT:
-                            pacman.move("RIGHT")
+                            session.pacman.move("RIGHT")
                 
-                if event.key == pygame.K_r and (game_over or win):
+                if event.key == pygame.K_r and session.over:
                     # Reset the game
-                    game_over = False
-                    win = False
-                    pacman = Pacman()
-                    ghosts = [
-                        Ghost(10, 9, RED, "BLINKY"),
-                        Ghost(8, 9, PINK, "PINKY"),
-                        Ghost(10, 10, CYAN, "INKY"),
-                        Ghost(8, 10, ORANGE, "CLYDE")
-                    ]
-                    # Reset the map (put food back)
-                    for y in range(GRID_HEIGHT):
-                        for x in range(GRID_WIDTH):
-                            if game_map[y][x] == 2:
-                                # Check if it was a power pellet position
-                                if (x == 3 and y == 3) or (x == 15 and y == 3) or \
-                                   (x == 3 and y == 16) or (x == 15 and y == 16):
-                                    game_map[y][x] = 3
-                                else:
-                                    game_map[y][x] = 0
-                    
-                    # Reset mode timers
-                    mode_timer = 0
-                    mode_index = 0
-                    current_mode, mode_duration = mode_durations[mode_index]
-                    for ghost in ghosts:
-                        ghost.mode = current_mode
+                    session.restart()
         
         screen.fill(BLACK)
+        profiler.mark("events")
         
-        if not game_over and not win:
-            # Update mode timer
-            mode_timer += 1
-            if mode_timer >= mode_duration:
-                mode_timer = 0
-                mode_index = (mode_index + 1) % len(mode_durations)
-                current_mode, mode_duration = mode_durations[mode_index]
-                
-                # Update ghost modes
-                for ghost in ghosts:
-                    if not ghost.frightened:  # Don't change mode if frightened
-                        ghost.mode = current_mode
-                
-            
-            # AI control
-            if use_ai and not pacman.moving:
-                # Créer l'état du jeu pour l'IA
-                game_state = {
-                    "pacman": pacman,
-                    "ghosts": ghosts,
-                    "game_map": game_map,
-                    "ghost_home_coords": (GHOST_HOME_X_MIN, GHOST_HOME_X_MAX, GHOST_HOME_Y_MIN, GHOST_HOME_Y_MAX)
-                }
-                
-                # Obtenir le mouvement de l'IA
-                ai_move = pacman_ai.get_move(game_state)
-                
-                # Appliquer le mouvement
-                if ai_move:
-                    pacman.move(ai_move)
-            # Dessiner le mode de l'IA (après avoir dessiné le jeu mais avant pygame.display.flip())
-
-
-            # Update pacman
-            power_pellet_eaten = pacman.update()
-            
-            # If a power pellet was eaten, set all ghosts to frightened mode
-            if power_pellet_eaten:
-                for ghost in ghosts:
-                    if not ghost.eaten:  # Don't frighten ghosts that are already eaten
-                        ghost.set_frightened(150)  # 5 seconds at 30 FPS
-            
-            # Update ghosts
-            for ghost in ghosts:
-                ghost.update(pacman, ghosts)
-            
-            # Check for collision with ghosts
-            if check_collision(pacman, ghosts):
-                pacman.lives -= 1
-                if pacman.lives <= 0:
-                    game_over = True
-                else:
-                    reset_positions(pacman, ghosts)
-            
-            # Check if all food is eaten
-            remaining_food = sum(row.count(0) for row in game_map) + sum(row.count(3) for row in game_map)
-            if remaining_food == 0:
-                win = True
+        for _ in range(render_stride):
+            first_step = session.startup_ms is None
+            session.step(profiler)
+            if first_step:
+                _report_startup(session, profiler)
+            if session.over or session.timed_out:
+                break
+        pacman, ghosts = session.pacman, session.ghosts
         
         # Draw everything
         draw_map()
+        profiler.mark("draw_map")
         pacman.draw()
         
         # Sort ghosts by draw priority (y-position) to fix superposition issue
@@ -1128,103 +1436,77 @@ def main():
             ghost.draw()
         
         # Draw score and lives
-        remaining_food = sum(row.count(0) for row in game_map) + sum(row.count(3) for row in game_map)
-        draw_score(pacman.score, pacman.lives, remaining_food, pacman_ai)
+        draw_score(pacman.score, pacman.lives, count_remaining_food(), session.pacman_ai)
         
         # Draw instructions
         screen.blit(instructions, (WIDTH//2 - instructions.get_width()//2, HEIGHT - 30))
         
         # Draw AI status
-        ai_status = font.render(f"AI: {'ON' if use_ai else 'OFF'}", True, WHITE)
+        ai_status = font.render(f"AI: {'ON' if session.use_ai else 'OFF'}", True, WHITE)
         screen.blit(ai_status, (10, 30))
+        draw_profile_hud(screen, profiler)
         
         # Draw game over or win message
-        if game_over:
-            font = pygame.font.SysFont(None, 72)
-            game_over_text = font.render("GAME OVER", True, RED)
+        if session.game_over:
+            game_over_text = get_font(72, system=True).render("GAME OVER", True, RED)
             screen.blit(game_over_text, (WIDTH//2 - game_over_text.get_width()//2, HEIGHT//2 - 36))
             
-            font = pygame.font.SysFont(None, 36)
-            restart_text = font.render("Press R to restart", True, WHITE)
+            restart_text = get_font(36, system=True).render("Press R to restart", True, WHITE)
             screen.blit(restart_text, (WIDTH//2 - restart_text.get_width()//2, HEIGHT//2 + 36))
         
-        if win:
-            font = pygame.font.SysFont(None, 72)
-            win_text = font.render("YOU WIN!", True, YELLOW)
+        if session.win:
+            win_text = get_font(72, system=True).render("YOU WIN!", True, YELLOW)
             screen.blit(win_text, (WIDTH//2 - win_text.get_width()//2, HEIGHT//2 - 36))
             
-            font = pygame.font.SysFont(None, 36)
-            restart_text = font.render("Press R to restart", True, WHITE)
+            restart_text = get_font(36, system=True).render("Press R to restart", True, WHITE)
             screen.blit(restart_text, (WIDTH//2 - restart_text.get_width()//2, HEIGHT//2 + 36))
             
-        if pygame.time.get_ticks()/1000==600:
-            # ⏱️ Calcule le temps écoulé
-            time_ms = pygame.time.get_ticks()
-            game_duration_sec = time_ms / 1000
-        
-            # 📄 Prépare les données
-            result_data = {
-                "score": pacman.score,
-                "lives": pacman.lives,
-                "time": round(game_duration_sec, 2),
-                "result": "win" if win else "lose",
-                "time out": "true"
-            }
-        
-            # ✍️ Écris dans un fichier JSON
-            import os
-            import json
-
-            results = []
-            if os.path.exists("pacman_result.json"):
-                with open("pacman_result.json", "r") as f:
-                    try:
-                        results = json.load(f)
-                    except json.JSONDecodeError:
-                        results = []
-
-            results.append(result_data)
-
-            with open("pacman_result.json", "w") as f:
-                json.dump(results, f, indent=4)
+        if session.timed_out and not session.over:
+            save_result(session.result(timeout=True))
+            session.close()
+            profiler.dump()
             pygame.quit()
             sys.exit()
-        if game_over or win:
-            # ⏱️ Calcule le temps écoulé
-            time_ms = pygame.time.get_ticks()
-            game_duration_sec = time_ms / 1000
-        
-            # 📄 Prépare les données
-            result_data = {
-                "score": pacman.score,
-                "lives": pacman.lives,
-                "time": round(game_duration_sec, 2),
-                "result": "win" if win else "lose",
-                "time out": "false"
-            }
-        
-            # ✍️ Écris dans un fichier JSON
-            import json
-            import os
-            import json
-
-            results = []
-            if os.path.exists("pacman_result.json"):
-                with open("pacman_result.json", "r") as f:
-                    try:
-                        results = json.load(f)
-                    except json.JSONDecodeError:
-                        results = []
-
-            results.append(result_data)
-
-            with open("pacman_result.json", "w") as f:
-                json.dump(results, f, indent=4)
-            if game_over or win:
-                pygame.quit()
-                sys.exit()
+        if session.over:
+            save_result(session.result(timeout=False))
+            profiler.mark("sprites")
+            profiler.end()
+            session.close()
+            profiler.dump()
+            pygame.quit()
+            sys.exit()
+        profiler.mark("sprites")
         pygame.display.flip()
-        clock.tick(30)
+        profiler.mark("flip")
+        if render_fps:
+            clock.tick(render_fps)
+        profiler.mark("idle")
+        profiler.end()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Pacman")
+    parser.add_argument("--headless", action="store_true",
+                        default=bool(os.environ.get("PACMAN_HEADLESS")),
+                        help="play one AI game without a window (also PACMAN_HEADLESS=1)")
+    parser.add_argument("--seed", type=int, default=None, help="random seed")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="game speed multiplier, 0 for as fast as possible (default: 1)")
+    parser.add_argument("--render-stride", type=int, default=None,
+                        help="render one frame out of N (default: the speed, or 30 at speed 0)")
+    parser.add_argument("--maze", default=None, metavar="WIDTHxHEIGHT",
+                        help="play on a generated maze of this size (see maze_gen.py)")
+    parser.add_argument("--maze-seed", type=int, default=None, help="seed of the generated maze")
+    parser.add_argument("--replay", default=None, metavar="PATH",
+                        help="record every played frame into a binary replay file (see replay.py)")
+    args = parser.parse_args()
+    if args.seed is not None:
+        random.seed(args.seed)
+    if args.maze:
+        from maze_gen import generate_maze, parse_size
+        load_maze(generate_maze(*parse_size(args.maze), seed=args.maze_seed))
+    replay = {"replay": args.replay, "seed": args.seed, "maze": args.maze, "maze_seed": args.maze_seed}
+    if args.headless:
+        print(run_headless(**replay))
+    else:
+        stride = args.render_stride or (max(1, round(args.speed)) if args.speed else FPS)
+        main(speed=args.speed, render_stride=max(1, stride), **replay)
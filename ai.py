@@ -1,8 +1,9 @@
 import math
-import random
 from collections import deque
 from global_names import *
 from tools import *
+from compiled_map import compile_map
+from distance_field import PelletField
 
 # Increase depth for better lookahead
 DEPTH = 4
@@ -12,27 +13,35 @@ VECT = {RIGHT: (1, 0), LEFT: (-1, 0), DOWN: (0, 1), UP: (0, -1)}
 # Simple global variables for tracking visited positions
 # This is a simplified approach that's easier to debug
 visited_positions = {}  # Dictionary to track visited positions
-last_positions = []     # List to track recent positions
-MAX_RECENT = 10         # Maximum number of recent positions to track
+MAX_RECENT = 10         # Maximum number of recent states to track
 
-# Cache level information for performance
-_level_cache = {}
+# Repetition detection in the search: a Pac-Man node whose state (position,
+# pellets left) is already on the current path or among the recent real states
+# is not expanded and scores its evaluation minus REPETITION_PENALTY. Along a
+# path and over recent history the pellet sets only shrink, so the pellet
+# counts identify them.
+REPETITION_PENALTY = 200
+recent_states = deque(maxlen=MAX_RECENT)  # Ring buffer of the real states before the current one
+_repetitions = {}  # State key -> occurrences (recent states + current path)
+
+# Nearest-pellet distance fields, kept in sync with the real game in next_move
+_pellet_fields = {}
 
 def _level_info(level):
-    lid = id(level)
-    if lid in _level_cache:
-        return _level_cache[lid]
-    width = len(level[0].rstrip('\n'))
-    walls = {(x, y)
-             for y, row in enumerate(level)
-             for x, ch in enumerate(row)
-             if ch not in ('.', ' ', '0')}
-    _level_cache[lid] = (width, walls)
-    return width, walls
+    """Compiled data for `level`, shared across games through compiled_map's cache."""
+    return compile_map(level)
 
-def _legal_moves(pos, walls, width):
-    x, y = pos
-    return [k for k in DIRS if ((x + VECT[k][0]) % width, y + VECT[k][1]) not in walls] or [None]
+def _key_moves(level_map):
+    """Legal-move table in key constants, in DIRS order."""
+    return {cell: [k for k in DIRS if _advance(cell, k, level_map.width) not in level_map.walls] or [None]
+            for cell in level_map.cells}
+
+def _legal_moves(pos, level_map):
+    moves = level_map.table("ai_moves", _key_moves).get(pos)
+    if moves is None:
+        x, y = pos
+        return [k for k in DIRS if ((x + VECT[k][0]) % level_map.width, y + VECT[k][1]) not in level_map.walls] or [None]
+    return list(moves)
 
 def _manhattan_distance(a, b, width):
     """Calculate Manhattan distance with tunnel consideration"""
@@ -40,6 +49,23 @@ def _manhattan_distance(a, b, width):
     dy = abs(a[1] - b[1])
     return dx + dy
 
+def _sync_pellet_fields(level_map, foods, energizers):
+    for kind, pellets in (('food', foods), ('energizer', energizers)):
+        field = _pellet_fields.get(kind)
+        if field is None or field.map is not level_map:
+            _pellet_fields[kind] = PelletField(level_map, pellets)
+        else:
+            field.sync(pellets)
+
+def _nearest_pellet_distance(kind, pos, pellets, width):
+    """Maze distance to the nearest remaining pellet, looked up in the distance field"""
+    field = _pellet_fields.get(kind)
+    if field is not None:
+        dist, _ = field.nearest_in(pos, pellets)
+        if dist is not None:
+            return dist
+    return min(_manhattan_distance(p, pos, width) for p in pellets)
+
 def _advance(pos, key, width):
     if key is None:
         return pos
@@ -48,8 +74,8 @@ def _advance(pos, key, width):
     return ((x + dx) % width, y + dy)
 
 # Ghost movement prediction
-def next_ghost_move(ghost_pos, target_pos, walls, width, forbidden_dir=None):
-    moves = _legal_moves(ghost_pos, walls, width)
+def next_ghost_move(ghost_pos, target_pos, level_map, width, forbidden_dir=None):
+    moves = _legal_moves(ghost_pos, level_map)
     
     if forbidden_dir and forbidden_dir in moves and len(moves) > 1:
         moves.remove(forbidden_dir)
@@ -66,14 +92,14 @@ def next_ghost_move(ghost_pos, target_pos, walls, width, forbidden_dir=None):
     
     return best_move
 
-def blinky_move(ghost_pos, ghost_state, pacman_pos, walls, width, last_dir=None):
+def blinky_move(ghost_pos, ghost_state, pacman_pos, level_map, width, last_dir=None):
     if ghost_state[1]:  # If frightened
-        return next_ghost_move(ghost_pos, (26, -3), walls, width, forbidden_dir=opposite_keys.get(last_dir))
-    return next_ghost_move(ghost_pos, pacman_pos, walls, width, forbidden_dir=opposite_keys.get(last_dir))
+        return next_ghost_move(ghost_pos, (26, -3), level_map, width, forbidden_dir=opposite_keys.get(last_dir))
+    return next_ghost_move(ghost_pos, pacman_pos, level_map, width, forbidden_dir=opposite_keys.get(last_dir))
 
-def pinky_move(ghost_pos, ghost_state, pacman_pos, pacman_dir, walls, width, last_dir=None):
+def pinky_move(ghost_pos, ghost_state, pacman_pos, pacman_dir, level_map, width, last_dir=None):
     if ghost_state[1]:  # If frightened
-        return next_ghost_move(ghost_pos, (2, -3), walls, width, forbidden_dir=opposite_keys.get(last_dir))
+        return next_ghost_move(ghost_pos, (2, -3), level_map, width, forbidden_dir=opposite_keys.get(last_dir))
     
     px, py = pacman_pos
     if pacman_dir == UP:
@@ -85,11 +111,11 @@ def pinky_move(ghost_pos, ghost_state, pacman_pos, pacman_dir, walls, width, las
     else:  # RIGHT
         target = (px + 4, py)
     
-    return next_ghost_move(ghost_pos, target, walls, width, forbidden_dir=opposite_keys.get(last_dir))
+    return next_ghost_move(ghost_pos, target, level_map, width, forbidden_dir=opposite_keys.get(last_dir))
 
-def inky_move(ghost_pos, ghost_state, pacman_pos, pacman_dir, blinky_pos, walls, width, last_dir=None):
+def inky_move(ghost_pos, ghost_state, pacman_pos, pacman_dir, blinky_pos, level_map, width, last_dir=None):
     if ghost_state[1]:  # If frightened
-        return next_ghost_move(ghost_pos, (27, 34), walls, width, forbidden_dir=opposite_keys.get(last_dir))
+        return next_ghost_move(ghost_pos, (27, 34), level_map, width, forbidden_dir=opposite_keys.get(last_dir))
     
     px, py = pacman_pos
     if pacman_dir == UP:
@@ -106,11 +132,11 @@ def inky_move(ghost_pos, ghost_state, pacman_pos, pacman_dir, blinky_pos, walls,
     vy = tile[1] - blinky_pos[1]
     target = (blinky_pos[0] + 2 * vx, blinky_pos[1] + 2 * vy)
     
-    return next_ghost_move(ghost_pos, target, walls, width, forbidden_dir=opposite_keys.get(last_dir))
+    return next_ghost_move(ghost_pos, target, level_map, width, forbidden_dir=opposite_keys.get(last_dir))
 
-def clyde_move(ghost_pos, ghost_state, pacman_pos, walls, width, last_dir=None):
+def clyde_move(ghost_pos, ghost_state, pacman_pos, level_map, width, last_dir=None):
     if ghost_state[1]:  # If frightened
-        return next_ghost_move(ghost_pos, (0, 34), walls, width, forbidden_dir=opposite_keys.get(last_dir))
+        return next_ghost_move(ghost_pos, (0, 34), level_map, width, forbidden_dir=opposite_keys.get(last_dir))
     
     dist = _manhattan_distance(ghost_pos, pacman_pos, width)
     if dist >= 8:
@@ -118,7 +144,7 @@ def clyde_move(ghost_pos, ghost_state, pacman_pos, walls, width, last_dir=None):
     else:
         target = (0, 34)  # Scatter target
     
-    return next_ghost_move(ghost_pos, target, walls, width, forbidden_dir=opposite_keys.get(last_dir))
+    return next_ghost_move(ghost_pos, target, level_map, width, forbidden_dir=opposite_keys.get(last_dir))
 
 # Collision detection
 def check_rect_collision(pos1, type1, pos2, type2):
@@ -166,14 +192,25 @@ def energizer_rect(pos):
         CELL_SIZE // 2, CELL_SIZE // 2
     )
 
+def _overlaps(level_map, kind, pos):
+    """Cells whose `kind` rect collides with Pac-Man at `pos` (precomputed per map)."""
+    table = level_map.overlap_table(kind, lambda p, c: check_rect_collision(p, 'pacman', c, kind))
+    hits = table.get(pos)
+    if hits is None:
+        x, y = pos
+        hits = {(cx, cy) for cy in range(y - 2, y + 3) for cx in range(x - 2, x + 3)
+                if check_rect_collision(pos, 'pacman', (cx, cy), kind)}
+    return hits
+
 # Game state update function
-def update_game(pacman, alive, enemy_group, ghosts_status, foods_group, energizers_group, width):
+def update_game(pacman, alive, enemy_group, ghosts_status, foods_group, energizers_group, level_map):
     pac_pos = pacman  # tuple (x, y)
     
     # Check collision with ghosts
+    ghost_hits = _overlaps(level_map, 'ghost', pac_pos)
     for i, ghost in enumerate(enemy_group):
         ghost_pos = ghost
-        if check_rect_collision(pac_pos, 'pacman', ghost_pos, 'ghost'):
+        if ghost_pos in ghost_hits:
             if ghosts_status[i][0]:  # If ghost is alive
                 if ghosts_status[i][1]:  # If ghost is frightened
                     # Ghost gets eaten
@@ -186,39 +223,66 @@ def update_game(pacman, alive, enemy_group, ghosts_status, foods_group, energize
     
     # Check collision with foods
     new_foods = set(foods_group)
-    for food in foods_group:
-        if check_rect_collision(pac_pos, 'pacman', food, 'food'):
-            new_foods.remove(food)
+    new_foods.difference_update(_overlaps(level_map, 'food', pac_pos))
     
     # Check collision with energizers
     new_energizers = set(energizers_group)
-    for energizer in energizers_group:
-        if check_rect_collision(pac_pos, 'pacman', energizer, 'energizer'):
-            new_energizers.remove(energizer)
-            # Make all ghosts frightened
-            new_ghosts_status = []
-            for status in ghosts_status:
-                if status[0]:  # If ghost is alive
-                    new_ghosts_status.append((True, True))  # Make it frightened
-                else:
-                    new_ghosts_status.append(status)
-            ghosts_status = tuple(new_ghosts_status)
+    eaten_energizers = new_energizers.intersection(_overlaps(level_map, 'energizer', pac_pos))
+    if eaten_energizers:
+        new_energizers.difference_update(eaten_energizers)
+        # Make all ghosts frightened
+        new_ghosts_status = []
+        for status in ghosts_status:
+            if status[0]:  # If ghost is alive
+                new_ghosts_status.append((True, True))  # Make it frightened
+            else:
+                new_ghosts_status.append(status)
+        ghosts_status = tuple(new_ghosts_status)
     
     return pacman, alive, enemy_group, ghosts_status, new_foods, new_energizers
 
+# Repetition detection
+def _repetition_key(state):
+    pacman, alive, direction, ghosts, ghosts_status, ghosts_names, foods, energizers = state
+    return (pacman, len(foods), len(energizers))
+
+def _count_repetition(key, delta):
+    count = _repetitions.get(key, 0) + delta
+    if count:
+        _repetitions[key] = count
+    else:
+        del _repetitions[key]
+
+def remember_state(state):
+    """Add a real state to the recent history; the oldest one leaves the ring."""
+    if len(recent_states) == recent_states.maxlen:
+        _count_repetition(recent_states[0], -1)
+    key = _repetition_key(state)
+    recent_states.append(key)
+    _count_repetition(key, 1)
+
 # Alpha-beta search
-def alpha_beta(state, depth, alpha, beta, maximizing_player, width, walls):
+def alpha_beta(state, depth, alpha, beta, maximizing_player, width, level_map):
     pacman, alive, direction, ghosts, ghosts_status, ghosts_names, foods, energizers = state
     
     if depth == 0 or not alive or not foods:
-        return evaluate_game(state, width, walls), None
+        return evaluate_game(state, width, level_map), None
     
     if maximizing_player:
+        # Back on a cell without eating anything since: cut the repetition off
+        # (the root is the current real state, already in recent_states)
+        repetition = None
+        if depth < DEPTH:
+            repetition = _repetition_key(state)
+            if repetition in _repetitions:
+                return evaluate_game(state, width, level_map) - REPETITION_PENALTY, None
+            _count_repetition(repetition, 1)
+        
         max_eval = float('-inf')
         best_action = None
         
         # Get legal moves for Pac-Man
-        moves = _legal_moves(pacman, walls, width)
+        moves = _legal_moves(pacman, level_map)
         forbidden = opposite_keys.get(direction)
         
         # Don't allow reversing direction unless necessary
@@ -267,13 +331,13 @@ def alpha_beta(state, depth, alpha, beta, maximizing_player, width, walls):
             
             # Update game state
             new_pacman, new_alive, new_ghosts, new_ghosts_status, new_foods, new_energizers = update_game(
-                new_pacman, new_alive, new_ghosts, new_ghosts_status, new_foods, new_energizers, width
+                new_pacman, new_alive, new_ghosts, new_ghosts_status, new_foods, new_energizers, level_map
             )
             
             new_state = (new_pacman, new_alive, new_direction, new_ghosts, new_ghosts_status,
                          ghosts_names, new_foods, new_energizers)
             
-            eval_score, _ = alpha_beta(new_state, depth - 1, alpha, beta, False, width, walls)
+            eval_score, _ = alpha_beta(new_state, depth - 1, alpha, beta, False, width, level_map)
             
             if eval_score > max_eval:
                 max_eval = eval_score
@@ -283,6 +347,8 @@ def alpha_beta(state, depth, alpha, beta, maximizing_player, width, walls):
             if beta <= alpha:
                 break
         
+        if repetition is not None:
+            _count_repetition(repetition, -1)
         return max_eval, best_action
     
     else:  # Minimizing player (ghosts)
@@ -301,14 +367,14 @@ def alpha_beta(state, depth, alpha, beta, maximizing_player, width, walls):
             
             # Determine ghost's move based on its type
             if ghost_name == "Blinky":
-                move = blinky_move(ghost_pos, ghost_state, pacman, walls, width, last_dir)
+                move = blinky_move(ghost_pos, ghost_state, pacman, level_map, width, last_dir)
             elif ghost_name == "Pinky":
-                move = pinky_move(ghost_pos, ghost_state, pacman, direction, walls, width, last_dir)
+                move = pinky_move(ghost_pos, ghost_state, pacman, direction, level_map, width, last_dir)
             elif ghost_name == "Inky":
                 blinky_pos = next((ghosts[j] for j, name in enumerate(ghosts_names) if name == "Blinky"), (13, 11))
-                move = inky_move(ghost_pos, ghost_state, pacman, direction, blinky_pos, walls, width, last_dir)
+                move = inky_move(ghost_pos, ghost_state, pacman, direction, blinky_pos, level_map, width, last_dir)
             elif ghost_name == "Clyde":
-                move = clyde_move(ghost_pos, ghost_state, pacman, walls, width, last_dir)
+                move = clyde_move(ghost_pos, ghost_state, pacman, level_map, width, last_dir)
             else:
                 move = None
             
@@ -322,19 +388,19 @@ def alpha_beta(state, depth, alpha, beta, maximizing_player, width, walls):
         new_energizers = energizers
         
         new_pacman, new_alive, new_ghosts, new_ghosts_status, new_foods, new_energizers = update_game(
-            pacman, new_alive, new_ghosts, new_ghosts_status, new_foods, new_energizers, width
+            pacman, new_alive, new_ghosts, new_ghosts_status, new_foods, new_energizers, level_map
         )
         
         new_state = (new_pacman, new_alive, direction, new_ghosts, new_ghosts_status,
                      ghosts_names, new_foods, new_energizers)
         
-        eval_score, _ = alpha_beta(new_state, depth - 1, alpha, beta, True, width, walls)
+        eval_score, _ = alpha_beta(new_state, depth - 1, alpha, beta, True, width, level_map)
         min_eval = min(min_eval, eval_score)
         
         return min_eval, None
 
 # Evaluation function with anti-looping penalties
-def evaluate_game(state, width, walls):
+def evaluate_game(state, width, level_map):
     pacman, alive, direction, ghosts, ghosts_status, ghosts_names, foods, energizers = state
     
     if not alive:
@@ -350,8 +416,7 @@ def evaluate_game(state, width, walls):
     
     # Energizer value
     if energizers:
-        closest_energizer = min(energizers, key=lambda e: _manhattan_distance(e, pacman, width))
-        energizer_dist = _manhattan_distance(closest_energizer, pacman, width)
+        energizer_dist = _nearest_pellet_distance('energizer', pacman, energizers, width)
         
         # If ghosts are nearby and not frightened, prioritize getting energizers
         dangerous_nearby = False
@@ -368,8 +433,7 @@ def evaluate_game(state, width, walls):
     
     # Food value - prioritize closest food
     if foods:
-        closest_food = min(foods, key=lambda f: _manhattan_distance(f, pacman, width))
-        food_dist = _manhattan_distance(closest_food, pacman, width)
+        food_dist = _nearest_pellet_distance('food', pacman, foods, width)
         score += 300 / (food_dist + 1)
     
     # Ghost evaluation
@@ -394,7 +458,7 @@ def evaluate_game(state, width, walls):
                 score -= 200 / (dist + 1)  # Small penalty for distant ghosts
     
     # Avoid getting trapped - penalize positions with few escape routes
-    escape_routes = len(_legal_moves(pacman, walls, width))
+    escape_routes = len(_legal_moves(pacman, level_map))
     if escape_routes < 3:
         score -= (3 - escape_routes) * 200  # Penalty for positions with few escape routes
     
@@ -403,7 +467,7 @@ def evaluate_game(state, width, walls):
         # Check if continuing in the same direction is a valid move
         next_pos = _advance(pacman, direction, width)
         next_pos_xy = (next_pos[0], next_pos[1])
-        if next_pos_xy not in walls:
+        if next_pos_xy not in level_map.walls:
             # Give a small bonus for continuing in the same direction
             score += 100
     
@@ -416,27 +480,9 @@ def evaluate_game(state, width, walls):
     
     return score
 
-# Function to detect if we're in a loop
-def is_in_loop(positions, current_pos):
-    """Check if we're in a loop by looking at recent positions"""
-    if len(positions) < 6:  # Need enough history to detect loops
-        return False
-    
-    # Check for simple back-and-forth pattern
-    if len(positions) >= 4:
-        if positions[-1] == positions[-3] and positions[-2] == positions[-4]:
-            return True
-    
-    # Check for position that appears multiple times in recent history
-    pos_count = positions.count(current_pos)
-    if pos_count >= 3:  # Position appears 3+ times in recent history
-        return True
-    
-    return False
-
 # Main function to determine Pac-Man's next move
 def next_move(game_obj, game_parameters, enemy_group, foods_group, energizers_group):
-    global visited_positions, last_positions
+    global visited_positions
     
     # Get current game state
     pacman = tuple(position(game_obj['Pac-Man']))
@@ -447,11 +493,6 @@ def next_move(game_obj, game_parameters, enemy_group, foods_group, energizers_gr
     pos_key = f"{pacman[0]},{pacman[1]}"
     visited_positions[pos_key] = visited_positions.get(pos_key, 0) + 1
     
-    # Update recent positions list
-    last_positions.append(pacman)
-    if len(last_positions) > MAX_RECENT:
-        last_positions.pop(0)
-    
     # Get ghost information
     ghosts = [tuple(position(enemy)) for enemy in enemy_group]
     ghosts_status = [tuple((enemy.alive, enemy.frightened)) for enemy in enemy_group]
@@ -463,49 +504,21 @@ def next_move(game_obj, game_parameters, enemy_group, foods_group, energizers_gr
     
     # Get level information
     level = game_parameters['map']
-    width, walls = _level_info(level)
+    level_map = _level_info(level)
+    width = level_map.width
+    _sync_pellet_fields(level_map, foods, energizers)
     
     # Create initial state
     state = (pacman, alive, direction, ghosts, ghosts_status, ghosts_names, foods, energizers)
     
-    # Check if we're in a loop
-    in_loop = is_in_loop(last_positions, pacman)
-    
-    # If we're in a loop, try to break out of it
-    if in_loop:
-        print("LOOP DETECTED! Breaking out...")
-        # Get all legal moves
-        legal_moves = _legal_moves(pacman, walls, width)
-        
-        if len(legal_moves) > 1:
-            # Try to find a move that leads to a less visited position
-            best_move = None
-            min_visits = float('inf')
-            
-            for move in legal_moves:
-                next_pos = _advance(pacman, move, width)
-                next_key = f"{next_pos[0]},{next_pos[1]}"
-                visits = visited_positions.get(next_key, 0)
-                
-                if visits < min_visits:
-                    min_visits = visits
-                    best_move = move
-            
-            if best_move is not None:
-                return best_move
-            
-            # If all positions are equally visited, choose a random move
-            # that's different from the current direction
-            alternative_moves = [m for m in legal_moves if m != direction]
-            if alternative_moves:
-                return random.choice(alternative_moves)
+    remember_state(state)
     
     # Run alpha-beta search
-    score, action = alpha_beta(state, DEPTH, float('-inf'), float('inf'), True, width, walls)
+    score, action = alpha_beta(state, DEPTH, float('-inf'), float('inf'), True, width, level_map)
     
     # If no good move is found, choose a random legal move
     if action is None:
-        legal_moves = _legal_moves(pacman, walls, width)
+        legal_moves = _legal_moves(pacman, level_map)
         if legal_moves:
             action = legal_moves[0]
     
@@ -0,0 +1,202 @@
+"""
+Compiled maze data shared by the Pacman AI engines.
+
+A maze is compiled once per process: the wall bitset, the legal-move table,
+the BFS distance table and the pellet-overlap tables are built on first use
+and cached under a hash of the wall layout. Repeated games on the same map
+(or the same map with some pellets eaten) reuse the same entry. A grid object
+is hashed once: later calls with the same object skip the hash, so its walls
+must not be edited in place (pellets may change; PacMan.load_maze builds a
+new grid).
+"""
+import hashlib
+from array import array
+from collections import OrderedDict
+
+# Direction order used by every table (same order as pacman_ai.DIRECTIONS)
+DIRECTIONS = ("UP", "DOWN", "LEFT", "RIGHT")
+OFFSETS = {"UP": (0, -1), "DOWN": (0, 1), "LEFT": (-1, 0), "RIGHT": (1, 0)}
+
+# Distance stored for cells that cannot reach each other
+UNREACHABLE = 0xFFFF
+
+# Maximum number of compiled maps kept in memory (least recently used evicted)
+CACHE_SIZE = 8
+
+_cache = OrderedDict()
+_grid_keys = OrderedDict()  # id(grid) -> (grid, layout key), same LRU bound
+
+
+def _is_wall(cell):
+    """Wall test for both map encodings (int grids and ai.py text rows)."""
+    if isinstance(cell, str):
+        return cell not in ('.', ' ', '0')
+    return cell == 1
+
+
+def _wall_rows(grid):
+    rows = []
+    for row in grid:
+        if isinstance(row, str):
+            row = row.rstrip('\n')
+        rows.append(tuple(_is_wall(cell) for cell in row))
+    return rows
+
+
+def _layout_key(rows):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{len(rows[0])}x{len(rows)};".encode())
+    for row in rows:
+        digest.update(bytes(row))
+    return digest.hexdigest()
+
+
+def map_key(grid):
+    """Hash of the wall layout of a map (pellets do not change the key)."""
+    return _layout_key(_wall_rows(grid))
+
+
+def _adjacency(compiled):
+    """Open-neighbour indices of every open cell, by cell index (for the BFS)."""
+    index = compiled.index
+    return [tuple(index[nxt] for _, nxt in compiled.moves[cell]) for cell in compiled.cells]
+
+
+class CompiledMap:
+    """
+    Precomputed data for one maze layout.
+
+    Attributes:
+        key: hash of the wall layout
+        width, height: grid size
+        walls: frozenset of wall cells
+        wall_bits: wall bitset (bit y * width + x is set for a wall)
+        cells: open cells, in row-major order
+        index: cell -> position in `cells`
+        moves: cell -> tuple of (direction, next_cell) for every non-wall move
+    """
+
+    def __init__(self, key, wall_rows):
+        self.key = key
+        self.height = len(wall_rows)
+        self.width = len(wall_rows[0])
+        self.walls = frozenset((x, y)
+                               for y, row in enumerate(wall_rows)
+                               for x, wall in enumerate(row) if wall)
+        self.wall_bits = 0
+        for x, y in self.walls:
+            self.wall_bits |= 1 << (y * self.width + x)
+        self.cells = tuple((x, y)
+                           for y, row in enumerate(wall_rows)
+                           for x, wall in enumerate(row) if not wall)
+        self.index = {cell: i for i, cell in enumerate(self.cells)}
+        self.moves = {cell: tuple((direction, nxt)
+                                  for direction, nxt in self._neighbours(cell)
+                                  if nxt not in self.walls)
+                      for cell in self.cells}
+        self._distance_rows = [None] * len(self.cells)
+        self._tables = {}
+
+    def _neighbours(self, cell):
+        x, y = cell
+        for direction in DIRECTIONS:
+            dx, dy = OFFSETS[direction]
+            yield direction, ((x + dx) % self.width, (y + dy) % self.height)
+
+    def is_wall(self, cell):
+        x, y = cell
+        return (self.wall_bits >> (y * self.width + x)) & 1 == 1
+
+    def advance(self, cell, direction):
+        """Cell reached from `cell` in `direction`, with tunnel wrap-around."""
+        dx, dy = OFFSETS[direction]
+        return ((cell[0] + dx) % self.width, (cell[1] + dy) % self.height)
+
+    def distances_from(self, cell):
+        """Row of the distance table for `cell` (BFS, computed on first use)."""
+        i = self.index[cell]
+        row = self._distance_rows[i]
+        if row is None:
+            adjacency = self.table("adjacency", _adjacency)
+            row = array('H', [UNREACHABLE]) * len(self.cells)
+            row[i] = 0
+            frontier = [i]
+            d = 0
+            while frontier:
+                d += 1
+                next_frontier = []
+                for current in frontier:
+                    for j in adjacency[current]:
+                        if row[j] == UNREACHABLE:
+                            row[j] = d
+                            next_frontier.append(j)
+                frontier = next_frontier
+            self._distance_rows[i] = row
+        return row
+
+    def distance(self, a, b):
+        """Maze distance between two open cells (UNREACHABLE if disconnected)."""
+        return self.distances_from(a)[self.index[b]]
+
+    def table(self, name, build):
+        """
+        Derived table memoized on this map (e.g. pellet overlaps, engine-specific
+        move tables). `build(compiled_map)` is called once per map and name.
+        """
+        if name not in self._tables:
+            self._tables[name] = build(self)
+        return self._tables[name]
+
+    def overlap_table(self, kind, collides, radius=2):
+        """
+        Pellet-overlap table: cell -> frozenset of open cells `c` for which
+        `collides(cell, c)` holds. Only cells within `radius` are tested.
+        """
+        def build(cmap):
+            table = {}
+            for x, y in cmap.cells:
+                hits = []
+                for oy in range(y - radius, y + radius + 1):
+                    for ox in range(x - radius, x + radius + 1):
+                        other = (ox, oy)
+                        if other in cmap.index and collides((x, y), other):
+                            hits.append(other)
+                table[(x, y)] = frozenset(hits)
+            return table
+        return self.table(("overlap", kind), build)
+
+    def mirror_symmetric(self):
+        """True if the wall layout is its own left-right mirror image (x -> width - 1 - x)."""
+        return self.table("mirror_symmetric", lambda cmap: all(
+            (cmap.width - 1 - x, y) in cmap.walls for x, y in cmap.walls))
+
+
+def compile_map(grid):
+    """
+    Return the compiled data for `grid` (list of int rows or of text rows).
+    Entries are cached by wall-layout hash with an LRU bound of CACHE_SIZE;
+    the hash of a grid object is computed on its first call only.
+    """
+    rows = None
+    known = _grid_keys.get(id(grid))
+    if known is not None and known[0] is grid:
+        key = known[1]
+        _grid_keys.move_to_end(id(grid))
+    else:
+        rows = _wall_rows(grid)
+        key = _layout_key(rows)
+        _grid_keys[id(grid)] = (grid, key)
+        if len(_grid_keys) > CACHE_SIZE:
+            _grid_keys.popitem(last=False)
+    compiled = _cache.get(key)
+    if compiled is not None:
+        _cache.move_to_end(key)
+        return compiled
+
+    if rows is None:
+        rows = _wall_rows(grid)
+    compiled = CompiledMap(key, rows)
+    _cache[key] = compiled
+    if len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+    return compiled
@@ -0,0 +1,105 @@
+"""
+Ghost danger map: earliest arrival time of the dangerous ghosts on every cell.
+
+Recomputed once per decision with a single multi-source BFS over ghost states
+(cell, direction of the last move) seeded with every dangerous ghost at once,
+under the movement rules of the search model: a ghost does not reverse unless it
+has no other move and cannot re-enter the ghost home once outside. Times are in
+ghost steps. In the game a ghost steps at most as often as Pacman, so a cell
+whose arrival time is greater than the number of Pacman steps needed to reach
+it cannot hold a dangerous ghost by then.
+
+The same transition table gives, for the ghosts of any search node, the cells
+they can occupy after their next move (threatened()).
+"""
+from array import array
+from collections import deque
+
+from compiled_map import DIRECTIONS, UNREACHABLE
+
+OPPOSITE_INDEX = {0: 1, 1: 0, 2: 3, 3: 2}
+DIR_INDEX = {d: i for i, d in enumerate(DIRECTIONS)}
+
+
+def _build_transitions(compiled, home):
+    """(cell index * 4 + direction index) -> tuple of next states, for every cell and last direction."""
+    transitions = []
+    for cell in compiled.cells:
+        moves = [(DIR_INDEX[d], compiled.index[nxt]) for d, nxt in compiled.moves[cell]
+                 if cell in home or nxt not in home]
+        for last in range(4):
+            forward = [(d, j) for d, j in moves if d != OPPOSITE_INDEX[last]]
+            transitions.append(tuple(j * 4 + d for d, j in (forward or moves)))
+    return transitions
+
+
+class DangerMap:
+    def __init__(self, compiled_map, home):
+        """
+        Args:
+            compiled_map: CompiledMap of the maze
+            home: cells of the ghost home
+        """
+        self.map = compiled_map
+        self.transitions = compiled_map.table(("ghost_transitions", frozenset(home)),
+                                              lambda cmap: _build_transitions(cmap, home))
+        self.arrival = array('H', [UNREACHABLE]) * len(compiled_map.cells)
+
+    def _states(self, ghost):
+        i = self.map.index.get((ghost.grid_x, ghost.grid_y))
+        if i is None:
+            return ()
+        last = DIR_INDEX.get(ghost.direction)
+        if last is None:
+            return tuple(i * 4 + d for d in range(4))
+        return (i * 4 + last,)
+
+    @staticmethod
+    def dangerous(ghosts):
+        return [ghost for ghost in ghosts if not ghost.frightened and not ghost.eaten]
+
+    def update(self, ghosts):
+        """Recompute the arrival times for the dangerous ghosts among `ghosts`."""
+        n = len(self.map.cells)
+        state_time = array('H', [UNREACHABLE]) * (4 * n)
+        arrival = array('H', [UNREACHABLE]) * n
+        queue = deque()
+        for ghost in self.dangerous(ghosts):
+            for s in self._states(ghost):
+                if state_time[s] == UNREACHABLE:
+                    state_time[s] = 0
+                    arrival[s >> 2] = 0
+                    queue.append(s)
+        transitions = self.transitions
+        while queue:
+            s = queue.popleft()
+            t = state_time[s] + 1
+            for nxt in transitions[s]:
+                if state_time[nxt] == UNREACHABLE:
+                    state_time[nxt] = t
+                    if t < arrival[nxt >> 2]:
+                        arrival[nxt >> 2] = t
+                    queue.append(nxt)
+        self.arrival = arrival
+        return self
+
+    def arrival_at(self, cell):
+        """Ghost steps before a dangerous ghost can stand on `cell` (UNREACHABLE if never)."""
+        i = self.map.index.get(cell)
+        return UNREACHABLE if i is None else self.arrival[i]
+
+    def threatened(self, ghosts, movers=None):
+        """
+        Cells the dangerous ghosts among `ghosts` occupy now or, for those in
+        `movers` (default: all of them), after their next move.
+        """
+        cells = self.map.cells
+        result = set()
+        for ghost in self.dangerous(ghosts):
+            moving = movers is None or ghost in movers
+            for s in self._states(ghost):
+                result.add(cells[s >> 2])
+                if moving:
+                    for nxt in self.transitions[s]:
+                        result.add(cells[nxt >> 2])
+        return result
@@ -0,0 +1,131 @@
+"""
+Nearest-pellet distance field.
+
+Multi-source BFS from every remaining pellet over a compiled map: each open
+cell stores its maze distance to the nearest pellet and which pellet that is.
+When a pellet is eaten only the cells it owned are recomputed, seeded from the
+border of that region, so the per-tick cost is proportional to the region and
+the lookup during evaluation is O(1).
+"""
+import heapq
+from collections import deque
+
+INFINITY = float('inf')
+
+
+class PelletField:
+    def __init__(self, compiled_map, pellets, blocked=()):
+        """
+        Args:
+            compiled_map: CompiledMap of the maze
+            pellets: iterable of pellet cells
+            blocked: cells the BFS must not walk through (e.g. the ghost home)
+        """
+        self.map = compiled_map
+        self.blocked = frozenset(blocked)
+        self.pellets = set()
+        self.dist = [INFINITY] * len(compiled_map.cells)
+        self.owner = [None] * len(compiled_map.cells)
+        self.reset(pellets)
+
+    def reset(self, pellets):
+        """Rebuild the whole field for a new pellet set."""
+        index = self.map.index
+        self.pellets = {p for p in pellets if p in index}
+        self.dist = [INFINITY] * len(self.map.cells)
+        self.owner = [None] * len(self.map.cells)
+        queue = deque()
+        for pellet in self.pellets:
+            i = index[pellet]
+            self.dist[i] = 0
+            self.owner[i] = pellet
+            queue.append(pellet)
+        while queue:
+            cell = queue.popleft()
+            i = index[cell]
+            d = self.dist[i] + 1
+            for _, nxt in self.map.moves[cell]:
+                j = index[nxt]
+                if self.dist[j] == INFINITY and nxt not in self.blocked:
+                    self.dist[j] = d
+                    self.owner[j] = self.owner[i]
+                    queue.append(nxt)
+
+    def remove(self, pellet):
+        """Pellet eaten: recompute only the cells that had it as nearest pellet."""
+        if pellet not in self.pellets:
+            return
+        self.pellets.discard(pellet)
+        index = self.map.index
+        moves = self.map.moves
+
+        # Region owned by the eaten pellet (connected through BFS parents)
+        region = {pellet}
+        queue = deque([pellet])
+        while queue:
+            cell = queue.popleft()
+            for _, nxt in moves[cell]:
+                if nxt not in region and self.owner[index[nxt]] == pellet:
+                    region.add(nxt)
+                    queue.append(nxt)
+        for cell in region:
+            i = index[cell]
+            self.dist[i] = INFINITY
+            self.owner[i] = None
+
+        # Seed from the border of the region, then Dijkstra inside it
+        heap = []
+        for cell in region:
+            if cell in self.blocked:
+                continue
+            for _, nxt in moves[cell]:
+                j = index[nxt]
+                if nxt not in region and self.owner[j] is not None:
+                    heapq.heappush(heap, (self.dist[j] + 1, index[cell], cell, self.owner[j]))
+        while heap:
+            d, i, cell, owner = heapq.heappop(heap)
+            if d >= self.dist[i]:
+                continue
+            self.dist[i] = d
+            self.owner[i] = owner
+            for _, nxt in moves[cell]:
+                j = index[nxt]
+                if nxt in region and nxt not in self.blocked and d + 1 < self.dist[j]:
+                    heapq.heappush(heap, (d + 1, j, nxt, owner))
+
+    def sync(self, pellets):
+        """
+        Bring the field up to date with the current pellet set: eaten pellets are
+        removed incrementally, a refilled map triggers a full rebuild.
+        """
+        pellets = pellets if isinstance(pellets, (set, frozenset)) else set(pellets)
+        if not pellets <= self.pellets:
+            self.reset(pellets)
+            return
+        for pellet in self.pellets - pellets:
+            self.remove(pellet)
+
+    def nearest(self, cell):
+        """(distance, pellet) of the nearest pellet from `cell`, or (None, None)."""
+        i = self.map.index.get(cell)
+        if i is None or self.owner[i] is None:
+            return None, None
+        return self.dist[i], self.owner[i]
+
+    def nearest_in(self, cell, pellets):
+        """
+        Nearest pellet among `pellets` (a subset of the field's pellets, e.g. the
+        pellets left in a search node). Exact in O(1) when the field's nearest
+        pellet is still in the subset, otherwise falls back to maze distances.
+        """
+        d, owner = self.nearest(cell)
+        if owner is None or owner in pellets:
+            return d, owner
+        best = (None, None)
+        for pellet in pellets:
+            if pellet not in self.map.index:
+                continue
+            dp = self.map.distance(cell, pellet)
+            if best[0] is None or dp < best[0]:
+                best = (dp, pellet)
+        return best
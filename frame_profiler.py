@@ -0,0 +1,119 @@
+"""
+Per-frame phase timings for the game loop.
+
+The loop calls begin() at the start of a frame and mark(phase) after each
+phase; the time since the previous mark is charged to that phase. Rolling
+averages feed the on-screen HUD, and every frame is kept so the whole game can
+be written out as CSV when it ends. With PACMAN_PROFILE=cprofile a cProfile
+capture of the loop is written as well.
+
+Enable with the PACMAN_PROFILE environment variable (any non-empty value) or
+toggle at runtime from the game (P key). When disabled every call returns
+immediately.
+"""
+import cProfile
+import csv
+import os
+import time
+from collections import deque
+
+PHASES = ("events", "get_move", "pacman_update", "ghost_update", "collision",
+          "draw_map", "sprites", "flip", "idle")
+
+# Phases shown on the HUD (idle is the clock.tick sleep, not work)
+HUD_PHASES = PHASES[:-1]
+
+
+class FrameProfiler:
+    def __init__(self, enabled=None, window=60, csv_path="profile_frames.csv",
+                 cprofile_path="profile_frames.prof"):
+        """
+        Args:
+            enabled: Force profiling on/off (default: PACMAN_PROFILE env var)
+            window: Number of frames in the rolling averages
+            csv_path: Per-frame CSV written by dump()
+            cprofile_path: cProfile capture written by dump() when PACMAN_PROFILE=cprofile
+        """
+        mode = os.environ.get("PACMAN_PROFILE", "")
+        self.enabled = bool(mode) if enabled is None else enabled
+        self.csv_path = csv_path
+        self.cprofile_path = cprofile_path
+        self.frames = []  # One dict of phase -> ms per profiled frame
+        self.recent = {phase: deque(maxlen=window) for phase in PHASES}
+        self.extra_columns = []  # Columns added through annotate()
+        self.annotations = {}  # Latest annotated values, shown on the HUD
+        self._current = None
+        self._last = 0.0
+        self._frame_index = 0
+        self._profile = cProfile.Profile() if mode == "cprofile" else None
+        if self._profile is not None and self.enabled:
+            self._profile.enable()
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        if self._profile is not None:
+            if self.enabled:
+                self._profile.enable()
+            else:
+                self._profile.disable()
+
+    def begin(self):
+        self._frame_index += 1
+        if not self.enabled:
+            return
+        self._current = dict.fromkeys(PHASES, 0.0)
+        self._current["frame"] = self._frame_index
+        self._last = time.perf_counter()
+
+    def mark(self, phase):
+        """Charge the time since the previous mark to `phase`."""
+        if not self.enabled or self._current is None:
+            return
+        now = time.perf_counter()
+        self._current[phase] += (now - self._last) * 1000.0
+        self._last = now
+
+    def annotate(self, **values):
+        """Attach extra columns (e.g. the depth governor state) to the current frame."""
+        if not self.enabled or self._current is None:
+            return
+        for key in values:
+            if key not in self.extra_columns:
+                self.extra_columns.append(key)
+        self._current.update(values)
+        self.annotations.update(values)
+
+    def end(self):
+        if not self.enabled or self._current is None:
+            return
+        for phase in PHASES:
+            self.recent[phase].append(self._current[phase])
+        self.frames.append(self._current)
+        self._current = None
+
+    def averages(self):
+        """Rolling average in ms per phase."""
+        return {phase: (sum(values) / len(values) if values else 0.0)
+                for phase, values in self.recent.items()}
+
+    def hud_lines(self):
+        averages = self.averages()
+        total = sum(averages[phase] for phase in HUD_PHASES)
+        lines = [f"frame {total:5.1f} ms"]
+        lines += [f"{phase:<13} {averages[phase]:5.2f}" for phase in HUD_PHASES]
+        lines += [f"{key:<13} {value}" for key, value in self.annotations.items()]
+        return lines
+
+    def dump(self):
+        """Write the per-frame CSV (and the cProfile capture) if anything was recorded."""
+        if self.frames:
+            columns = ["frame", *PHASES, *self.extra_columns]
+            with open(self.csv_path, "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=columns)
+                writer.writeheader()
+                for row in self.frames:
+                    writer.writerow({key: (round(value, 4) if isinstance(value, float) else value)
+                                     for key, value in row.items()})
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile.dump_stats(self.cprofile_path)
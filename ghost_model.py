@@ -0,0 +1,246 @@
+"""
+Empirical ghost-move model mined from replay files, to prune unlikely ghost
+replies in the PacmanAI search.
+
+Ghost.move is mostly deterministic: a chasing or scattering ghost takes the
+exit closest to its target, so in a given situation most legal moves are never
+played. The miner walks the ghost steps of recorded games (replay.py) and
+counts the move taken per situation:
+    (ghost name, mode, exits, in ghost home, sign of dx and dy to Pacman,
+     dominant axis to Pacman)
+where the exits are the legal moves of the search model (no reversing, no
+re-entering the home unless eaten) and the mode is FRIGHTENED or EATEN when
+the ghost is. The model keeps the move frequencies of the situations seen at
+least min_samples times.
+
+At a min node, PacmanAI drops the ghost moves whose observed probability is
+below PacmanAI.ghost_move_threshold (the most likely move is always kept, and
+situations too rare in the data keep every move). Frightened ghosts move at
+random, so they keep their moves for any threshold below 1/3. The model is
+only used on the map it was mined on.
+
+Usage:
+    python PacMan.py --headless --seed 1 --replay games/1.bin   (record games)
+    python ghost_model.py mine games/*.bin [--out ghost_model.json]
+    python ghost_model.py evaluate [--model ghost_model.json] [--thresholds 0 0.05 0.2]
+"""
+import argparse
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from compiled_map import compile_map, map_key
+
+DEFAULT_MODEL_PATH = "ghost_model.json"
+MIN_SAMPLES = 20
+VERSION = 1
+
+OPPOSITE = {"UP": "DOWN", "DOWN": "UP", "LEFT": "RIGHT", "RIGHT": "LEFT"}
+
+
+def _sign(value):
+    return (value > 0) - (value < 0)
+
+
+def situation(name, mode, exits, ghost_cell, pacman_cell, in_home=False):
+    """Key of the situation of a ghost about to move (`exits` in DIRECTIONS order)."""
+    dx = pacman_cell[0] - ghost_cell[0]
+    dy = pacman_cell[1] - ghost_cell[1]
+    return (f"{name} {mode} {''.join(direction[0] for direction in exits)}{' H' if in_home else ''} "
+            f"{_sign(dx)} {_sign(dy)} {_sign(abs(dx) - abs(dy))}")
+
+
+def ghost_exits(compiled, home, cell, heading, eaten):
+    """Legal moves of a ghost in the search model (PacmanAI._get_ghost_valid_moves)."""
+    reverse = OPPOSITE.get(heading)
+    in_home = cell in home
+    exits = [direction for direction, nxt in compiled.moves[cell]
+             if direction != reverse and (in_home or nxt not in home or eaten)]
+    if not exits and reverse is not None and any(direction == reverse for direction, _ in compiled.moves[cell]):
+        exits = [reverse]
+    return exits
+
+
+class GhostMoveModel:
+    def __init__(self, counts, map_hash=None, min_samples=MIN_SAMPLES):
+        """
+        Args:
+            counts: situation -> {direction: number of times it was taken}
+            map_hash: compiled_map.map_key of the map the games were played on
+            min_samples: Situations seen fewer times are left out
+        """
+        self.counts = counts
+        self.map_hash = map_hash
+        self.min_samples = min_samples
+        self.probabilities = {}
+        for key, moves in counts.items():
+            total = sum(moves.values())
+            if total >= min_samples:
+                self.probabilities[key] = {direction: count / total for direction, count in moves.items()}
+
+    def likely_moves(self, name, mode, exits, ghost_cell, pacman_cell, threshold, in_home=False):
+        """`exits` whose probability is at least `threshold` (all of them in an unknown situation)."""
+        probabilities = self.probabilities.get(situation(name, mode, exits, ghost_cell, pacman_cell, in_home))
+        if probabilities is None:
+            return exits
+        kept = [direction for direction in exits if probabilities.get(direction, 0.0) >= threshold]
+        return kept or [max(exits, key=lambda direction: probabilities.get(direction, 0.0))]
+
+    def summary(self):
+        samples = sum(sum(moves.values()) for moves in self.counts.values())
+        deterministic = sum(1 for probabilities in self.probabilities.values() if max(probabilities.values()) == 1.0)
+        return {"samples": samples, "situations": len(self.counts), "modelled": len(self.probabilities),
+                "deterministic": deterministic}
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump({"version": VERSION, "map_hash": self.map_hash, "min_samples": self.min_samples,
+                       "counts": self.counts}, f, indent=1, sort_keys=True)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        if data.get("version") != VERSION:
+            raise ValueError(f"{path}: ghost model version {data.get('version')}, expected {VERSION}")
+        return cls(data["counts"], data["map_hash"], data["min_samples"])
+
+
+def load_model(path, game_map):
+    """Open the model at `path` for `game_map`, or return None if missing or mined on another map."""
+    if not path or not os.path.exists(path):
+        return None
+    model = GhostMoveModel.load(path)
+    if model.map_hash != map_key(game_map):
+        return None
+    return model
+
+
+def mine(paths, game_map, ghost_home, min_samples=MIN_SAMPLES, log=print):
+    """
+    Count the ghost moves of the replays at `paths` played on `game_map`
+    (replays of other maps are skipped).
+    """
+    from replay import GHOST_EATEN, GHOST_FRIGHTENED, MODE_CODES, Replay
+
+    compiled = compile_map(game_map)
+    x_min, x_max, y_min, y_max = ghost_home
+    home = {(x, y) for x in range(x_min, x_max + 1) for y in range(y_min, y_max + 1)}
+    mode_names = {code: mode for mode, code in MODE_CODES.items()}
+    counts = {}
+    for path in paths:
+        with Replay(path) as replay:
+            if replay.map_hash != compiled.key:
+                log(f"{path}: played on another map, skipped")
+                continue
+            names = replay.config.get("ghosts") or [f"GHOST{i}" for i in range(replay.ghost_count)]
+            pacman_x, pacman_y = replay.ticks["pacman_x"].tolist(), replay.ticks["pacman_y"].tolist()
+            for g, name in enumerate(names):
+                columns = replay.ticks["ghosts"][:, g]
+                xs, ys = columns["x"].tolist(), columns["y"].tolist()
+                flags, modes = columns["flags"].tolist(), columns["mode"].tolist()
+                del columns
+                heading = None
+                for i in range(1, len(xs)):
+                    cell, nxt = (xs[i - 1], ys[i - 1]), (xs[i], ys[i])
+                    if cell == nxt:
+                        continue
+                    move = next((direction for direction, target in compiled.moves.get(cell, ()) if target == nxt), None)
+                    if move is None:  # Respawn after a lost life
+                        heading = None
+                        continue
+                    if heading is None:  # Previous move unknown: no exits
+                        heading = move
+                        continue
+                    if flags[i - 1] & GHOST_EATEN:
+                        mode = "EATEN"
+                    elif flags[i - 1] & GHOST_FRIGHTENED:
+                        mode = "FRIGHTENED"
+                    else:
+                        mode = mode_names.get(modes[i - 1], "SCATTER")
+                    exits = ghost_exits(compiled, home, cell, heading, mode == "EATEN")
+                    if move in exits:
+                        key = situation(name, mode, exits, cell, (pacman_x[i - 1], pacman_y[i - 1]), cell in home)
+                        moves = counts.setdefault(key, {})
+                        moves[move] = moves.get(move, 0) + 1
+                    heading = move
+    return GhostMoveModel(counts, compiled.key, min_samples)
+
+
+def _play(seed, threshold, model_path, depth, max_frames):
+    """One headless game; returns the result and the branching of the min nodes."""
+    import PacMan
+    from frame_profiler import FrameProfiler
+    from pacman_ai import PacmanAI
+
+    PacMan.restore_food()
+    random.seed(seed)
+    ai = PacmanAI(depth=depth)
+    ai.ghost_moves_path = model_path
+    ai.ghost_move_threshold = threshold
+    session = PacMan.GameSession(ai, governed=False)
+    profiler = FrameProfiler(enabled=False)
+    while not session.over and session.frames < max_frames:
+        session.advance(profiler)
+    return {"win": session.win, "score": session.pacman.score, "lives": session.pacman.lives,
+            "ghost_nodes": ai.ghost_nodes, "ghost_replies": ai.ghost_replies,
+            "ghost_replies_kept": ai.ghost_replies_kept}
+
+
+def evaluate(model_path, thresholds, seeds, depth=4, max_frames=600 * 30, workers=None):
+    """Win rate and min-node branching factor of PacmanAI for each pruning threshold."""
+    report = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for threshold in thresholds:
+            games = list(pool.map(_play, seeds, [threshold] * len(seeds), [model_path] * len(seeds),
+                                  [depth] * len(seeds), [max_frames] * len(seeds)))
+            ghost_nodes = sum(game["ghost_nodes"] for game in games)
+            report.append({
+                "threshold": threshold,
+                "games": len(games),
+                "win_rate": round(sum(game["win"] for game in games) / len(games), 3),
+                "mean_score": round(sum(game["score"] for game in games) / len(games), 1),
+                "lives": sum(game["lives"] for game in games),
+                "branching": round(sum(game["ghost_replies"] for game in games) / ghost_nodes, 3) if ghost_nodes else 0.0,
+                "pruned_branching": round(sum(game["ghost_replies_kept"] for game in games) / ghost_nodes, 3)
+                if ghost_nodes else 0.0,
+            })
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mine and evaluate the ghost-move model")
+    commands = parser.add_subparsers(dest="command", required=True)
+    mine_parser = commands.add_parser("mine", help="count the ghost moves of replay files")
+    mine_parser.add_argument("paths", nargs="+", help="replay files (PacMan.py --replay)")
+    mine_parser.add_argument("--out", default=DEFAULT_MODEL_PATH, help=f"model file (default: {DEFAULT_MODEL_PATH})")
+    mine_parser.add_argument("--min-samples", type=int, default=MIN_SAMPLES,
+                             help=f"situations seen fewer times keep every move (default: {MIN_SAMPLES})")
+    evaluate_parser = commands.add_parser("evaluate", help="play games with several pruning thresholds")
+    evaluate_parser.add_argument("--model", default=DEFAULT_MODEL_PATH, help="model file")
+    evaluate_parser.add_argument("--thresholds", type=float, nargs="+", default=[0.0, 0.05, 0.2],
+                                 help="pruning thresholds (0 = no pruning)")
+    evaluate_parser.add_argument("--games", type=int, default=20, help="games per threshold (default: 20)")
+    evaluate_parser.add_argument("--seed", type=int, default=1000, help="seed of the first game (default: 1000)")
+    evaluate_parser.add_argument("--depth", type=int, default=4, help="search depth (default: 4)")
+    evaluate_parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    args = parser.parse_args()
+
+    if args.command == "mine":
+        from PacMan import game_map, GHOST_HOME_X_MIN, GHOST_HOME_X_MAX, GHOST_HOME_Y_MIN, GHOST_HOME_Y_MAX
+
+        for path in args.paths:
+            if not os.path.exists(path):
+                parser.error(f"{path}: no such file")
+        model = mine(args.paths, game_map, (GHOST_HOME_X_MIN, GHOST_HOME_X_MAX, GHOST_HOME_Y_MIN, GHOST_HOME_Y_MAX),
+                     args.min_samples)
+        model.save(args.out)
+        print(model.summary())
+        print(f"Model written to {os.path.abspath(args.out)}")
+    else:
+        if not os.path.exists(args.model):
+            parser.error(f"{args.model}: no such file")
+        seeds = list(range(args.seed, args.seed + args.games))
+        for row in evaluate(os.path.abspath(args.model), args.thresholds, seeds, args.depth, workers=args.workers):
+            print(row)
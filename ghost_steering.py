@@ -0,0 +1,66 @@
+"""
+Precomputed ghost steering tables.
+
+Ghost.get_valid_directions and Ghost.choose_direction_to_target used to redo
+the wrap-around, ghost-home and wall tests for the four directions at every
+ghost step. The tables below hold the result per cell, once for ghosts that may
+still enter the home and once for ghosts that may not:
+    - exits: legal directions in UP, DOWN, LEFT, RIGHT order (the order the
+      random frightened moves draw from);
+    - choices: for each current direction, the candidate moves left once the
+      reverse move is removed, as (direction, x, y) in tie-break order
+      UP > LEFT > DOWN > RIGHT. The first candidate with the smallest squared
+      distance to the target is the move the game has always picked.
+"""
+from compiled_map import DIRECTIONS, compile_map
+
+OPPOSITE = {"UP": "DOWN", "DOWN": "UP", "LEFT": "RIGHT", "RIGHT": "LEFT"}
+
+# Tie-break order between moves at the same distance from the target
+PRIORITY_ORDER = ("UP", "LEFT", "DOWN", "RIGHT")
+
+
+class GhostSteering:
+    def __init__(self, game_map, ghost_home_coords):
+        """
+        Args:
+            game_map: grid of the maze (only the walls are used)
+            ghost_home_coords: (x_min, x_max, y_min, y_max) of the ghost home
+        """
+        compiled = compile_map(game_map)
+        x_min, x_max, y_min, y_max = ghost_home_coords
+        home = {(x, y) for x in range(x_min, x_max + 1) for y in range(y_min, y_max + 1)}
+
+        # Index 0: the ghost may enter the home, index 1: it may not
+        self.exits = ({}, {})
+        self.choices = ({}, {})
+        for blocked in (False, True):
+            exits = self.exits[blocked]
+            choices = self.choices[blocked]
+            for cell in compiled.cells:
+                moves = {direction: nxt for direction, nxt in compiled.moves[cell]
+                         if not (blocked and nxt in home)}
+                valid = tuple(d for d in DIRECTIONS if d in moves)
+                exits[cell] = valid
+                for direction in DIRECTIONS + (None,):
+                    candidates = list(valid)
+                    opposite = OPPOSITE.get(direction)
+                    if opposite in candidates and len(candidates) > 1:
+                        candidates.remove(opposite)
+                    choices[(cell, direction)] = tuple(
+                        (d, moves[d][0], moves[d][1]) for d in PRIORITY_ORDER if d in candidates)
+
+    def valid_directions(self, cell, blocked):
+        """Legal directions from `cell`, as a new list in UP, DOWN, LEFT, RIGHT order."""
+        return list(self.exits[blocked][cell])
+
+    def choose(self, cell, direction, blocked, target_x, target_y):
+        """Non-reversing move from `cell` closest to the target, or None if there is none."""
+        best_direction = None
+        min_distance = None
+        for candidate, x, y in self.choices[blocked][(cell, direction)]:
+            distance = (x - target_x) * (x - target_x) + (y - target_y) * (y - target_y)
+            if min_distance is None or distance < min_distance:
+                min_distance = distance
+                best_direction = candidate
+        return best_direction
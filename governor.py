@@ -0,0 +1,133 @@
+"""
+Adaptive search-depth governor.
+
+Records the latency of every AI decision and keeps the p95 over a sliding
+window. Between decisions it moves the engine one step along a ladder of
+(depth, ghost-model fidelity) settings, from cheapest to most expensive, so
+that the p95 latency stays under a target taken from the frame budget:
+    - p95 above the target: step down;
+    - p95 under `headroom` x target: step up.
+A cooldown of a few decisions after each change lets the window refill with
+latencies measured at the new setting.
+
+Every adjustment is logged (decision, frame, p95, old and new setting) in
+`adjustments`; report() returns that log with the final setting, and a
+governed game stores it in its result so its depth changes can be explained
+afterwards.
+"""
+from collections import deque
+
+# 30 FPS game loop
+FRAME_BUDGET_MS = 1000.0 / 30
+
+FIDELITIES = ("limited", "full")
+
+
+class DepthGovernor:
+    def __init__(self, engine, target_ms=FRAME_BUDGET_MS * 0.6, window=40, percentile=0.95,
+                 min_depth=2, max_depth=6, headroom=0.5, cooldown=10,
+                 depth_attribute="depth", fidelity_attribute="ghost_fidelity"):
+        """
+        Args:
+            engine: Object (or module) whose search depth is governed
+            target_ms: p95 decision latency to hold
+            window: Number of decisions in the sliding window
+            percentile: Percentile compared to the target
+            min_depth, max_depth: Depth range
+            headroom: Step up only when p95 < headroom * target_ms
+            cooldown: Decisions to wait after a change before the next one
+            depth_attribute: Name of the depth attribute on `engine` (e.g. "DEPTH" for ai.py)
+            fidelity_attribute: Name of the ghost-model fidelity attribute, or None
+        """
+        self.engine = engine
+        self.target_ms = target_ms
+        self.percentile = percentile
+        self.headroom = headroom
+        self.cooldown = cooldown
+        self.depth_attribute = depth_attribute
+        self.fidelity_attribute = fidelity_attribute
+        self.latencies = deque(maxlen=window)
+        self.decisions = 0
+        self.adjustments = []  # One dict per change of setting (see _move)
+        self._wait = cooldown
+
+        fidelities = FIDELITIES if fidelity_attribute else (None,)
+        self.ladder = [(depth, fidelity)
+                       for depth in range(min_depth, max_depth + 1)
+                       for fidelity in fidelities]
+        current = (getattr(engine, depth_attribute),
+                   getattr(engine, fidelity_attribute) if fidelity_attribute else None)
+        self.level = self.ladder.index(current) if current in self.ladder else len(self.ladder) // 2
+        self._apply()
+
+    @property
+    def depth(self):
+        return self.ladder[self.level][0]
+
+    @property
+    def fidelity(self):
+        return self.ladder[self.level][1]
+
+    def p95(self):
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(self.percentile * len(ordered)))]
+
+    def record(self, latency_ms, frame=None):
+        """
+        Record one decision latency and adjust the setting if needed.
+
+        Args:
+            latency_ms: Latency of the decision
+            frame: Game frame of the decision, kept in the adjustment log
+        """
+        self.decisions += 1
+        self.latencies.append(latency_ms)
+        if self._wait > 0:
+            self._wait -= 1
+            return
+        p95 = self.p95()
+        if p95 > self.target_ms and self.level > 0:
+            self._move(-1, p95, frame)
+        elif p95 < self.headroom * self.target_ms and self.level < len(self.ladder) - 1:
+            self._move(+1, p95, frame)
+
+    def _move(self, step, p95, frame):
+        old_depth, old_fidelity = self.ladder[self.level]
+        self.level += step
+        self.adjustments.append({
+            "decision": self.decisions,
+            "frame": frame,
+            "p95_ms": round(p95, 2),
+            "old": {"depth": old_depth, "fidelity": old_fidelity},
+            "new": {"depth": self.depth, "fidelity": self.fidelity},
+        })
+        self.latencies.clear()
+        self._wait = self.cooldown
+        self._apply()
+
+    def _apply(self):
+        setattr(self.engine, self.depth_attribute, self.depth)
+        if self.fidelity_attribute:
+            setattr(self.engine, self.fidelity_attribute, self.fidelity)
+
+    def state(self):
+        """Current governor state, for traces and the HUD."""
+        return {
+            "depth": self.depth,
+            "fidelity": self.fidelity,
+            "p95_ms": round(self.p95(), 2),
+            "decisions": self.decisions,
+            "adjustments": len(self.adjustments),
+        }
+
+    def report(self):
+        """Final setting and adjustment log, for the game result."""
+        return {
+            "target_ms": round(self.target_ms, 2),
+            "depth": self.depth,
+            "fidelity": self.fidelity,
+            "decisions": self.decisions,
+            "adjustments": list(self.adjustments),
+        }
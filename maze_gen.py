@@ -0,0 +1,361 @@
+"""
+Procedural Pacman mazes, for playing and benchmarking on other map sizes.
+
+generate_maze() carves a random spanning tree on the odd-coordinate lattice of
+the left half of the grid, mirrors it onto the right half and then reshapes it
+into a Pacman maze:
+    - a ghost home in the centre (same layout as the classic map: a door on
+      top, two rows of three cells inside) whose door opens on the corridors;
+    - extra openings so there is no dead end and the maze has loops;
+    - horizontal tunnels through the left and right borders;
+    - energizers near the corners, food on every other corridor cell.
+The result is symmetric about the centre column and every corridor cell is
+reachable from Pacman's start.
+
+Map encoding is the game's: 1 = wall, 0 = food, 2 = empty, 3 = energizer.
+"""
+import argparse
+import random
+from collections import deque
+
+WALL, FOOD, EMPTY, ENERGIZER = 1, 0, 2, 3
+
+MIN_SIZE = 15
+MAX_SIZE = 200
+
+GHOST_NAMES = ("BLINKY", "PINKY", "INKY", "CLYDE")
+
+
+class Maze:
+    """
+    A maze and everything the game needs to play on it.
+
+    Attributes:
+        grid: rows of cells in the game encoding
+        width, height: grid size
+        ghost_home: (x_min, x_max, y_min, y_max) of the ghost home
+        home_exit: cell just outside the home door
+        pacman_start: Pacman's start cell
+        ghost_starts: ghost name -> start cell inside the home
+        ghost_corners: ghost name -> scatter target
+        energizers: energizer cells
+    """
+
+    def __init__(self, grid, ghost_home, home_exit, pacman_start, ghost_starts):
+        self.grid = grid
+        self.height = len(grid)
+        self.width = len(grid[0])
+        self.ghost_home = ghost_home
+        self.home_exit = home_exit
+        self.pacman_start = pacman_start
+        self.ghost_starts = ghost_starts
+        self.ghost_corners = {
+            "BLINKY": (self.width - 2, 1),
+            "PINKY": (1, 1),
+            "INKY": (self.width - 2, self.height - 2),
+            "CLYDE": (1, self.height - 2),
+        }
+        self.energizers = [(x, y) for y, row in enumerate(grid)
+                           for x, cell in enumerate(row) if cell == ENERGIZER]
+
+    def home_cells(self):
+        x_min, x_max, y_min, y_max = self.ghost_home
+        return {(x, y) for x in range(x_min, x_max + 1) for y in range(y_min, y_max + 1)}
+
+    def text_rows(self):
+        """The maze as text rows ('#' wall, '.' corridor), the map format of ai.py."""
+        return ["".join("#" if cell == WALL else "." for cell in row) for row in self.grid]
+
+    def validate(self):
+        """Raise ValueError if the maze breaks one of the generator's guarantees."""
+        grid, home = self.grid, self.home_cells()
+        for row in grid:
+            if row != row[::-1]:
+                raise ValueError("maze is not symmetric")
+        open_cells = {(x, y) for y, row in enumerate(grid) for x, cell in enumerate(row) if cell != WALL}
+        reached = _reachable(grid, self.pacman_start, blocked=home)
+        outside = open_cells - home
+        if reached != outside:
+            raise ValueError(f"{len(outside - reached)} corridor cells unreachable from the start")
+        if not _reachable(grid, self.home_exit) >= home & open_cells:
+            raise ValueError("ghost home unreachable from its exit")
+        for cell in outside:
+            if len(_open_neighbours(grid, cell, home)) < 2:
+                raise ValueError(f"dead end at {cell}")
+        return self
+
+    def __str__(self):
+        symbols = {WALL: "#", FOOD: ".", EMPTY: " ", ENERGIZER: "o"}
+        return "\n".join("".join(symbols[cell] for cell in row) for row in self.grid)
+
+
+def _neighbours(grid, cell):
+    width, height = len(grid[0]), len(grid)
+    x, y = cell
+    for dx, dy in ((0, -1), (0, 1), (-1, 0), (1, 0)):
+        yield (x + dx) % width, (y + dy) % height
+
+
+def _open_neighbours(grid, cell, blocked=()):
+    return [(x, y) for x, y in _neighbours(grid, cell)
+            if grid[y][x] != WALL and (x, y) not in blocked]
+
+
+def _reachable(grid, start, blocked=()):
+    seen = {start}
+    queue = deque([start])
+    while queue:
+        for nxt in _open_neighbours(grid, queue.popleft(), blocked):
+            if nxt not in seen:
+                seen.add(nxt)
+                queue.append(nxt)
+    return seen
+
+
+def _set(grid, x, y, value):
+    """Set a cell and its mirror image."""
+    grid[y][x] = value
+    grid[y][len(grid[0]) - 1 - x] = value
+
+
+def _carve_tree(grid, rng, center, reserved):
+    """Random spanning tree (iterative DFS) over the lattice cells of the left half."""
+    height = len(grid)
+    lattice = {(x, y) for x in range(1, center + 1, 2) for y in range(1, height - 1, 2)
+               if (x, y) not in reserved}
+    start = min(lattice)
+    visited = {start}
+    grid[start[1]][start[0]] = FOOD
+    stack = [start]
+    while stack:
+        x, y = stack[-1]
+        options = [(x + dx, y + dy) for dx, dy in ((0, -2), (0, 2), (-2, 0), (2, 0))
+                   if (x + dx, y + dy) in lattice and (x + dx, y + dy) not in visited]
+        if not options:
+            stack.pop()
+            continue
+        nx, ny = rng.choice(options)
+        grid[(y + ny) // 2][(x + nx) // 2] = FOOD
+        grid[ny][nx] = FOOD
+        visited.add((nx, ny))
+        stack.append((nx, ny))
+    # Lattice cells cut off by the reserved area are opened too; _connect joins them
+    for x, y in lattice - visited:
+        grid[y][x] = FOOD
+
+
+def _stamp_home(grid, center, home_y):
+    """Ghost home (door on top, 3x2 inside, bottom wall) and the corridor out of its door."""
+    for y in range(home_y, home_y + 4):
+        for x in range(center - 2, center + 1):
+            _set(grid, x, y, WALL)
+    for y in range(home_y + 1, home_y + 3):
+        for x in range(center - 1, center + 1):
+            _set(grid, x, y, EMPTY)
+    grid[home_y][center] = EMPTY  # Door
+    grid[home_y - 1][center] = FOOD  # Exit
+    grid[home_y - 2][center] = FOOD
+
+
+def _openings(grid, cell, inner, home):
+    """Walls next to `cell` (not on the border) that would join it to another corridor cell."""
+    width, height = len(grid[0]), len(grid)
+    x, y = cell
+    for dx, dy in ((0, -1), (0, 1), (-1, 0), (1, 0)):
+        wx, wy, ox, oy = x + dx, y + dy, x + 2 * dx, y + 2 * dy
+        if (0 < wx < width - 1 and 0 < wy < height - 1 and 0 <= ox < width and 0 <= oy < height
+                and (wx, wy) in inner and grid[wy][wx] == WALL and grid[oy][ox] != WALL
+                and (ox, oy) not in home):
+            yield wx, wy
+
+
+def _connect(grid, rng, start, inner, home):
+    """Open walls until every corridor cell is reachable from `start`."""
+    while True:
+        reached = _reachable(grid, start, blocked=home)
+        cut_off = [(x, y) for y, row in enumerate(grid) for x, cell in enumerate(row)
+                   if cell != WALL and (x, y) not in home and (x, y) not in reached]
+        if not cut_off:
+            return
+        joins = [wall for cell in reached for wall in _openings(grid, cell, inner, home)
+                 if any(nxt not in reached and nxt not in home and grid[nxt[1]][nxt[0]] != WALL
+                        for nxt in _neighbours(grid, wall))]
+        if not joins:
+            raise ValueError("cannot connect the maze")
+        x, y = rng.choice(joins)
+        _set(grid, x, y, FOOD)
+
+
+def _remove_dead_ends(grid, rng, inner, home):
+    """Open a wall at every dead end of the left half (mirrored onto the right half)."""
+    center = len(grid[0]) // 2
+    changed = True
+    while changed:
+        changed = False
+        for y, row in enumerate(grid):
+            for x, cell in enumerate(row[:center + 1]):
+                if cell == WALL or (x, y) in home or len(_open_neighbours(grid, (x, y), home)) >= 2:
+                    continue
+                options = list(_openings(grid, (x, y), inner, home))
+                if not options:
+                    # Boxed in: open any inner wall next to it
+                    options = [(nx, ny) for nx, ny in _neighbours(grid, (x, y))
+                               if (nx, ny) in inner and grid[ny][nx] == WALL]
+                wx, wy = rng.choice(options)
+                _set(grid, wx, wy, FOOD)
+                changed = True
+
+
+def _nearest_open(grid, target, excluded, candidates=None):
+    """Corridor cell closest to `target` (Manhattan distance), among `candidates` if given."""
+    tx, ty = target
+    if candidates is None:
+        candidates = [(x, y) for y, row in enumerate(grid) for x in range(len(row))]
+    return min(((x, y) for x, y in candidates if grid[y][x] != WALL and (x, y) not in excluded),
+               key=lambda c: (abs(c[0] - tx) + abs(c[1] - ty), c[1], c[0]))
+
+
+def generate_maze(width, height, seed=None, energizers=4, tunnels=1, loops=0.1):
+    """
+    Generate a random symmetric Pacman maze.
+
+    Args:
+        width, height: grid size (MIN_SIZE to MAX_SIZE; an even size is rounded down)
+        seed: random seed (same seed and size, same maze)
+        energizers: number of energizers (rounded up to an even number)
+        tunnels: number of horizontal wrap-around tunnels
+        loops: fraction of extra inner walls removed to add loops
+
+    Returns:
+        Maze (already validated)
+    """
+    if not (MIN_SIZE <= width <= MAX_SIZE and MIN_SIZE <= height <= MAX_SIZE):
+        raise ValueError(f"maze size must be between {MIN_SIZE} and {MAX_SIZE}")
+    # Odd sizes (the symmetry axis is a column); rounding down keeps MAX_SIZE
+    width -= 1 - width % 2
+    height -= 1 - height % 2
+    rng = random.Random(seed)
+    center = width // 2
+    home_y = (height // 2 - 2) | 1  # The door row is odd, like the lattice rows
+    home_x_min, home_x_max = center - 2, center + 2
+    home = {(x, y) for x in range(home_x_min, home_x_max + 1) for y in range(home_y, home_y + 3)}
+    reserved = {(x, y) for x in range(home_x_min, home_x_max + 1) for y in range(home_y, home_y + 4)}
+
+    grid = [[WALL] * width for _ in range(height)]
+    _carve_tree(grid, rng, center, reserved)
+    for row in grid:
+        row[center + 1:] = row[:center][::-1]
+    _stamp_home(grid, center, home_y)
+
+    # Walls that may be opened: left half (mirrored), not the border nor the home
+    inner = {(x, y) for x in range(1, center + 1) for y in range(1, height - 1)} - reserved
+
+    # Tunnels: open the border on a few rows and dig inwards to the first corridor
+    rows = [y for y in range(3, height - 3, 2) if not home_y <= y <= home_y + 3]
+    for y in rng.sample(rows, min(tunnels, len(rows))):
+        x = 0
+        while x < center and grid[y][x] == WALL:
+            _set(grid, x, y, FOOD)
+            x += 1
+
+    # Loops: open some of the walls between two lattice corridors
+    for x, y in sorted(inner):
+        if grid[y][x] != WALL or (x + y) % 2 == 0 or rng.random() >= loops:
+            continue
+        if (grid[y][x - 1] != WALL and grid[y][x + 1] != WALL) or \
+           (grid[y - 1][x] != WALL and grid[y + 1][x] != WALL):
+            _set(grid, x, y, FOOD)
+
+    # Pacman starts on the centre column below the home, like on the classic map (the
+    # start row is a lattice row, so the cell joins two corridors if it is not one)
+    pacman_start = (center, min(home_y + 8, height - 2))
+    grid[pacman_start[1]][center] = FOOD
+    _connect(grid, rng, pacman_start, inner, home)
+    _remove_dead_ends(grid, rng, inner, home)
+    _connect(grid, rng, pacman_start, inner, home)
+
+    # Energizers: mirrored pairs spread from top to bottom near the sides
+    pairs = (energizers + 1) // 2
+    taken = home | {pacman_start}
+    for i in range(pairs):
+        target_y = 3 + (height - 7) * i // (pairs - 1) if pairs > 1 else height // 2
+        x, y = _nearest_open(grid, (1, target_y), taken)
+        _set(grid, x, y, ENERGIZER)
+        taken |= {(x, y), (width - 1 - x, y)}
+
+    ghost_starts = {
+        "BLINKY": (center + 1, home_y + 1),
+        "PINKY": (center - 1, home_y + 1),
+        "INKY": (center + 1, home_y + 2),
+        "CLYDE": (center - 1, home_y + 2),
+    }
+    maze = Maze(grid, (home_x_min, home_x_max, home_y, home_y + 2), (center, home_y - 1),
+                pacman_start, ghost_starts)
+    return maze.validate()
+
+
+def parse_size(text):
+    """'41x45' -> (41, 45)"""
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def benchmark(maze, frames=3000, depth=3, seed=0, trace_memory=False):
+    """
+    Play an AI game on `maze` without a window, at a fixed search depth, for at
+    most `frames` frames. Returns the decision latencies (ms) and, with
+    trace_memory, the peak traced memory (tracemalloc slows the game down).
+    """
+    import tracemalloc
+    import PacMan
+    from frame_profiler import FrameProfiler
+    from pacman_ai import PacmanAI
+
+    PacMan.load_maze(maze)
+    random.seed(seed)
+    session = PacMan.GameSession(PacmanAI(depth=depth), governed=False)
+    profiler = FrameProfiler(enabled=True)
+    if trace_memory:
+        tracemalloc.start()
+    while not session.over and session.frames < frames:
+        profiler.begin()
+        session.advance(profiler)
+        profiler.end()
+    peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    if trace_memory:
+        tracemalloc.stop()
+    latencies = sorted(row["decision_ms"] for row in profiler.frames if "decision_ms" in row)
+
+    def percentile(p):
+        return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 2) if latencies else None
+
+    return {
+        "size": f"{maze.width}x{maze.height}",
+        "cells": sum(row.count(FOOD) + row.count(EMPTY) + row.count(ENERGIZER) for row in maze.grid),
+        "frames": session.frames,
+        "decisions": len(latencies),
+        "p50_ms": percentile(0.5),
+        "p95_ms": percentile(0.95),
+        "max_ms": latencies[-1] if latencies else None,
+        "peak_kb": round(peak / 1024) if peak is not None else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate Pacman mazes and benchmark the AI on them")
+    parser.add_argument("sizes", nargs="+", help="WIDTHxHEIGHT, e.g. 41x45")
+    parser.add_argument("--seed", type=int, default=None, help="maze seed")
+    parser.add_argument("--energizers", type=int, default=4)
+    parser.add_argument("--tunnels", type=int, default=1)
+    parser.add_argument("--bench", type=int, default=None, metavar="FRAMES",
+                        help="play an AI game of at most FRAMES frames on each maze and print the latencies")
+    parser.add_argument("--depth", type=int, default=3, help="search depth for --bench")
+    parser.add_argument("--memory", action="store_true", help="also trace the peak memory with --bench")
+    args = parser.parse_args()
+    for size in args.sizes:
+        maze = generate_maze(*parse_size(size), seed=args.seed,
+                             energizers=args.energizers, tunnels=args.tunnels)
+        if args.bench:
+            print(benchmark(maze, frames=args.bench, depth=args.depth, trace_memory=args.memory))
+        else:
+            print(maze)
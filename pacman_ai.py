@@ -1,27 +1,91 @@
 import math
 import random
 import copy
-from itertools import product
-from collections import deque
+from itertools import combinations, product
+from collections import deque, namedtuple
 import heapq
+from compiled_map import compile_map
+from distance_field import PelletField
+from ghost_model import DEFAULT_MODEL_PATH, load_model
+from danger_map import DangerMap
+from landmarks import landmark_heuristic
+from tablebase import DEFAULT_TABLE_PATH, GHOST_TO_MOVE, PACMAN_TO_MOVE, load_table
 
 # Directions possibles
 DIRECTIONS = ["UP", "DOWN", "LEFT", "RIGHT"]
 
+# Vitesses du jeu (images entre deux déclenchements, cf. PacMan.py)
+PACMAN_SPEED = 6
+GHOST_SPEED = 6
+FRIGHTENED_SPEED = 10  # Ghost.set_frightened
+EATEN_SPEED = 2  # Ghost.set_eaten
+
+# Nature des valeurs de la table de transposition (recherche alpha-beta)
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Image des directions par la symétrie gauche-droite du labyrinthe
+MIRRORED = {"UP": "UP", "DOWN": "DOWN", "LEFT": "RIGHT", "RIGHT": "LEFT", None: None}
+ZOBRIST_BITS = 64
+ZOBRIST_MASK = (1 << ZOBRIST_BITS) - 1
+
+# Bornes des valeurs de la recherche (mort de Pacman / victoire), pour l'élagage Star1/Star2
+SCORE_MIN = -10000
+SCORE_MAX = 10000
+
+class GhostState(namedtuple("GhostState", "grid_x grid_y direction frightened eaten mode name left_ghost_home "
+                                           "speed next_step")):
+    """
+    Instantané immuable (et hachable) d'un fantôme pour la simulation.
+    Un seul tuple par fantôme; les copies se partagent les instantanés inchangés.
+    
+    next_step est l'image (comptée depuis la décision) du prochain pas du fantôme:
+    dans le jeu, un fantôme choisit sa direction au bout de `speed` images puis
+    avance au bout de `speed` images de plus, soit un pas toutes les 2 * speed images.
+    """
+    __slots__ = ()
+    
+    @classmethod
+    def of(cls, ghost):
+        speed = getattr(ghost, 'speed', GHOST_SPEED)
+        next_step = max(1, speed - getattr(ghost, 'move_counter', 0))
+        if not getattr(ghost, 'moving', False):
+            next_step += speed  # Il doit d'abord choisir sa direction
+        return cls(ghost.grid_x, ghost.grid_y,
+                   ghost.direction if hasattr(ghost, 'direction') else "RIGHT",
+                   ghost.frightened, ghost.eaten, ghost.mode, ghost.name,
+                   getattr(ghost, 'left_ghost_home', True), speed, next_step)
+    
+    def moved(self, grid_x, grid_y, direction):
+        return GhostState(grid_x, grid_y, direction, self.frightened, self.eaten,
+                          self.mode, self.name, self.left_ghost_home,
+                          self.speed, self.next_step + 2 * self.speed)
+    
+    def scared(self):
+        return GhostState(self.grid_x, self.grid_y, self.direction, True, self.eaten,
+                          self.mode, self.name, self.left_ghost_home, FRIGHTENED_SPEED, self.next_step)
+    
+    def caught(self):
+        """Fantôme mangé par Pacman."""
+        return GhostState(self.grid_x, self.grid_y, self.direction, False, True,
+                          self.mode, self.name, self.left_ghost_home, EATEN_SPEED, self.next_step)
+
 class PacmanAI:
-    def __init__(self, depth=5, proximity_threshold=5):
+    def __init__(self, depth=5, proximity_threshold=5, escape_table=DEFAULT_TABLE_PATH,
+                 ghost_moves=DEFAULT_MODEL_PATH):
         """
         Initialise l'IA de Pacman avec une approche hybride.
         
         Args:
             depth: Profondeur maximale de l'arbre de recherche pour Alpha-Beta
             proximity_threshold: Distance à laquelle un fantôme est considéré comme proche
+            escape_table: Fichier de la table d'évasion (tablebase.py), None pour la désactiver
+            ghost_moves: Fichier du modèle appris des coups des fantômes (ghost_model.py), None pour le désactiver
         """
         self.depth = depth
         self.proximity_threshold = proximity_threshold
         self.last_direction = None
         self.nodes_explored = 0  # Pour le débogage
-        self.transposition_table = {}  # Table de transposition pour la mise en cache
+        self.transposition_table = {}  # Table de transposition de la décision en cours
         self.ghost_points = [200, 400, 800, 1600]
         self.current_mode = "A*"  # Mode par défaut
         self.last_distance = None
@@ -29,6 +93,73 @@ class PacmanAI:
         self.max_positions_memory = 10  # Nombre de positions à mémoriser
         self.direction_change_penalty = 50  # Pénalité pour changement de direction
         self.oscillation_penalty = 100  # Pénalité pour oscillation (va-et-vient)
+        # Détection des répétitions dans la recherche: un nœud de Pacman dont l'état
+        # (case, pastilles restantes) est déjà sur le chemin en cours ou dans l'historique
+        # récent de la partie n'est pas développé; il vaut son évaluation moins
+        # oscillation_penalty (revenir sur une case sans rien manger n'avance à rien)
+        self.repetition_detection = True
+        self.recent_states = deque(maxlen=self.max_positions_memory)  # Historique réel (anneau)
+        self._repetitions = {}  # Clé d'état -> occurrences (historique + chemin en cours)
+        self.repetition_cutoffs = 0  # Nœuds coupés comme répétitions
+        self.ghost_fidelity = "full"  # "limited": seuls les 2 fantômes dangereux les plus proches sont ramifiés
+        self.food_field = None  # Distance à la nourriture la plus proche (champ BFS)
+        self.energizer_field = None  # Distance à l'énergisant le plus proche
+        self.escape_table_path = escape_table
+        self.escape_table = None  # Chargée au premier appel (doit correspondre à la carte)
+        self.escape_table_checked = False
+        self.danger_map = None  # Temps d'arrivée des fantômes dangereux (recalculé à chaque décision)
+        self.danger_horizon = 8  # Pas de Pacman pendant lesquels les chemins A* évitent les cases menacées
+        self.race_prunes = 0  # Coups de Pacman élagués car perdus d'avance
+        # Recherche sur la chronologie réelle des déplacements (vitesses du jeu)
+        # plutôt qu'en alternant un pas de Pacman et un pas de chaque fantôme
+        # (horizon compté en pas des fantômes, voir _timeline_horizon)
+        self.timeline = True
+        self.pacman_period = PACMAN_SPEED  # Images entre deux pas de Pacman (mis à jour à chaque décision)
+        # Heuristique de A*: "alt" (repères + inégalité triangulaire, landmarks.py) ou "manhattan"
+        self.astar_heuristic = "alt"
+        self.landmark_count = 8
+        self.astar_expansions = 0  # Cases développées par A* (pour le débogage)
+        # Réutilisation de la recherche précédente: la table de la dernière décision
+        # alpha-beta est conservée (l'état réel est presque toujours un de ses nœuds)
+        self.reuse_tree = True
+        self.previous_table = {}
+        self.reuse_probes = 0  # Nœuds cherchés dans les tables
+        self.reuse_hits = 0  # ... trouvés dans la table de la décision précédente
+        self.table_cutoffs = 0  # Nœuds dont la valeur vient de la table
+        self.root_searches = 0  # Décisions alpha-beta
+        self.root_hits = 0  # ... dont l'état réel était un nœud de la recherche précédente
+        # "alphabeta": une recherche à pleine fenêtre à la profondeur `depth`
+        # "pvs": approfondissement itératif, recherche à variation principale (fenêtres
+        # nulles sur les coups qui suivent le premier) et fenêtres d'aspiration
+        self.search_mode = "alphabeta"
+        self.aspiration_window = 50  # Demi-largeur de la fenêtre d'aspiration (0: aucune)
+        self.pvs_researches = 0  # Recherches refaites après un échec de la fenêtre nulle
+        self.aspiration_fails = 0  # Itérations refaites à pleine fenêtre
+        # Modèle des fantômes effrayés: "minimax" (adversaires) ou "expectimax" (nœuds de
+        # hasard, déplacements équiprobables comme dans Ghost.move, élagage Star1/Star2)
+        self.ghost_model = "minimax"
+        self.star2 = True  # Sondage Star2 avant Star1 dans les nœuds de hasard
+        self.chance_cutoffs = 0  # Nœuds de hasard élagués par Star1/Star2
+        # Modèle appris des coups des fantômes (ghost_model.py): aux nœuds des fantômes,
+        # les coups joués moins souvent que ghost_move_threshold dans les parties
+        # enregistrées ne sont pas cherchés (0: tous les coups légaux)
+        self.ghost_moves_path = ghost_moves
+        self.ghost_moves = None  # Chargé au premier appel (doit correspondre à la carte)
+        self.ghost_moves_checked = False
+        self.ghost_move_threshold = 0.0
+        self.ghost_nodes = 0  # Nœuds des fantômes développés
+        self.ghost_replies = 0  # ... combinaisons de coups légales
+        self.ghost_replies_kept = 0  # ... combinaisons cherchées après le seuil
+        # Symétrie: sur un labyrinthe symétrique (murs et maison des fantômes), un état et
+        # son image miroir ont la même valeur et partagent une entrée de la table de
+        # transposition (clé canonique, meilleur coup retourné). Désactivée avec le modèle
+        # "limited", dont le départage (premier mouvement dans l'ordre DIRECTIONS)
+        # n'est pas symétrique, et avec l'élagage par le modèle appris (coins de
+        # dispersion et cibles propres à chaque fantôme).
+        self.symmetry = True
+        self._mirror_width = None  # Largeur du labyrinthe s'il est symétrique, sinon None
+        self._zobrist = {}  # (x, y, case) -> clé aléatoire de 64 bits (signature des pastilles)
+        self._zobrist_rng = random.Random(0)  # Ne consomme pas l'aléa du jeu
         
     def get_current_mode(self):
         """
@@ -38,6 +169,17 @@ class PacmanAI:
             return "α-β"
         return self.current_mode
     
+    def search_stats(self):
+        """
+        Statistiques de la dernière recherche alpha-beta et taux de réutilisation
+        de la table de la décision précédente (cumulé sur la partie).
+        """
+        return {
+            "nodes": self.nodes_explored,
+            "reuse_rate": round(self.reuse_hits / self.reuse_probes, 3) if self.reuse_probes else 0.0,
+            "root_reuse_rate": round(self.root_hits / self.root_searches, 3) if self.root_searches else 0.0,
+        }
+    
     def get_move(self, game_state):
         """
         Détermine le meilleur mouvement pour Pacman en utilisant une approche hybride:
@@ -59,12 +201,25 @@ class PacmanAI:
         game_map = game_state["game_map"]
         ghost_home_coords = game_state["ghost_home_coords"]
         
+        # Charger la table d'évasion une seule fois (ignorée si construite pour une autre carte)
+        if not self.escape_table_checked:
+            self.escape_table = load_table(self.escape_table_path, game_map)
+            self.escape_table_checked = True
+        if not self.ghost_moves_checked:
+            self.ghost_moves = load_model(self.ghost_moves_path, game_map)
+            self.ghost_moves_checked = True
+        
         # Mémoriser la position actuelle pour détecter les oscillations
         current_position = (pacman.grid_x, pacman.grid_y)
         self.previous_positions.append(current_position)
         if len(self.previous_positions) > self.max_positions_memory:
             self.previous_positions.pop(0)
         
+        # Carte de danger: arrivée au plus tôt des fantômes dangereux sur chaque case
+        self._update_danger_map(game_map, ghost_home_coords, ghosts)
+        if self.repetition_detection:
+            self._remember_state((pacman.grid_x, pacman.grid_y, self._food_key(game_map)))
+        
         # Vérifier si des fantômes dangereux sont à proximité
         dangerous_ghosts_nearby = self._are_dangerous_ghosts_nearby(
             pacman.grid_x, pacman.grid_y, ghosts, self.proximity_threshold
@@ -83,6 +238,8 @@ class PacmanAI:
     def _are_dangerous_ghosts_nearby(self, pacman_x, pacman_y, ghosts, threshold):
         """
         Vérifie si des fantômes dangereux (non effrayés et non mangés) sont à proximité.
+        Avec la carte de danger, la distance est le temps d'arrivée réel du fantôme
+        (murs et interdiction de faire demi-tour compris), sinon la distance de Manhattan.
         
         Args:
             pacman_x, pacman_y: Position de Pacman
@@ -92,6 +249,8 @@ class PacmanAI:
         Returns:
             True si au moins un fantôme dangereux est proche, False sinon
         """
+        if self.danger_map is not None:
+            return self.danger_map.arrival_at((pacman_x, pacman_y)) <= threshold
         for ghost in ghosts:
             if not ghost.frightened and not ghost.eaten:
                 distance = self._manhattan_distance(pacman_x, pacman_y, ghost.grid_x, ghost.grid_y)
@@ -99,6 +258,18 @@ class PacmanAI:
                     return True
         return False
     
+    def _update_danger_map(self, game_map, ghost_home_coords, ghosts):
+        compiled = compile_map(game_map)
+        if self.danger_map is None or self.danger_map.map is not compiled:
+            GHOST_HOME_X_MIN, GHOST_HOME_X_MAX, GHOST_HOME_Y_MIN, GHOST_HOME_Y_MAX = ghost_home_coords
+            home = {(x, y)
+                    for x in range(GHOST_HOME_X_MIN, GHOST_HOME_X_MAX + 1)
+                    for y in range(GHOST_HOME_Y_MIN, GHOST_HOME_Y_MAX + 1)}
+            self.danger_map = DangerMap(compiled, home)
+            symmetric = compiled.mirror_symmetric() and GHOST_HOME_X_MIN + GHOST_HOME_X_MAX == compiled.width - 1
+            self._mirror_width = compiled.width if symmetric else None
+        return self.danger_map.update(ghosts)
+    
     def _get_move_astar(self, game_state):
         """
         Utilise l'algorithme A* pour trouver le meilleur mouvement vers:
@@ -152,8 +323,12 @@ class PacmanAI:
                 elif game_map[y][x] == 3:  # Énergisant
                     energizer_positions.append((x, y))
         
+        # Mettre à jour les champs de distance (seules les zones des pastilles mangées sont recalculées)
+        self._sync_pellet_fields(game_map, ghost_home_coords, food_positions, energizer_positions)
+        
         # Définir la cible prioritaire
         target_positions = []
+        target_field = None
         
         # Priorité 1: Fantômes effrayés
         if frightened_ghosts:
@@ -161,9 +336,11 @@ class PacmanAI:
         # Priorité 2: Énergisants
         elif energizer_positions:
             target_positions = energizer_positions
+            target_field = self.energizer_field
         # Priorité 3: Nourriture normale
         elif food_positions:
             target_positions = food_positions
+            target_field = self.food_field
 
 
         
@@ -171,23 +348,30 @@ class PacmanAI:
             # Aucune cible trouvée, choisir un mouvement qui évite les oscillations
             return self._choose_non_oscillating_move(pacman, valid_moves)
         
-        # Trouver la cible la plus proche
+        # Trouver la cible la plus proche (distance réelle dans le labyrinthe via le champ)
         closest_target = None
-        min_distance = float('inf')
-        
-        for target_x, target_y in target_positions:
-            distance = self._manhattan_distance(pacman.grid_x, pacman.grid_y, target_x, target_y)
-            if distance < min_distance:
-                min_distance = distance
-                closest_target = (target_x, target_y)
-        
-        # Utiliser A* pour trouver le chemin vers la cible la plus proche
+        if target_field is not None:
+            _, closest_target = target_field.nearest((pacman.grid_x, pacman.grid_y))
+        
+        if closest_target is None:
+            min_distance = float('inf')
+            for target_x, target_y in target_positions:
+                distance = self._manhattan_distance(pacman.grid_x, pacman.grid_y, target_x, target_y)
+                if distance < min_distance:
+                    min_distance = distance
+                    closest_target = (target_x, target_y)
+        
+        # Utiliser A* pour trouver le chemin vers la cible la plus proche,
+        # en évitant les cases qu'un fantôme dangereux peut atteindre avant Pacman
         path = self._astar(
             (pacman.grid_x, pacman.grid_y),
             closest_target,
             game_map,
-            ghost_home_coords
+            ghost_home_coords,
+            self.danger_map
         )
+        if path is None:
+            path = self._astar((pacman.grid_x, pacman.grid_y), closest_target, game_map, ghost_home_coords)
         
         # Si un chemin est trouvé, retourner la première direction
         if path and len(path) > 1:
@@ -224,6 +408,24 @@ class PacmanAI:
         # Si aucun chemin n'est trouvé, choisir un mouvement qui évite les oscillations
         return self._choose_non_oscillating_move(pacman, valid_moves)
     
+    def _sync_pellet_fields(self, game_map, ghost_home_coords, food_positions, energizer_positions):
+        """
+        Met à jour les champs de distance vers la nourriture et les énergisants.
+        Les champs sont reconstruits si la carte change, sinon mis à jour de façon incrémentale.
+        """
+        compiled = compile_map(game_map)
+        GHOST_HOME_X_MIN, GHOST_HOME_X_MAX, GHOST_HOME_Y_MIN, GHOST_HOME_Y_MAX = ghost_home_coords
+        home = {(x, y)
+                for x in range(GHOST_HOME_X_MIN, GHOST_HOME_X_MAX + 1)
+                for y in range(GHOST_HOME_Y_MIN, GHOST_HOME_Y_MAX + 1)}
+        
+        if self.food_field is None or self.food_field.map is not compiled:
+            self.food_field = PelletField(compiled, food_positions, home)
+            self.energizer_field = PelletField(compiled, energizer_positions, home)
+        else:
+            self.food_field.sync(food_positions)
+            self.energizer_field.sync(energizer_positions)
+    
     def _choose_non_oscillating_move(self, pacman, valid_moves):
         """
         Choisit un mouvement qui évite les oscillations (va-et-vient).
@@ -249,7 +451,7 @@ class PacmanAI:
         self.last_direction = move
         return move
     
-    def _astar(self, start, goal, game_map, ghost_home_coords):
+    def _astar(self, start, goal, game_map, ghost_home_coords, danger_map=None):
         """
         Implémentation de l'algorithme A* pour trouver le chemin le plus court.
         
@@ -258,6 +460,8 @@ class PacmanAI:
             goal: Position d'arrivée (x, y)
             game_map: Carte du jeu
             ghost_home_coords: Coordonnées de la maison des fantômes
+            danger_map: Si fourni, une case atteinte au pas t <= danger_horizon est
+                interdite quand un fantôme dangereux peut y arriver en t pas ou moins
         
         Returns:
             Liste des positions formant le chemin le plus court, ou None si aucun chemin n'est trouvé
@@ -265,6 +469,7 @@ class PacmanAI:
         # Initialiser les structures de données
         open_set = []  # File de priorité (heapq)
         closed_set = set()  # Ensemble des nœuds déjà explorés
+        heuristic = self._astar_heuristic(game_map, start, goal)
         
         # Dictionnaire pour reconstruire le chemin
         came_from = {}
@@ -273,7 +478,7 @@ class PacmanAI:
         g_score = {start: 0}
         
         # Coût estimé total de départ à l'arrivée en passant par chaque nœud
-        f_score = {start: self._manhattan_distance(start[0], start[1], goal[0], goal[1])}
+        f_score = {start: heuristic(start)}
         
         # Ajouter le nœud de départ à la file de priorité
         heapq.heappush(open_set, (f_score[start], start))
@@ -281,6 +486,9 @@ class PacmanAI:
         while open_set:
             # Récupérer le nœud avec le score f le plus bas
             _, current = heapq.heappop(open_set)
+            if current in closed_set:
+                continue  # Entrée périmée (la case a été réinsérée avec un meilleur score)
+            self.astar_expansions += 1
             
             # Si on a atteint l'objectif, reconstruire le chemin
             if current == goal:
@@ -331,12 +539,18 @@ class PacmanAI:
                 # Calculer le nouveau score g
                 tentative_g_score = g_score[current] + 1
                 
-                # Si le voisin n'est pas dans la file de priorité ou si le nouveau chemin est meilleur
-                if neighbor not in [item[1] for item in open_set] or tentative_g_score < g_score.get(neighbor, float('inf')):
+                # Course perdue: un fantôme dangereux peut être sur cette case avant Pacman
+                if (danger_map is not None and tentative_g_score <= self.danger_horizon
+                        and danger_map.arrival_at(neighbor) <= tentative_g_score):
+                    continue
+                
+                # Si le voisin n'a pas encore de score ou si le nouveau chemin est meilleur
+                # (g_score ne contient que les cases déjà mises dans la file)
+                if tentative_g_score < g_score.get(neighbor, float('inf')):
                     # Mettre à jour le chemin
                     came_from[neighbor] = current
                     g_score[neighbor] = tentative_g_score
-                    f_score[neighbor] = tentative_g_score + self._manhattan_distance(next_x, next_y, goal[0], goal[1])
+                    f_score[neighbor] = tentative_g_score + heuristic(neighbor)
                     
                     # Ajouter le voisin à la file de priorité
                     heapq.heappush(open_set, (f_score[neighbor], neighbor))
@@ -355,7 +569,9 @@ class PacmanAI:
             Direction optimale ("UP", "DOWN", "LEFT", "RIGHT")
         """
         self.nodes_explored = 0
-        self.transposition_table = {}  # Réinitialiser la table de transposition
+        # Garder la table de la décision précédente, oublier les plus anciennes
+        self.previous_table = self.transposition_table if self.reuse_tree else {}
+        self.transposition_table = {}
         
         pacman = game_state["pacman"]
         ghosts = game_state["ghosts"]
@@ -374,33 +590,142 @@ class PacmanAI:
             self.last_direction = valid_moves[0]
             return valid_moves[0]
         
-        # Initialiser les valeurs pour alpha-beta
+        # Chronologie: image du premier pas de Pacman et période de ses pas
+        clock_base = None
+        if self.timeline:
+            speed = getattr(pacman, 'speed', PACMAN_SPEED)
+            first_step = max(1, speed - getattr(pacman, 'move_counter', 0))
+            clock_base = (first_step, speed)
+            self.pacman_period = speed
+        
+        # Cases où un fantôme dangereux se trouve ou peut aller au prochain coup
+        ghost_states = self._copy_ghosts(ghosts)
+        threatened = self._threatened_cells(ghost_states, clock_base[0] if clock_base else None)
+        
+        # Signature des pastilles restantes et meilleur coup trouvé pour cet état par
+        # la recherche précédente, essayé en premier (sur la chronologie, l'état réel
+        # peut être un nœud où des fantômes bougent avant Pacman)
+        food_key = self._food_key(game_map)
+        pacman_first = True
+        if clock_base is not None and ghost_states:
+            pacman_first = clock_base[0] <= min(ghost.next_step for ghost in ghost_states)
+        root_key, mirrored = self._state_key(pacman.grid_x, pacman.grid_y, ghost_states, food_key, 0,
+                                             pacman_first, clock_base[0] if clock_base else None)
+        entry = self.previous_table.get(root_key)
+        self.root_searches += 1
+        self.root_hits += entry is not None
+        if entry is not None:
+            hint = self._mirror_move(entry[3]) if mirrored else entry[3]
+            if hint in valid_moves:
+                valid_moves.remove(hint)
+                valid_moves.insert(0, hint)
+        
+        root = (pacman.grid_x, pacman.grid_y, direction, ghost_states, game_map, ghost_home_coords,
+                threatened, food_key, clock_base)
+        if self.search_mode == "pvs":
+            best_score, best_move = self._iterative_deepening(root, valid_moves)
+        else:
+            best_score, best_move = self._search_root(root, valid_moves, self.depth,
+                                                      float('-inf'), float('inf'))
+        
+        # Si aucun bon mouvement n'est trouvé, choisir un mouvement qui évite les oscillations
+        if best_move is None:
+            best_move = self._choose_non_oscillating_move(pacman, valid_moves)
+        
+        self.last_direction = best_move
+        return best_move
+    
+    def _iterative_deepening(self, root, moves):
+        """
+        Approfondissement itératif pour le mode "pvs": chaque itération ajoute un pas
+        de Pacman et la réponse des fantômes (profondeurs de même parité que self.depth).
+        Elle essaie d'abord le meilleur coup de la précédente (la table de transposition
+        ordonne les nœuds internes). À partir de la deuxième, la recherche se fait dans
+        une fenêtre d'aspiration centrée sur le score précédent; si le score en sort,
+        l'itération est refaite avec une fenêtre complète.
+        
+        Returns:
+            (meilleur score, meilleur mouvement) de la dernière itération
+        """
+        moves = list(moves)
+        score = None
+        best_move = None
+        for depth in range(self.depth % 2 or 2, self.depth + 1, 2):
+            window = self.aspiration_window
+            if score is not None and window and abs(score) < 10000 - window:
+                alpha, beta = score - window, score + window
+                best_score, best_move = self._search_root(root, moves, depth, alpha, beta)
+                if best_score <= alpha or best_score >= beta:
+                    self.aspiration_fails += 1
+                    best_score, best_move = self._search_root(root, moves, depth, float('-inf'), float('inf'))
+            else:
+                best_score, best_move = self._search_root(root, moves, depth, float('-inf'), float('inf'))
+            score = best_score
+            if best_move is not None:
+                moves.remove(best_move)
+                moves.insert(0, best_move)
+        return score, best_move
+    
+    def _search_root(self, root, moves, depth, alpha, beta):
+        """
+        Évalue les mouvements de Pacman à la racine pour une profondeur donnée.
+        
+        Args:
+            root: (x, y, direction de Pacman, fantômes, carte, maison des fantômes,
+                   cases menacées, signature des pastilles, chronologie (premier pas, période) ou None)
+            moves: Mouvements valides, dans l'ordre où les essayer
+            depth: Profondeur de la recherche
+            alpha, beta: Fenêtre de la recherche
+        
+        Returns:
+            (meilleur score, meilleur mouvement)
+        """
+        (pacman_x, pacman_y, direction, ghost_states, game_map, ghost_home_coords,
+         threatened, food_key, clock_base) = root
         best_score = float('-inf')
         best_move = None
-        alpha = float('-inf')
-        beta = float('inf')
+        pvs = self.search_mode == "pvs"
+        searched = False
+        
+        clock = None
+        if clock_base is not None:
+            first_step, period = clock_base
+            clock = (first_step, first_step + period,
+                     self._timeline_horizon(first_step, period, ghost_states, depth))
         
         # Évaluer chaque mouvement possible
-        for move in valid_moves:
-            # Créer des copies pour la simulation
-            game_map_copy = copy.deepcopy(game_map)
-            ghost_copies = self._copy_ghosts(ghosts)
-            
+        for move in moves:
             # Simuler le mouvement de Pacman
-            next_x, next_y = self._get_next_position(pacman.grid_x, pacman.grid_y, move)
+            next_x, next_y = self._get_next_position(pacman_x, pacman_y, move)
             
             # Gérer le tunnel
             if next_x < 0:
-                next_x = len(game_map_copy[0]) - 1
-            elif next_x >= len(game_map_copy[0]):
+                next_x = len(game_map[0]) - 1
+            elif next_x >= len(game_map[0]):
                 next_x = 0
             if next_y < 0:
-                next_y = len(game_map_copy) - 1
-            elif next_y >= len(game_map_copy):
+                next_y = len(game_map) - 1
+            elif next_y >= len(game_map):
                 next_y = 0
             
+            # Course perdue d'avance: un fantôme dangereux atteint la case au coup suivant
+            if (next_x, next_y) in threatened and game_map[next_y][next_x] != 3:
+                self.race_prunes += 1
+                if -10000 > best_score:
+                    best_score = -10000
+                    best_move = move
+                alpha = max(alpha, best_score)
+                continue
+            
+            # Créer des copies pour la simulation
+            game_map_copy = copy.deepcopy(game_map)
+            ghost_copies = self._copy_ghosts(ghost_states)
+            
             # Mettre à jour la carte (manger de la nourriture ou un énergisant)
             eaten_energizer = False
+            child_food_key = food_key
+            if game_map_copy[next_y][next_x] in (0, 3):
+                child_food_key ^= self._zobrist_key(next_x, next_y, game_map_copy[next_y][next_x])
             if game_map_copy[next_y][next_x] == 0:  # Nourriture
                 game_map_copy[next_y][next_x] = 2  # Marquer comme mangé
             elif game_map_copy[next_y][next_x] == 3:  # Énergisant
@@ -409,19 +734,21 @@ class PacmanAI:
             
             # Si un énergisant est mangé, effrayer tous les fantômes
             if eaten_energizer:
-                for ghost in ghost_copies:
+                for i, ghost in enumerate(ghost_copies):
                     if not ghost.eaten:
-                        ghost.frightened = True
+                        ghost_copies[i] = ghost.scared()
             
             # Vérifier les collisions avec les fantômes
+            # (chronologie: un fantôme qui bouge avant le pas de Pacman aura quitté sa case)
             pacman_died = False
             ghosts_eaten = 0
             
-            for ghost in ghost_copies:
+            for i, ghost in enumerate(ghost_copies):
+                if clock is not None and ghost.next_step < clock[0]:
+                    continue
                 if ghost.grid_x == next_x and ghost.grid_y == next_y:
                     if ghost.frightened:
-                        ghost.eaten = True
-                        ghost.frightened = False
+                        ghost_copies[i] = ghost.caught()
                         ghosts_eaten += 1
                     elif not ghost.eaten:
                         pacman_died = True
@@ -431,15 +758,22 @@ class PacmanAI:
             if pacman_died:
                 score = -10000
             else:
-                # Calculer le score pour ce mouvement
-                score = self._alpha_beta(next_x, next_y, ghost_copies, game_map_copy, ghost_home_coords, 
-                                        1, self.depth, alpha, beta, False, direction, move, ghosts_eaten)
-                
-                # Ajouter un bonus/pénalité pour la continuité de direction
-                if direction == move:
-                    # Bonus pour continuer dans la même direction
-                    score += 5
-                
+                # Bonus pour continuer dans la même direction (la fenêtre du sous-arbre
+                # en tient compte)
+                bonus = 5 if direction == move else 0
+                args = (next_x, next_y, ghost_copies, game_map_copy, ghost_home_coords,
+                        1, self._max_plies(depth))
+                rest = (False, direction, move, ghosts_eaten, clock, child_food_key)
+                if pvs and searched and alpha > float('-inf'):
+                    # Fenêtre nulle: ce mouvement fait-il mieux que le meilleur actuel?
+                    score = self._alpha_beta(*args, alpha - bonus, alpha - bonus + 1, *rest)
+                    if alpha - bonus < score < beta - bonus:
+                        self.pvs_researches += 1
+                        score = self._alpha_beta(*args, alpha - bonus, beta - bonus, *rest)
+                else:
+                    score = self._alpha_beta(*args, alpha - bonus, beta - bonus, *rest)
+                searched = True
+                score += bonus
             
             # Mettre à jour le meilleur mouvement
             if score > best_score:
@@ -448,41 +782,14 @@ class PacmanAI:
             
             # Mise à jour d'alpha
             alpha = max(alpha, best_score)
+            if best_score >= beta:
+                break
         
-        # Si aucun bon mouvement n'est trouvé, choisir un mouvement qui évite les oscillations
-        if best_move is None:
-            best_move = self._choose_non_oscillating_move(pacman, valid_moves)
-        
-        self.last_direction = best_move
-        return best_move
-    
-    def _is_oscillating(self, current_x, current_y, next_x, next_y):
-        """
-        Vérifie si le mouvement de (current_x, current_y) à (next_x, next_y) 
-        fait partie d'une oscillation (va-et-vient).
-        """
-        # Vérifier si on a au moins 3 positions précédentes
-        if len(self.previous_positions) < 3:
-            return False
-        
-        # Vérifier si la nouvelle position est identique à l'avant-dernière position
-        # (ce qui indiquerait un va-et-vient)
-        if len(self.previous_positions) >= 2 and (next_x, next_y) == self.previous_positions[-2]:
-            return True
-        
-        # Vérifier si on a visité cette position récemment (dans les 5 derniers mouvements)
-        recent_positions = self.previous_positions[-5:] if len(self.previous_positions) >= 5 else self.previous_positions
-        if (next_x, next_y) in recent_positions:
-            # Compter combien de fois on a visité cette position récemment
-            visit_count = recent_positions.count((next_x, next_y))
-            # Si on l'a visitée plus d'une fois, c'est probablement une oscillation
-            if visit_count >= 1:
-                return True
-        
-        return False
+        return best_score, best_move
     
     def _alpha_beta(self, pacman_x, pacman_y, ghosts, game_map, ghost_home_coords, 
-                   current_depth, max_depth, alpha, beta, is_max, pac_dir, last_move, ghosts_eaten=0):
+                   current_depth, max_depth, alpha, beta, is_max, pac_dir, last_move, ghosts_eaten=0,
+                   clock=None, food_key=None, probe=False):
         """
         Implémentation récursive de l'algorithme Alpha-Beta Pruning avec mise à jour de la carte.
         
@@ -498,21 +805,103 @@ class PacmanAI:
             pac_dir: Direction actuelle de Pacman
             last_move: Dernier mouvement effectué
             ghosts_eaten: Nombre de fantômes mangés dans cette séquence
+            clock: Chronologie (now, prochain pas de Pacman, horizon) ou None pour
+                alterner un pas de Pacman et un pas de tous les fantômes. Avec une
+                chronologie, is_max est déduit du prochain événement (Pacman ou les
+                fantômes dont c'est le tour) et la recherche s'arrête à l'horizon.
+            food_key: Signature des pastilles restantes (_food_key), None pour ne pas
+                utiliser la table de transposition
+            probe: Sondage Star2: à un nœud de Pacman, seul le premier coup est cherché
+                et le résultat n'est qu'une borne inférieure (SCORE_MIN aux nœuds des fantômes)
         
         Returns:
             Score évalué pour cet état
         """
         self.nodes_explored += 1
         
+        beyond_horizon = False
+        if clock is not None:
+            now, pacman_next, horizon = clock
+            ghost_next = min(ghost.next_step for ghost in ghosts) if ghosts else float('inf')
+            # À la même image, Pacman bouge avant les fantômes (ordre des mises à jour du jeu)
+            is_max = pacman_next <= ghost_next
+            now = pacman_next if is_max else ghost_next
+            beyond_horizon = 2 * now + (0 if is_max else 1) > horizon
+            # La table d'évasion suppose l'alternance d'un pas de Pacman et d'un pas
+            # des fantômes: elle n'est sondée que pour les fantômes dont le prochain pas
+            # tombe entre deux pas de Pacman
+            if is_max:
+                chasers = [ghost for ghost in ghosts if ghost.next_step < now + self.pacman_period]
+            else:
+                chasers = [ghost for ghost in ghosts
+                           if ghost.next_step == now and pacman_next <= now + 2 * ghost.speed]
+        else:
+            chasers = ghosts
+        # Capture forcée prouvée par la table d'évasion: inutile de chercher plus loin
+        capture_in = self._probe_escape_table(pacman_x, pacman_y, chasers,
+                                              PACMAN_TO_MOVE if is_max else GHOST_TO_MOVE)
+        if capture_in is not None:
+            return -10000 + capture_in
+        
+        # Répétition: Pacman revient sur une case sans avoir rien mangé depuis
+        repetition = None
+        if is_max and food_key is not None and self.repetition_detection:
+            repetition = (pacman_x, pacman_y, food_key)
+            if repetition in self._repetitions:
+                self.repetition_cutoffs += 1
+                return (self._evaluate_state(pacman_x, pacman_y, ghosts, game_map, ghosts_eaten, pac_dir, last_move)
+                        - self.oscillation_penalty)
+        # Une coupure de répétition dans le sous-arbre rend sa valeur dépendante du
+        # chemin et de l'historique réel: elle ne doit pas être réutilisée (voir _store)
+        cutoffs = self.repetition_cutoffs
+        
+        # Table de transposition: valeur déjà connue avec au moins autant de recherche
+        # restante, sinon meilleur coup de la recherche précédente (essayé en premier)
+        key = None
+        best_hint = None
+        mirrored = False
+        if food_key is not None:
+            key, mirrored = self._state_key(pacman_x, pacman_y, ghosts, food_key, ghosts_eaten, is_max,
+                                            pacman_next if clock is not None else None)
+            remaining = (max_depth - current_depth,)
+            if clock is not None:
+                remaining += (horizon - 2 * now - (0 if is_max else 1),)
+            entry = self._probe_table(key)
+            if entry is not None:
+                entry_remaining, flag, value, best_hint = entry
+                if all(e >= r for e, r in zip(entry_remaining, remaining)) and (
+                        flag == EXACT or (flag == LOWER and value >= beta) or (flag == UPPER and value <= alpha)):
+                    self.table_cutoffs += 1
+                    return value
+                if mirrored:
+                    best_hint = self._mirror_move(best_hint)
+            alpha_start, beta_start = alpha, beta
+        
         # Vérifier si l'état est terminal (profondeur max atteinte ou Pacman mort/victoire)
-        if current_depth >= max_depth or self._is_terminal_state(pacman_x, pacman_y, ghosts, game_map):
-            return self._evaluate_state(pacman_x, pacman_y, ghosts, game_map, ghosts_eaten, pac_dir, last_move)
+        if current_depth >= max_depth or beyond_horizon or self._is_terminal_state(pacman_x, pacman_y, ghosts, game_map):
+            value = self._evaluate_state(pacman_x, pacman_y, ghosts, game_map, ghosts_eaten, pac_dir, last_move)
+            if key is not None:
+                self.transposition_table[key] = (remaining, EXACT, value, None)
+            return value
+        
+        if probe and not is_max:
+            return SCORE_MIN
         
         if is_max:  # Tour de Pacman (maximiser)
             max_eval = float('-inf')
+            best_move = None
+            pvs = self.search_mode == "pvs"
+            searched = False
+            threatened = self._threatened_cells(ghosts, now if clock is not None else None)
+            child_clock = (now, now + self.pacman_period, horizon) if clock is not None else None
+            directions = DIRECTIONS
+            if best_hint in DIRECTIONS:
+                directions = [best_hint] + [d for d in DIRECTIONS if d != best_hint]
+            if repetition is not None:
+                self._repetitions[repetition] = self._repetitions.get(repetition, 0) + 1
             
             # Pour chaque mouvement possible de Pacman
-            for direction in DIRECTIONS:
+            for direction in directions:
                 next_x, next_y = self._get_next_position(pacman_x, pacman_y, direction)
                 
                 # Gérer le tunnel
@@ -539,6 +928,17 @@ class PacmanAI:
                 if is_entering_ghost_home:
                     continue  # Pacman ne peut pas entrer dans la maison des fantômes
                 
+                # Course perdue d'avance: capture certaine au coup des fantômes
+                if (next_x, next_y) in threatened and game_map[next_y][next_x] != 3:
+                    self.race_prunes += 1
+                    if -10000 > max_eval:
+                        max_eval = -10000
+                        best_move = direction
+                    alpha = max(alpha, max_eval)
+                    if beta <= alpha:
+                        break
+                    continue
+                
                 # Créer des copies pour la simulation
                 game_map_copy = copy.deepcopy(game_map)
                 ghost_copies = self._copy_ghosts(ghosts)
@@ -546,6 +946,9 @@ class PacmanAI:
                 
                 # Mettre à jour la carte (manger de la nourriture ou un énergisant)
                 eaten_energizer = False
+                child_food_key = food_key
+                if food_key is not None and game_map_copy[next_y][next_x] in (0, 3):
+                    child_food_key ^= self._zobrist_key(next_x, next_y, game_map_copy[next_y][next_x])
                 if game_map_copy[next_y][next_x] == 0:  # Nourriture
                     game_map_copy[next_y][next_x] = 2  # Marquer comme mangé
                 elif game_map_copy[next_y][next_x] == 3:  # Énergisant
@@ -554,18 +957,17 @@ class PacmanAI:
                 
                 # Si un énergisant est mangé, effrayer tous les fantômes
                 if eaten_energizer:
-                    for ghost in ghost_copies:
+                    for i, ghost in enumerate(ghost_copies):
                         if not ghost.eaten:
-                            ghost.frightened = True
+                            ghost_copies[i] = ghost.scared()
                 
                 # Vérifier les collisions avec les fantômes
                 pacman_died = False
                 
-                for ghost in ghost_copies:
+                for i, ghost in enumerate(ghost_copies):
                     if ghost.grid_x == next_x and ghost.grid_y == next_y:
                         if ghost.frightened:
-                            ghost.eaten = True
-                            ghost.frightened = False
+                            ghost_copies[i] = ghost.caught()
                             current_ghosts_eaten += 1
                         elif not ghost.eaten:
                             pacman_died = True
@@ -575,13 +977,28 @@ class PacmanAI:
                 if pacman_died:
                     eval_score = -10000
                 else:
-                    # Évaluer récursivement
-                    eval_score = self._alpha_beta(next_x, next_y, ghost_copies, game_map_copy, ghost_home_coords,
-                                                current_depth + 1, max_depth, alpha, beta, False, last_move, direction, current_ghosts_eaten)
+                    # Évaluer récursivement (PVS: fenêtre nulle après le premier coup,
+                    # recherche complète seulement s'il fait mieux)
+                    args = (next_x, next_y, ghost_copies, game_map_copy, ghost_home_coords,
+                            current_depth + 1, max_depth)
+                    rest = (False, last_move, direction, current_ghosts_eaten, child_clock, child_food_key)
+                    if pvs and searched and alpha > float('-inf'):
+                        eval_score = self._alpha_beta(*args, alpha, alpha + 1, *rest)
+                        if alpha < eval_score < beta:
+                            self.pvs_researches += 1
+                            eval_score = self._alpha_beta(*args, alpha, beta, *rest)
+                    else:
+                        eval_score = self._alpha_beta(*args, alpha, beta, *rest)
+                    searched = True
+                    if probe:
+                        max_eval = max(max_eval, eval_score)
+                        break
                     
 
                 
-                max_eval = max(max_eval, eval_score)
+                if eval_score > max_eval:
+                    max_eval = eval_score
+                    best_move = direction
                 
                 # Mise à jour d'alpha
                 alpha = max(alpha, max_eval)
@@ -590,6 +1007,11 @@ class PacmanAI:
                 if beta <= alpha:
                     break
             
+            if repetition is not None:
+                self._forget_state(repetition)
+            if not probe:
+                self._store(key, remaining, max_eval, alpha_start, beta_start, best_move, mirrored,
+                            self.repetition_cutoffs != cutoffs)
             return max_eval
         
         else:  # Tour des fantômes (minimiser)
@@ -600,20 +1022,33 @@ class PacmanAI:
             ghost_copies = self._copy_ghosts(ghosts)
             
             # 2. Générer toutes les combinaisons possibles de mouvements des fantômes
-            ghost_move_combinations = self._generate_ghost_move_combinations(ghost_copies, game_map, ghost_home_coords, pacman_x, pacman_y)
+            # (chronologie: seuls les fantômes dont c'est le tour bougent)
+            movers = None
+            if clock is not None:
+                movers = {i for i, ghost in enumerate(ghost_copies) if ghost.next_step == now}
+            ghost_move_combinations = self._generate_ghost_move_combinations(ghost_copies, game_map, ghost_home_coords, pacman_x, pacman_y,
+                                                                             movers)
+            best_moves = None
+            pvs = self.search_mode == "pvs"
+            searched = False
+            if best_hint in ghost_move_combinations:
+                ghost_move_combinations.remove(best_hint)
+                ghost_move_combinations.insert(0, best_hint)
             
-            # 3. Évaluer chaque combinaison
-            for ghost_moves in ghost_move_combinations:
-                # Créer des copies pour la simulation
-                game_map_copy = copy.deepcopy(game_map)
+            def child(ghost_moves, alpha, beta, probe=False):
+                """Valeur de l'état après cette combinaison de mouvements des fantômes."""
+                # Créer des copies pour la simulation (les fantômes ne modifient pas la
+                # carte: les nœuds de Pacman la copient avant d'y manger)
+                game_map_copy = game_map
                 current_ghost_copies = self._copy_ghosts(ghost_copies)
                 current_ghosts_eaten = ghosts_eaten
                 
                 # Appliquer cette combinaison de mouvements
-                pacman_died = False
-                
                 for i, (ghost, move) in enumerate(zip(current_ghost_copies, ghost_moves)):
                     if move is None:
+                        if movers is not None and i in movers:
+                            # Bloqué: le fantôme perd son tour
+                            current_ghost_copies[i] = ghost.moved(ghost.grid_x, ghost.grid_y, ghost.direction)
                         continue
                     
                     # Appliquer le mouvement
@@ -629,28 +1064,59 @@ class PacmanAI:
                     elif next_y >= len(game_map_copy):
                         next_y = 0
                     
-                    ghost.grid_x, ghost.grid_y = next_x, next_y
+                    ghost = current_ghost_copies[i] = ghost.moved(next_x, next_y, move)
                     
                     # Vérifier si Pacman est capturé ou si un fantôme est mangé
                     if pacman_x == next_x and pacman_y == next_y:
                         if ghost.frightened:
-                            ghost.eaten = True
-                            ghost.frightened = False
+                            current_ghost_copies[i] = ghost.caught()
                             current_ghosts_eaten += 1
                         elif not ghost.eaten:
-                            pacman_died = True
-                            break
+                            # Si Pacman est mort, c'est le pire scénario
+                            return -10000
                 
-                # Si Pacman est mort, c'est le pire scénario
-                if pacman_died:
-                    eval_score = -10000
+                # Évaluer récursivement cet état
+                return self._alpha_beta(pacman_x, pacman_y, current_ghost_copies, game_map_copy, ghost_home_coords,
+                                        current_depth + 1, max_depth, alpha, beta, True, pac_dir, last_move,
+                                        current_ghosts_eaten, clock, food_key, probe)
+            
+            # Expectimax: les fantômes effrayés qui bougent jouent au hasard (nœud de
+            # hasard sous chaque combinaison des autres fantômes)
+            chance_moves = None
+            if self.ghost_model == "expectimax" and self.ghost_fidelity != "limited":
+                frightened = [i for i, ghost in enumerate(ghost_copies)
+                              if ghost.frightened and not ghost.eaten and (movers is None or i in movers)]
+                if frightened:
+                    move_lists = self._ghost_move_lists(ghost_copies, game_map, ghost_home_coords, movers,
+                                                        (pacman_x, pacman_y), count=False)
+                    chance_moves = list(product(*[moves if i in frightened else [None]
+                                                  for i, moves in enumerate(move_lists)]))
+                    ghost_move_combinations = list(product(*[[None] if i in frightened else moves
+                                                             for i, moves in enumerate(move_lists)]))
+                    if best_hint in ghost_move_combinations:
+                        ghost_move_combinations.remove(best_hint)
+                        ghost_move_combinations.insert(0, best_hint)
+            
+            # 3. Évaluer chaque combinaison
+            for ghost_moves in ghost_move_combinations:
+                if chance_moves is not None:
+                    outcomes = [tuple(move if move is not None else chance for move, chance in zip(ghost_moves, moves))
+                                for moves in chance_moves]
+                    eval_score = self._chance_node(outcomes, child, alpha, beta)
+                elif pvs and searched and beta < float('inf'):
+                    # PVS: fenêtre nulle sous beta après la première combinaison
+                    eval_score = child(ghost_moves, beta - 1, beta)
+                    if alpha < eval_score < beta:
+                        self.pvs_researches += 1
+                        eval_score = child(ghost_moves, alpha, beta)
                 else:
-                    # Évaluer récursivement cet état
-                    eval_score = self._alpha_beta(pacman_x, pacman_y, current_ghost_copies, game_map_copy, ghost_home_coords,
-                                                current_depth + 1, max_depth, alpha, beta, True, pac_dir, last_move, current_ghosts_eaten)
+                    eval_score = child(ghost_moves, alpha, beta)
+                searched = True
                 
                 # Mettre à jour le score minimal
-                min_eval = min(min_eval, eval_score)
+                if eval_score < min_eval:
+                    min_eval = eval_score
+                    best_moves = ghost_moves
                 
                 # Mise à jour de beta
                 beta = min(beta, min_eval)
@@ -659,8 +1125,228 @@ class PacmanAI:
                 if beta <= alpha:
                     break
             
+            self._store(key, remaining, min_eval, alpha_start, beta_start, best_moves, mirrored,
+                        self.repetition_cutoffs != cutoffs)
             return min_eval
     
+    def _chance_node(self, outcomes, child, alpha, beta):
+        """
+        Espérance de child(outcome, alpha, beta) sur des issues équiprobables, avec
+        l'élagage Star1: les valeurs étant bornées par SCORE_MIN et SCORE_MAX, les issues
+        déjà évaluées bornent l'espérance et chaque issue est cherchée dans la fenêtre
+        qui peut encore la faire sortir de (alpha, beta). Avec star2, un sondage (premier
+        coup de Pacman seulement) donne d'abord une borne inférieure de chaque issue.
+        
+        Returns:
+            L'espérance, ou une borne hors de (alpha, beta) en cas d'élagage
+        """
+        n = len(outcomes)
+        if n == 1:
+            return child(outcomes[0], alpha, beta)
+        p = 1.0 / n
+        lows = [SCORE_MIN] * n
+        if self.star2:
+            lows = [max(SCORE_MIN, child(outcome, SCORE_MIN, SCORE_MAX, True)) for outcome in outcomes]
+            if p * sum(lows) >= beta:
+                self.chance_cutoffs += 1
+                return p * sum(lows)
+        
+        total = 0.0
+        rest_low = p * sum(lows)
+        for i, outcome in enumerate(outcomes):
+            rest_low -= p * lows[i]
+            rest_high = p * SCORE_MAX * (n - i - 1)
+            child_alpha = max(SCORE_MIN, (alpha - total - rest_high) / p)
+            child_beta = min(SCORE_MAX, (beta - total - rest_low) / p)
+            total += p * child(outcome, child_alpha, child_beta)
+            if total + rest_high <= alpha:
+                self.chance_cutoffs += 1
+                return total + rest_high
+            if total + rest_low >= beta:
+                self.chance_cutoffs += 1
+                return total + rest_low
+        return total
+    
+    def _remember_state(self, state):
+        """Ajoute un état réel à l'historique; le plus ancien sort de l'anneau."""
+        if len(self.recent_states) == self.recent_states.maxlen:
+            self._forget_state(self.recent_states[0])
+        self.recent_states.append(state)
+        self._repetitions[state] = self._repetitions.get(state, 0) + 1
+    
+    def _forget_state(self, state):
+        count = self._repetitions[state] - 1
+        if count:
+            self._repetitions[state] = count
+        else:
+            del self._repetitions[state]
+    
+    def _food_key(self, game_map):
+        """Signature (Zobrist) des pastilles restantes de la carte."""
+        key = 0
+        for y, row in enumerate(game_map):
+            for x, cell in enumerate(row):
+                if cell == 0 or cell == 3:
+                    key ^= self._zobrist_key(x, y, cell)
+        return key
+    
+    def _zobrist_key(self, x, y, cell):
+        """
+        Clé d'une pastille. Sur un labyrinthe symétrique, les bits de poids fort portent
+        la clé de la case miroir: la signature de l'image miroir des pastilles s'obtient
+        en échangeant les deux moitiés.
+        """
+        key = self._zobrist_bits(x, y, cell)
+        if self._mirror_width is not None:
+            key |= self._zobrist_bits(self._mirror_width - 1 - x, y, cell) << ZOBRIST_BITS
+        return key
+    
+    def _zobrist_bits(self, x, y, cell):
+        key = self._zobrist.get((x, y, cell))
+        if key is None:
+            key = self._zobrist[(x, y, cell)] = self._zobrist_rng.getrandbits(ZOBRIST_BITS)
+        return key
+    
+    def _state_key(self, pacman_x, pacman_y, ghosts, food_key, ghosts_eaten, is_max, pacman_next=None):
+        """
+        Clé d'un nœud, indépendante de la décision: sur la chronologie, les prochains
+        pas des fantômes sont comptés depuis le prochain pas de Pacman.
+        
+        Returns:
+            (clé, miroir): avec la symétrie, la clé canonique est la plus petite de celle
+            de l'état et de celle de son image miroir; miroir indique que c'est l'image
+            (les coups de la table sont alors à retourner avec MIRRORED)
+        """
+        if pacman_next is None:
+            ghost_key = tuple(ghost[:9] for ghost in ghosts)
+        else:
+            ghost_key = tuple(ghost[:9] + (ghost.next_step - pacman_next,) for ghost in ghosts)
+        key = (pacman_x, pacman_y, is_max, ghosts_eaten, food_key, ghost_key)
+        width = self._mirror_width
+        if width is None or not self.symmetry or self.ghost_fidelity == "limited" or self._pruning_ghost_moves():
+            return key, False
+        mirror_x = width - 1 - pacman_x
+        if pacman_x < mirror_x:
+            return key, False
+        mirrored_food = ((food_key & ZOBRIST_MASK) << ZOBRIST_BITS) | (food_key >> ZOBRIST_BITS)
+        mirrored_ghosts = tuple((width - 1 - g[0], g[1], MIRRORED[g[2]]) + g[3:] for g in ghost_key)
+        mirrored = (mirror_x, pacman_y, is_max, ghosts_eaten, mirrored_food, mirrored_ghosts)
+        # Sur l'axe, l'état peut être son propre miroir: la clé d'origine est alors gardée
+        if pacman_x > mirror_x or mirrored < key:
+            return mirrored, True
+        return key, False
+    
+    def _probe_table(self, key):
+        """Entrée de la décision en cours, sinon de la précédente."""
+        self.reuse_probes += 1
+        entry = self.transposition_table.get(key)
+        if entry is None:
+            entry = self.previous_table.get(key)
+            if entry is not None:
+                self.reuse_hits += 1
+        return entry
+    
+    def _store(self, key, remaining, value, alpha, beta, best, mirrored=False, path_dependent=False):
+        """
+        Enregistre un nœud dans la table de transposition. Si une coupure de répétition
+        a eu lieu dans son sous-arbre (path_dependent), sa valeur dépend du chemin et de
+        l'historique réel: seul le meilleur coup est gardé, pour l'ordre des coups (une
+        recherche restante négative ne permet jamais de réutiliser la valeur, y compris
+        depuis la table de la décision suivante).
+        """
+        if key is None:
+            return
+        if path_dependent:
+            remaining = tuple(-1 for _ in remaining)
+        if mirrored:
+            best = self._mirror_move(best)
+        if value <= alpha:
+            flag = UPPER
+        elif value >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.transposition_table[key] = (remaining, flag, value, best)
+    
+    def _mirror_move(self, move):
+        """Image miroir d'un coup de Pacman ou d'une combinaison de coups des fantômes."""
+        if isinstance(move, tuple):
+            return tuple(MIRRORED[direction] for direction in move)
+        return MIRRORED[move]
+    
+    def _threatened_cells(self, ghosts, now=None):
+        """
+        Cases occupées par un fantôme dangereux ou atteignables à son prochain coup.
+        Pacman qui y entre (sans énergisant) est capturé quelle que soit la suite.
+        
+        Avec la chronologie (now = image du pas de Pacman), le pas suivant d'un fantôme
+        ne compte que s'il a lieu avant le pas d'après de Pacman. À la racine, un
+        fantôme qui bouge avant le premier pas de Pacman compte aussi pour ce pas.
+        """
+        if self.danger_map is None:
+            return ()
+        if now is None:
+            return self.danger_map.threatened(ghosts)
+        movers = [ghost for ghost in ghosts if ghost.next_step < now + self.pacman_period]
+        return self.danger_map.threatened(ghosts, movers)
+    
+    def _timeline_horizon(self, first_step, period, ghosts, depth=None):
+        """
+        Horizon de la chronologie, équivalent à `depth` (défaut: self.depth) demi-coups
+        alternés, compté en pas des fantômes: depth // 2 pas du premier fantôme
+        dangereux à les faire (un pas toutes les 2 * speed images), suivis (profondeur
+        impaire) du pas suivant de Pacman. Un fantôme avançant deux fois moins vite que
+        Pacman, l'horizon compté en pas de Pacman ne voyait qu'un pas de fantôme sur
+        deux; il reste au moins celui-ci (autant de pas de Pacman qu'en alternance).
+        Les événements sont ordonnés par 2 * image (+1 pour les fantômes, qui bougent
+        après Pacman dans une même image).
+        """
+        depth = self.depth if depth is None else depth
+        pacman_steps = 1 + (depth - 1) // 2
+        if depth % 2:
+            horizon = 2 * (first_step + (pacman_steps - 1) * period)
+        else:
+            horizon = 2 * (first_step + pacman_steps * period) - 1
+        ghost_steps = depth // 2
+        hunters = [ghost for ghost in ghosts if not ghost.frightened and not ghost.eaten]
+        if not ghost_steps or not hunters:
+            return horizon
+        last = min(ghost.next_step + (ghost_steps - 1) * 2 * ghost.speed for ghost in hunters)
+        if depth % 2:
+            # Premier pas de Pacman après le dernier pas des fantômes
+            return max(horizon, 2 * (first_step + max(0, (last - first_step) // period + 1) * period))
+        return max(horizon, 2 * last + 1)
+    
+    def _max_plies(self, depth=None):
+        # Sur la chronologie, l'horizon borne la recherche; la limite de demi-coups n'est qu'un garde-fou
+        depth = self.depth if depth is None else depth
+        return depth * 4 if self.timeline else depth
+    
+    def _probe_escape_table(self, pacman_x, pacman_y, ghosts, turn):
+        """
+        Consulte la table d'évasion pour chaque fantôme dangereux et chaque paire.
+        
+        Returns:
+            Nombre de demi-coups avant une capture forcée, ou None si aucune n'est prouvée
+        """
+        if self.escape_table is None:
+            return None
+        
+        pacman = (pacman_x, pacman_y)
+        chasers = [((ghost.grid_x, ghost.grid_y), ghost.direction)
+                   for ghost in ghosts if not ghost.frightened and not ghost.eaten]
+        
+        capture_in = None
+        for cell, direction in chasers:
+            plies = self.escape_table.probe(pacman, cell, direction, turn)
+            if plies is not None and (capture_in is None or plies < capture_in):
+                capture_in = plies
+        for pair in combinations(chasers, 2):
+            plies = self.escape_table.probe_pair(pacman, pair, turn)
+            if plies is not None and (capture_in is None or plies < capture_in):
+                capture_in = plies
+        return capture_in
+    
     def _is_terminal_state(self, pacman_x, pacman_y, ghosts, game_map):
         """
         Vérifie si l'état est terminal (Pacman mort ou victoire).
@@ -732,7 +1418,7 @@ class PacmanAI:
         
         return score
     
-    def _generate_ghost_move_combinations(self, ghosts, game_map, ghost_home_coords, pacman_x, pacman_y):
+    def _generate_ghost_move_combinations(self, ghosts, game_map, ghost_home_coords, pacman_x, pacman_y, movers=None):
         """
         Génère toutes les combinaisons possibles de mouvements des fantômes,
         en considérant tous les mouvements valides comme aléatoires, peu importe leur état.
@@ -742,24 +1428,60 @@ class PacmanAI:
             game_map: Carte du jeu
             ghost_home_coords: Coordonnées de la maison des fantômes
             pacman_x, pacman_y: Position de Pacman
+            movers: Indices des fantômes qui bougent (None: tous)
     
         Returns:
             Liste de toutes les combinaisons possibles de mouvements (liste de tuples)
         """
-        ghost_valid_moves = []
+        ghost_valid_moves = self._ghost_move_lists(ghosts, game_map, ghost_home_coords, movers, (pacman_x, pacman_y))
     
-        for ghost in ghosts:
-            valid_moves = self._get_ghost_valid_moves(ghost, game_map, ghost_home_coords)
-            if not valid_moves:
-                ghost_valid_moves.append([None])  # Aucun mouvement possible
-            else:
-                ghost_valid_moves.append(valid_moves)
+        # Modèle réduit (gouverneur de profondeur): ne ramifier que les fantômes les plus proches
+        if self.ghost_fidelity == "limited":
+            return self._generate_limited_combinations(ghosts, ghost_valid_moves, pacman_x, pacman_y)
     
         # Générer le produit cartésien de tous les mouvements possibles
         List=list(product(*ghost_valid_moves))
         #print(len(List))
         return List
     
+    def _ghost_move_lists(self, ghosts, game_map, ghost_home_coords, movers=None, pacman=None, count=True):
+        """
+        Mouvements possibles de chaque fantôme ([None] s'il ne bouge pas), dans l'ordre
+        des fantômes. Avec la position de Pacman et le modèle appris, seuls les coups
+        assez probables sont gardés (count: compter le nœud dans ghost_nodes).
+        """
+        ghost_valid_moves = []
+        pruning = pacman is not None and self._pruning_ghost_moves()
+        replies = kept = 1
+    
+        for i, ghost in enumerate(ghosts):
+            if movers is not None and i not in movers:
+                ghost_valid_moves.append([None])  # Pas son tour
+                continue
+            valid_moves = self._get_ghost_valid_moves(ghost, game_map, ghost_home_coords)
+            if not valid_moves:
+                ghost_valid_moves.append([None])  # Aucun mouvement possible
+                continue
+            replies *= len(valid_moves)
+            if pruning:
+                GHOST_HOME_X_MIN, GHOST_HOME_X_MAX, GHOST_HOME_Y_MIN, GHOST_HOME_Y_MAX = ghost_home_coords
+                in_home = (GHOST_HOME_X_MIN <= ghost.grid_x <= GHOST_HOME_X_MAX and
+                           GHOST_HOME_Y_MIN <= ghost.grid_y <= GHOST_HOME_Y_MAX)
+                mode = "EATEN" if ghost.eaten else "FRIGHTENED" if ghost.frightened else ghost.mode
+                valid_moves = self.ghost_moves.likely_moves(ghost.name, mode, valid_moves,
+                                                            (ghost.grid_x, ghost.grid_y), pacman,
+                                                            self.ghost_move_threshold, in_home)
+            kept *= len(valid_moves)
+            ghost_valid_moves.append(valid_moves)
+        if pacman is not None and count:
+            self.ghost_nodes += 1
+            self.ghost_replies += replies
+            self.ghost_replies_kept += kept
+        return ghost_valid_moves
+    
+    def _pruning_ghost_moves(self):
+        return self.ghost_moves is not None and self.ghost_move_threshold > 0
+    
     def _generate_limited_combinations(self, ghosts, ghost_valid_moves, pacman_x, pacman_y):
         """
         Génère un nombre limité de combinaisons en se concentrant sur les fantômes les plus importants.
@@ -1052,6 +1774,20 @@ class PacmanAI:
             return x + 1, y
         return x, y
     
+    def _astar_heuristic(self, game_map, start, goal):
+        """
+        Heuristique de A* vers `goal`: bornes ALT (repères) sur la carte compilée,
+        ou distance de Manhattan (ignore murs et tunnels, développe beaucoup plus
+        de cases sur les grands labyrinthes).
+        """
+        if self.astar_heuristic == "alt":
+            # La carte de danger est compilée à chaque décision pour la carte courante
+            compiled = self.danger_map.map if self.danger_map is not None else compile_map(game_map)
+            if goal in compiled.index and start in compiled.index:
+                return landmark_heuristic(compiled, self.landmark_count).to(goal, start)
+        goal_x, goal_y = goal
+        return lambda cell: abs(cell[0] - goal_x) + abs(cell[1] - goal_y)
+    
     def _manhattan_distance(self, x1, y1, x2, y2):
         """
         Calcule la distance de Manhattan entre deux points.
@@ -1060,19 +1796,7 @@ class PacmanAI:
     
     def _copy_ghosts(self, ghosts):
         """
-        Crée une copie profonde des fantômes pour la simulation.
+        Copie des fantômes pour la simulation: une liste de GhostState.
+        Les instantanés étant immuables, seuls les vrais fantômes sont convertis.
         """
-        ghost_copies = []
-        for ghost in ghosts:
-            # Créer un nouvel objet fantôme avec les mêmes propriétés
-            ghost_copy = type('GhostCopy', (), {})()
-            ghost_copy.grid_x = ghost.grid_x
-            ghost_copy.grid_y = ghost.grid_y
-            ghost_copy.direction = ghost.direction if hasattr(ghost, 'direction') else "RIGHT"
-            ghost_copy.frightened = ghost.frightened
-            ghost_copy.eaten = ghost.eaten
-            ghost_copy.mode = ghost.mode
-            ghost_copy.name = ghost.name
-            ghost_copy.left_ghost_home = getattr(ghost, 'left_ghost_home', True)
-            ghost_copies.append(ghost_copy)
-        return ghost_copies
\ No newline at end of file
+        return [ghost if type(ghost) is GhostState else GhostState.of(ghost) for ghost in ghosts]
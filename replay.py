@@ -0,0 +1,241 @@
+"""
+Binary game replays: one fixed-size record per played frame.
+
+A replay file is a header followed by tick records, all little-endian:
+    header  magic b"PMRP", format version, header size, record size, ghost
+            count, seed (-1 if none), 16-byte hash of the wall layout
+            (compiled_map.map_key) and the engine configuration as JSON,
+            padded so the records start on an 8-byte boundary;
+    record  frame, score, AI decision latency (ms, NaN on frames without a
+            decision), Pacman cell, remaining food, Pacman direction, lives,
+            AI mode, search depth, ghost mode, status bits, then per ghost:
+            cell, direction, flag bits and mode.
+
+ReplayWriter packs a record per frame with struct and needs nothing outside
+the standard library. Replay maps a file with mmap and exposes the records as
+a NumPy structured array viewing the mapped bytes: a column such as
+replay.ticks["score"] or replay.ticks["ghosts"]["x"] is read straight from the
+page cache, without parsing or building Python objects per tick. NumPy is only
+needed to read replays.
+
+Every frame has its record, headless games included: when a game is recorded,
+GameSession.advance writes the idle frames it skips one by one, so
+ticks["frame"] counts up by one from record to record.
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+
+MAGIC = b"PMRP"
+VERSION = 1
+
+# magic, version, header size, record size, ghost count, seed, map hash, config length
+HEADER = struct.Struct("<4sHHHBxq16sI")
+
+# (name, struct code) of the record fields, in file order
+TICK_FIELDS = (
+    ("frame", "I"),
+    ("score", "i"),
+    ("decision_ms", "f"),
+    ("pacman_x", "H"),
+    ("pacman_y", "H"),
+    ("food", "H"),
+    ("pacman_dir", "B"),
+    ("lives", "B"),
+    ("ai_mode", "B"),
+    ("depth", "B"),
+    ("mode", "B"),
+    ("status", "B"),
+)
+GHOST_FIELDS = (
+    ("x", "H"),
+    ("y", "H"),
+    ("dir", "B"),
+    ("flags", "B"),
+    ("mode", "B"),
+    ("pad", "x"),
+)
+
+# Codes stored in the records (NONE: no direction / unknown AI mode)
+NONE = 255
+DIRECTION_CODES = {"UP": 0, "DOWN": 1, "LEFT": 2, "RIGHT": 3}
+MODE_CODES = {"SCATTER": 0, "CHASE": 1, "FRIGHTENED": 2}
+AI_MODE_CODES = {"A*": 0, "α-β": 1}
+
+# Status bits
+STATUS_AI = 1
+STATUS_MOVING = 2
+STATUS_WIN = 4
+STATUS_GAME_OVER = 8
+
+# Ghost flag bits
+GHOST_FRIGHTENED = 1
+GHOST_EATEN = 2
+GHOST_FLASHING = 4
+GHOST_LEFT_HOME = 8
+GHOST_MOVING = 16
+
+_NUMPY_CODES = {"I": "<u4", "i": "<i4", "f": "<f4", "H": "<u2", "B": "u1", "x": "u1"}
+
+
+def _record_format(ghost_count):
+    return "<" + "".join(code for _, code in TICK_FIELDS) + "".join(code for _, code in GHOST_FIELDS) * ghost_count
+
+
+def tick_dtype(ghost_count):
+    """NumPy dtype of one record, with the ghosts as a (ghost_count,) sub-array."""
+    import numpy
+
+    ghost = numpy.dtype([(name, _NUMPY_CODES[code]) for name, code in GHOST_FIELDS])
+    return numpy.dtype([(name, _NUMPY_CODES[code]) for name, code in TICK_FIELDS]
+                       + [("ghosts", ghost, (ghost_count,))])
+
+
+class ReplayWriter:
+    def __init__(self, path, ghost_count, map_hash, seed=None, config=None):
+        """
+        Args:
+            path: Replay file to create
+            ghost_count: Number of ghosts in every record
+            map_hash: Hex hash of the wall layout (compiled_map.map_key)
+            seed: Random seed of the game, None if unknown
+            config: Engine configuration (JSON-serializable dict)
+        """
+        self.path = path
+        self.ghost_count = ghost_count
+        self.record = struct.Struct(_record_format(ghost_count))
+        self.ticks = 0
+        blob = json.dumps(config or {}, sort_keys=True).encode()
+        header_size = -(-(HEADER.size + len(blob)) // 8) * 8
+        seed = -1 if seed is None else seed & 0x7FFFFFFFFFFFFFFF
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, VERSION, header_size, self.record.size, ghost_count,
+                                     seed, bytes.fromhex(map_hash), len(blob)))
+        self._file.write(blob.ljust(header_size - HEADER.size, b"\0"))
+
+    def write(self, session, decision_ms=None):
+        """Append the state of `session` (a PacMan.GameSession) after its current frame."""
+        pacman = session.pacman
+        ai = session.pacman_ai
+        status = ((STATUS_AI if session.use_ai else 0) | (STATUS_MOVING if pacman.moving else 0)
+                  | (STATUS_WIN if session.win else 0) | (STATUS_GAME_OVER if session.game_over else 0))
+        values = [
+            session.frames, pacman.score, float("nan") if decision_ms is None else decision_ms,
+            pacman.grid_x, pacman.grid_y, session.remaining_food,
+            DIRECTION_CODES.get(pacman.direction, NONE), pacman.lives,
+            AI_MODE_CODES.get(ai.get_current_mode(), NONE), min(ai.depth, NONE),
+            MODE_CODES[session.current_mode], status,
+        ]
+        for ghost in session.ghosts:
+            flags = ((GHOST_FRIGHTENED if ghost.frightened else 0) | (GHOST_EATEN if ghost.eaten else 0)
+                     | (GHOST_FLASHING if ghost.flashing else 0)
+                     | (GHOST_LEFT_HOME if ghost.left_ghost_home else 0)
+                     | (GHOST_MOVING if ghost.moving else 0))
+            values += (ghost.grid_x, ghost.grid_y, DIRECTION_CODES.get(ghost.direction, NONE),
+                       flags, MODE_CODES.get(ghost.mode, NONE))
+        self._file.write(self.record.pack(*values))
+        self.ticks += 1
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Replay:
+    def __init__(self, path):
+        """
+        Map the replay file at `path`. A record cut short at the end of the file
+        (a game that crashed while writing) is left out.
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mmap) < HEADER.size:
+            raise ValueError(f"{path}: not a replay file")
+        (magic, version, header_size, record_size, self.ghost_count, seed, map_hash,
+         config_length) = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not a replay file")
+        if version != VERSION:
+            raise ValueError(f"{path}: replay format version {version}, expected {VERSION}")
+        self.seed = None if seed == -1 else seed
+        self.map_hash = map_hash.hex()
+        self.config = json.loads(bytes(self._mmap[HEADER.size:HEADER.size + config_length]))
+
+        import numpy
+
+        dtype = tick_dtype(self.ghost_count)
+        if dtype.itemsize != record_size:
+            raise ValueError(f"{path}: record size {record_size}, expected {dtype.itemsize}")
+        count = (len(self._mmap) - header_size) // record_size
+        # Read-only view of the mapped records (no copy)
+        self.ticks = numpy.frombuffer(self._mmap, dtype=dtype, count=count, offset=header_size)
+
+    def __len__(self):
+        return len(self.ticks)
+
+    def decisions(self):
+        """Records of the frames where the AI chose a move."""
+        import numpy
+
+        return self.ticks[~numpy.isnan(self.ticks["decision_ms"])]
+
+    def close(self):
+        """
+        Unmap the file. Views taken from `ticks` keep the mapping alive: it is
+        then released when the last of them is garbage-collected.
+        """
+        self.ticks = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def summary(replay):
+    """Per-game figures computed on the mapped columns."""
+    import numpy
+
+    ticks = replay.ticks
+    decisions = replay.decisions()
+    result = {
+        "path": replay.path,
+        "seed": replay.seed,
+        "ticks": len(ticks),
+        "frames": int(ticks["frame"][-1]) + 1 if len(ticks) else 0,
+        "score": int(ticks["score"][-1]) if len(ticks) else 0,
+        "lives": int(ticks["lives"][-1]) if len(ticks) else 0,
+        "decisions": len(decisions),
+    }
+    for mode, code in AI_MODE_CODES.items():
+        latencies = decisions["decision_ms"][decisions["ai_mode"] == code]
+        if len(latencies):
+            p50, p95 = numpy.percentile(latencies, [50, 95])
+            result[mode] = {"decisions": len(latencies), "p50_ms": round(float(p50), 2),
+                            "p95_ms": round(float(p95), 2)}
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize Pacman replay files")
+    parser.add_argument("paths", nargs="+", help="replay files (PacMan.py --replay)")
+    args = parser.parse_args()
+    for path in args.paths:
+        if not os.path.exists(path):
+            parser.error(f"{path}: no such file")
+        with Replay(path) as replay:
+            print(summary(replay))
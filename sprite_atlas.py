@@ -0,0 +1,53 @@
+"""
+Sprite atlas: every sprite frame pre-rendered once into a single Surface.
+
+Frames are registered under hashable keys and laid out on a grid of
+cell_size x cell_size slots, plus a margin on the right and bottom edges for
+shapes that touch the far edge of their cell. Once every frame is drawn,
+finalize() converts the atlas to the display pixel format, so drawing a sprite
+is one blit of a sub-rectangle with no per-frame conversion or shape drawing.
+
+Only imported once a display exists (PacMan.init_display).
+"""
+import math
+
+import pygame
+
+
+class SpriteAtlas:
+    def __init__(self, cell_size, keys, margin=1):
+        """
+        Args:
+            cell_size: Width and height of one frame in pixels
+            keys: Keys of all the frames the atlas will hold
+            margin: Extra pixels kept after each frame (drawn with it)
+        """
+        keys = list(keys)
+        self.cell_size = cell_size
+        slot = cell_size + margin
+        columns = max(1, math.ceil(math.sqrt(len(keys))))
+        rows = max(1, math.ceil(len(keys) / columns))
+        self.rects = {
+            key: pygame.Rect((i % columns) * slot, (i // columns) * slot, slot, slot)
+            for i, key in enumerate(keys)
+        }
+        self.surface = pygame.Surface((columns * slot, rows * slot), pygame.SRCALPHA)
+        self.surface.fill((0, 0, 0, 0))
+
+    def origin(self, key):
+        """Top-left pixel of the slot of `key`, to draw the frame with primitives."""
+        return self.rects[key].topleft
+
+    def put_image(self, key, image):
+        """Scale `image` into the slot of `key`, copying its alpha unchanged."""
+        image = pygame.transform.scale(image, (self.cell_size, self.cell_size))
+        # The slot is fully transparent: MAX blending copies the pixels as they are
+        self.surface.blit(image, self.origin(key), special_flags=pygame.BLEND_RGBA_MAX)
+
+    def finalize(self):
+        """Convert the atlas to the display format (needs a display mode)."""
+        self.surface = self.surface.convert_alpha()
+        return self
+
+    def draw(self, target, key, position):
+        target.blit(self.surface, position, self.rects[key])
@@ -1,8 +1,7 @@
 import json
 import os
-import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.table import Table
+
+# pandas and matplotlib are imported on first use: loading the results does not need them
 
 def load_results(filepath="pacman_result.json"):
     if not os.path.exists(filepath):
@@ -17,12 +16,14 @@ def load_results(filepath="pacman_result.json"):
             return []
 
 def generate_dataframe(results):
+    import pandas as pd
     df = pd.DataFrame(results)
     df['timeout'] = df['time out'].astype(str) == 'true'
     df['partie'] = df.index + 1
     return df
 
 def plot_pie_chart(df):
+    import matplotlib.pyplot as plt
     result_counts = df['result'].value_counts()
     plt.figure(figsize=(5, 5))
     plt.pie(result_counts, labels=result_counts.index, autopct='%1.1f%%', startangle=90)
@@ -33,6 +34,8 @@ def plot_pie_chart(df):
 
 
 def show_summary_table(df):
+    import matplotlib.pyplot as plt
+    from matplotlib.table import Table
     total = len(df)
     wins = (df['result'] == 'win').sum()
     losses = (df['result'] == 'lose').sum()
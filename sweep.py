@@ -0,0 +1,210 @@
+"""
+Parameter sweep for PacmanAI: seeded headless games on a process pool, with
+successive halving.
+
+Configurations are sampled at random from a space of PacmanAI attributes.
+Every configuration plays a few seeded games; only the best 1/eta of them (win
+rate, then mean score) go on to the next round, where each survivor plays eta
+times more games. Weak configurations are dropped after a couple of games and
+the game budget goes to the promising ones. Every game is independent, so the
+(configuration, seed) pairs of a round are spread over a process pool.
+
+Games run with a fixed search depth (no DepthGovernor), on the classic map or
+on a generated maze. The report lists every configuration with the games it
+played and marks the Pareto front of win rate versus mean decision latency.
+Latencies are measured in the workers: with more workers than cores they are
+inflated by the contention.
+"""
+import argparse
+import functools
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+# Candidate values of the PacmanAI attributes that change how it plays
+SPACE = {
+    "depth": (2, 3, 4, 5),
+    "proximity_threshold": (3, 4, 5, 6, 8),
+    "danger_horizon": (0, 4, 8, 12),
+    "ghost_fidelity": ("limited", "full"),
+    "timeline": (True, False),
+    "oscillation_penalty": (0, 50, 100, 200),
+}
+
+MAX_FRAMES = 600 * 30  # PacMan.GAME_TIMEOUT_SECONDS at PacMan.FPS
+
+
+def sample_configs(space, count, rng):
+    """Up to `count` distinct configurations drawn at random from `space`."""
+    total = 1
+    for values in space.values():
+        total *= len(values)
+    configs = []
+    seen = set()
+    while len(configs) < min(count, total):
+        config = {name: rng.choice(values) for name, values in space.items()}
+        key = tuple(config.values())
+        if key not in seen:
+            seen.add(key)
+            configs.append(config)
+    return configs
+
+
+@functools.lru_cache(maxsize=None)
+def _generated_maze(width, height, seed):
+    from maze_gen import generate_maze
+    return generate_maze(width, height, seed=seed)
+
+
+def play_game(config, seed, max_frames=MAX_FRAMES, maze=None):
+    """
+    Play one headless game with a PacmanAI set up by `config` (attribute -> value).
+    maze: (width, height, maze seed) of a generated maze, None for the classic map.
+    """
+    import PacMan
+    from frame_profiler import FrameProfiler
+    from pacman_ai import PacmanAI
+
+    if maze is not None:
+        PacMan.load_maze(_generated_maze(*maze))
+    PacMan.restore_food()
+    random.seed(seed)
+    ai = PacmanAI(depth=config.get("depth", 3))
+    for name, value in config.items():
+        setattr(ai, name, value)
+    session = PacMan.GameSession(ai, governed=False)
+    profiler = FrameProfiler(enabled=True)
+    while not session.over and session.frames < max_frames:
+        profiler.begin()
+        session.advance(profiler)
+        profiler.end()
+    latencies = [row["decision_ms"] for row in profiler.frames if "decision_ms" in row]
+    return {
+        "win": session.win,
+        "score": session.pacman.score,
+        "lives": session.pacman.lives,
+        "frames": session.frames,
+        "decisions": len(latencies),
+        "decision_ms": sum(latencies),
+    }
+
+
+class Trial:
+    """One configuration and the games it has played so far."""
+
+    def __init__(self, config):
+        self.config = config
+        self.games = []
+
+    @property
+    def win_rate(self):
+        return sum(game["win"] for game in self.games) / len(self.games) if self.games else 0.0
+
+    @property
+    def mean_score(self):
+        return sum(game["score"] for game in self.games) / len(self.games) if self.games else 0.0
+
+    @property
+    def mean_ms(self):
+        decisions = sum(game["decisions"] for game in self.games)
+        return sum(game["decision_ms"] for game in self.games) / decisions if decisions else 0.0
+
+    def rank_key(self):
+        return (-self.win_rate, -self.mean_score, self.mean_ms)
+
+    def summary(self):
+        return {
+            **self.config,
+            "games": len(self.games),
+            "win_rate": round(self.win_rate, 3),
+            "mean_score": round(self.mean_score, 1),
+            "mean_ms": round(self.mean_ms, 3),
+        }
+
+
+def pareto_front(trials):
+    """Trials not dominated on (higher win rate, lower mean decision latency)."""
+    front = []
+    for trial in trials:
+        dominated = any(
+            other.win_rate >= trial.win_rate and other.mean_ms <= trial.mean_ms
+            and (other.win_rate > trial.win_rate or other.mean_ms < trial.mean_ms)
+            for other in trials)
+        if not dominated:
+            front.append(trial)
+    return sorted(front, key=lambda trial: trial.mean_ms)
+
+
+def successive_halving(configs, games=2, eta=2, workers=None, seed=0, max_frames=MAX_FRAMES,
+                       maze=None, log=print):
+    """
+    Run the sweep and return every Trial (best first).
+
+    Args:
+        configs: Configurations to try
+        games: Games per configuration in the first round
+        eta: Fraction of survivors (1/eta) and game multiplier per round
+        workers: Processes of the pool (default: one per core)
+        seed: First game seed; round r plays the next seeds in sequence
+        max_frames: Frame limit of a game
+        maze: (width, height, maze seed) of a generated maze, None for the classic map
+        log: Progress output
+    """
+    trials = [Trial(config) for config in configs]
+    alive = list(trials)
+    played = 0  # Seeds already used by the survivors
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        round_index = 0
+        while alive:
+            seeds = list(range(seed + played, seed + games))
+            futures = [(trial, pool.submit(play_game, trial.config, game_seed, max_frames, maze))
+                       for trial in alive for game_seed in seeds]
+            for trial, future in futures:
+                trial.games.append(future.result())
+            played = games
+            alive.sort(key=Trial.rank_key)
+            log(f"round {round_index}: {len(alive)} configs x {games} games, "
+                f"best {alive[0].summary()}")
+            if len(alive) == 1:
+                break
+            alive = alive[:max(1, len(alive) // eta)]
+            games *= eta
+            round_index += 1
+    return sorted(trials, key=lambda trial: (-len(trial.games), trial.rank_key()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep PacmanAI parameters with successive halving")
+    parser.add_argument("--configs", type=int, default=16, help="configurations sampled (default: 16)")
+    parser.add_argument("--games", type=int, default=2, help="games per configuration in the first round")
+    parser.add_argument("--eta", type=int, default=2, help="keep 1/eta configurations per round (default: 2)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the sampling and of the first game")
+    parser.add_argument("--max-frames", type=int, default=MAX_FRAMES, help="frame limit of a game")
+    parser.add_argument("--maze", default=None, metavar="WIDTHxHEIGHT", help="play on a generated maze")
+    parser.add_argument("--maze-seed", type=int, default=0, help="seed of the generated maze")
+    parser.add_argument("--out", default=None, help="write the report as JSON to this file")
+    args = parser.parse_args()
+    if args.eta < 2:
+        parser.error("--eta must be at least 2")
+
+    maze = None
+    if args.maze:
+        from maze_gen import parse_size
+        maze = (*parse_size(args.maze), args.maze_seed)
+    configs = sample_configs(SPACE, args.configs, random.Random(args.seed))
+    trials = successive_halving(configs, games=args.games, eta=args.eta, workers=args.workers,
+                                seed=args.seed, max_frames=args.max_frames, maze=maze)
+    front = pareto_front(trials)
+    print("Pareto front (win rate vs mean decision latency):")
+    for trial in front:
+        print("  ", trial.summary())
+    print("All configurations:")
+    for trial in trials:
+        print("  ", "*" if trial in front else " ", trial.summary())
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"front": [trial.summary() for trial in front],
+                       "trials": [trial.summary() for trial in trials]}, f, indent=4)
+        print(f"Report written to {os.path.abspath(args.out)}")
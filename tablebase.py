@@ -0,0 +1,352 @@
+"""
+Ghost-escape tablebase for one or two chasing ghosts.
+
+Offline generator and memory-mapped reader. For every (Pacman cell, ghost cells,
+ghost directions, side to move) of a region outside the ghost home, retrograde
+analysis decides whether the ghosts can force a capture and in how many plies,
+under the movement rules of the game: Pacman moves to any open cell outside the
+ghost home, a ghost cannot reverse (unless it has no other move) and cannot
+re-enter the home. Ghosts are modelled as perfect adversaries, so the tables
+only ever prove captures that no ghost targeting can avoid.
+
+The file holds:
+    - a one-ghost table over the whole maze;
+    - two-ghost tables over small overlapping windows of the maze. Inside a
+      window Pacman leaving the window counts as an escape and ghost moves out
+      of it are ignored, which keeps every proven capture sound.
+
+A capture forced by one ghost (or one pair) stays forced with more ghosts on the
+board, so the search can probe each chaser and each pair of chasers separately.
+
+To keep the file small, a ghost state is only indexed if it can happen: the
+ghost entered its cell moving in its direction, so the cell behind it is open
+(about 2.2 states per cell instead of 4). The two values of a position (Pacman
+or the ghosts to move) share one byte, as 4-bit values capped at 15. On the
+classic map the file holds the one-ghost table and 20 windows of 8x8 in
+3.1 MB (19.4 MB with a byte per value and 4 directions per cell).
+
+Usage:
+    python tablebase.py [output_path] [--window N]
+"""
+import argparse
+import mmap
+import os
+import struct
+from collections import deque
+from itertools import product
+
+from compiled_map import DIRECTIONS, compile_map
+
+DEFAULT_TABLE_PATH = "escape_table.bin"
+DEFAULT_WINDOW = 8
+
+MAGIC = b"PMESCAPE"
+VERSION = 2
+# magic, version, map key, width, height, home bounds, region count
+HEADER = struct.Struct("<8sH16sHHHHHHI")
+# ghosts in the region table, cell count
+REGION_HEADER = struct.Struct("<BI")
+
+OPPOSITE = {"UP": "DOWN", "DOWN": "UP", "LEFT": "RIGHT", "RIGHT": "LEFT"}
+DIR_INDEX = {d: i for i, d in enumerate(DIRECTIONS)}
+
+PACMAN_TO_MOVE = 0
+GHOST_TO_MOVE = 1
+
+# Value: 0 = Pacman escapes, k > 0 = capture in k - 1 plies (capped)
+ESCAPE = 0
+MAX_VALUE = 255
+# Stored 4-bit value: captures in more plies are stored as captures in 14 plies
+STORED_MAX = 15
+
+
+def _home_cells(ghost_home_coords):
+    x_min, x_max, y_min, y_max = ghost_home_coords
+    return {(x, y) for x in range(x_min, x_max + 1) for y in range(y_min, y_max + 1)}
+
+
+def _table_cells(compiled, ghost_home_coords):
+    home = _home_cells(ghost_home_coords)
+    return tuple(cell for cell in compiled.cells if cell not in home)
+
+
+def _moves(compiled, cells):
+    """Moves between table cells: cell -> list of (direction, next_cell)."""
+    inside = set(cells)
+    return {cell: [(d, nxt) for d, nxt in compiled.moves[cell] if nxt in inside]
+            for cell in cells}
+
+
+def _ghost_moves(moves, cell, direction):
+    """Ghost moves from `cell` having last moved in `direction` (no reversing)."""
+    options = moves[cell]
+    forward = [(d, nxt) for d, nxt in options if d != OPPOSITE[direction]]
+    return forward or options
+
+
+def _ghost_states(compiled, region):
+    """
+    (cell, direction) ghost states of `region` that can happen: the cell behind
+    the ghost (where it came from) is open. Returns the states in region then
+    DIRECTIONS order, and one bit mask of the directions per cell.
+    """
+    states = []
+    masks = []
+    for cell in region:
+        mask = 0
+        for i, direction in enumerate(DIRECTIONS):
+            if not compiled.is_wall(compiled.advance(cell, OPPOSITE[direction])):
+                states.append((cell, direction))
+                mask |= 1 << i
+        masks.append(mask)
+    return states, masks
+
+
+def _windows(cells, width, height, size):
+    """Overlapping size x size windows (stride size // 2), as sorted cell tuples."""
+    stride = max(1, size // 2)
+    xs = list(range(0, max(1, width - size) + 1, stride))
+    ys = list(range(0, max(1, height - size) + 1, stride))
+    if xs[-1] + size < width:
+        xs.append(width - size)
+    if ys[-1] + size < height:
+        ys.append(height - size)
+    seen = set()
+    for y0, x0 in product(ys, xs):
+        region = tuple(c for c in cells if x0 <= c[0] < x0 + size and y0 <= c[1] < y0 + size)
+        if len(region) >= 4 and region not in seen:
+            seen.add(region)
+            yield region
+
+
+def solve_region(moves, region, ghosts, states):
+    """
+    Retrograde analysis of the pursuit game restricted to `region`.
+
+    Args:
+        moves: full-maze move table (from _moves)
+        region: cells of the region
+        ghosts: number of chasing ghosts (1 or 2)
+        states: ghost states of the region (from _ghost_states)
+
+    Returns:
+        bytearray of values indexed by ((p * G + ghost_code) * 2 + turn), where
+        G = len(states) ** ghosts and ghost_code encodes the state index of each
+        ghost in base len(states).
+    """
+    n = len(region)
+    index = {cell: i for i, cell in enumerate(region)}
+    state_index = {state: i for i, state in enumerate(states)}
+    state_cell = [index[cell] for cell, _ in states]
+    base = len(states)
+    G = base ** ghosts
+
+    # Pacman moves inside the region (moves are symmetric, so also predecessors)
+    pac_next = [[index[nxt] for _, nxt in moves[cell] if nxt in index] for cell in region]
+    # Ghost predecessors: state -> states it can come from
+    ghost_from = {}
+    for state, (cell, direction) in enumerate(states):
+        for d, nxt in _ghost_moves(moves, cell, direction):
+            if nxt in index:
+                ghost_from.setdefault(state_index[(nxt, d)], []).append(state)
+
+    values = bytearray(n * G * 2)
+    # Pacman moves not yet proven losing; moves out of the region never are
+    remaining = bytearray(b"".join(bytes([len(moves[cell])]) * G for cell in region))
+
+    def ghost_cells(code):
+        cells = []
+        for _ in range(ghosts):
+            cells.append(state_cell[code % base])
+            code //= base
+        return cells
+
+    queue = deque()
+    for p in range(n):
+        for code in range(G):
+            if p in ghost_cells(code):
+                for turn in (PACMAN_TO_MOVE, GHOST_TO_MOVE):
+                    s = (p * G + code) * 2 + turn
+                    values[s] = 1
+                    queue.append(s)
+
+    while queue:
+        s = queue.popleft()
+        value = min(values[s] + 1, MAX_VALUE)
+        turn = s & 1
+        p, code = divmod(s >> 1, G)
+        if turn == GHOST_TO_MOVE:
+            # Pacman just moved to p: predecessors are Pacman-to-move states
+            occupied = ghost_cells(code)
+            for pp in pac_next[p]:
+                if pp in occupied:
+                    continue
+                r = pp * G + code
+                if values[r * 2 + PACMAN_TO_MOVE]:
+                    continue
+                remaining[r] -= 1
+                if remaining[r] == 0:
+                    values[r * 2 + PACMAN_TO_MOVE] = value
+                    queue.append(r * 2 + PACMAN_TO_MOVE)
+        else:
+            # The ghosts just moved: one joint ghost move is enough for them
+            parts = []
+            rest = code
+            for _ in range(ghosts):
+                parts.append(ghost_from.get(rest % base, ()))
+                rest //= base
+            for combo in product(*parts):
+                if any(state_cell[gd] == p for gd in combo):
+                    continue
+                prev = 0
+                for gd in reversed(combo):
+                    prev = prev * base + gd
+                r = (p * G + prev) * 2 + GHOST_TO_MOVE
+                if not values[r]:
+                    values[r] = value
+                    queue.append(r)
+
+    return values
+
+
+def _pack(values):
+    """Both turns of every position in one byte (low nibble: Pacman to move)."""
+    low = bytes(min(v, STORED_MAX) for v in range(256))
+    high = bytes(min(v, STORED_MAX) << 4 for v in range(256))
+    count = len(values) // 2
+    packed = (int.from_bytes(bytes(values[PACMAN_TO_MOVE::2]).translate(low), "little")
+              | int.from_bytes(bytes(values[GHOST_TO_MOVE::2]).translate(high), "little"))
+    return packed.to_bytes(count, "little")
+
+
+def write_table(path, game_map, ghost_home_coords, window=DEFAULT_WINDOW):
+    """Solve and write the one-ghost table and the two-ghost window tables."""
+    compiled = compile_map(game_map)
+    cells = _table_cells(compiled, ghost_home_coords)
+    moves = _moves(compiled, cells)
+    regions = [(1, cells)]
+    if window:
+        regions += [(2, region) for region in _windows(cells, compiled.width, compiled.height, window)]
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, bytes.fromhex(compiled.key),
+                            compiled.width, compiled.height, *ghost_home_coords, len(regions)))
+        for ghosts, region in regions:
+            f.write(REGION_HEADER.pack(ghosts, len(region)))
+            states, masks = _ghost_states(compiled, region)
+            f.write(struct.pack(f"<{2 * len(region)}H", *(v for cell in region for v in cell)))
+            f.write(bytes(masks))
+            f.write(_pack(solve_region(moves, region, ghosts, states)))
+    return regions
+
+
+class EscapeTable:
+    """Memory-mapped reader for a file written by write_table."""
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, key, width, height,
+         x_min, x_max, y_min, y_max, count) = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: not an escape table of version {VERSION} "
+                             f"(regenerate it with python tablebase.py)")
+        self.map_key = key.hex()
+        self.width = width
+        self.height = height
+        self.ghost_home_coords = (x_min, x_max, y_min, y_max)
+
+        # (ghosts, cell index, ghost state index, values offset) per region, and regions per cell
+        self.regions = []
+        self._regions_of = {}
+        offset = HEADER.size
+        for _ in range(count):
+            ghosts, n = REGION_HEADER.unpack_from(self._mmap, offset)
+            offset += REGION_HEADER.size
+            coords = struct.unpack_from(f"<{2 * n}H", self._mmap, offset)
+            offset += 4 * n
+            region = {(coords[2 * i], coords[2 * i + 1]): i for i in range(n)}
+            states = {}
+            for i, cell in enumerate(region):
+                mask = self._mmap[offset + i]
+                for d, direction in enumerate(DIRECTIONS):
+                    if mask >> d & 1:
+                        states[(cell, direction)] = len(states)
+            offset += n
+            self.regions.append((ghosts, region, states, offset))
+            if ghosts == 2:
+                for cell in region:
+                    self._regions_of.setdefault(cell, []).append(len(self.regions) - 1)
+            offset += n * len(states) ** ghosts
+
+    def matches(self, game_map):
+        """True if the table was built for the wall layout of `game_map`."""
+        return compile_map(game_map).key == self.map_key
+
+    def _value(self, region_id, pacman, ghosts, turn):
+        count, index, states, offset = self.regions[region_id]
+        base = len(states)
+        code = 0
+        for ghost in reversed(ghosts):
+            state = states.get(ghost)
+            if state is None:  # Direction it cannot have in that cell: not covered
+                return None
+            code = code * base + state
+        value = (self._mmap[offset + index[pacman] * base ** count + code] >> (4 * turn)) & 0xF
+        return None if value == ESCAPE else value - 1
+
+    def probe(self, pacman, ghost, ghost_direction, turn):
+        """
+        Plies until one ghost captures Pacman with perfect play, or None if Pacman
+        escapes or the position is not covered by the table.
+        """
+        count, index, _, _ = self.regions[0]
+        if pacman not in index or ghost not in index or ghost_direction not in DIR_INDEX:
+            return None
+        return self._value(0, pacman, ((ghost, ghost_direction),), turn)
+
+    def probe_pair(self, pacman, ghosts, turn):
+        """
+        Same as probe for two ghosts ((cell, direction), (cell, direction)), using
+        any window that contains Pacman and both ghosts.
+        """
+        if any(direction not in DIR_INDEX for _, direction in ghosts):
+            return None
+        best = None
+        for region_id in self._regions_of.get(pacman, ()):
+            index = self.regions[region_id][1]
+            if all(cell in index for cell, _ in ghosts):
+                value = self._value(region_id, pacman, ghosts, turn)
+                if value is not None and (best is None or value < best):
+                    best = value
+        return best
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
+
+
+def load_table(path, game_map):
+    """Open the table at `path` for `game_map`, or return None if missing or built for another map."""
+    if not path or not os.path.exists(path):
+        return None
+    table = EscapeTable(path)
+    if not table.matches(game_map):
+        table.close()
+        return None
+    return table
+
+
+if __name__ == "__main__":
+    from PacMan import game_map, GHOST_HOME_X_MIN, GHOST_HOME_X_MAX, GHOST_HOME_Y_MIN, GHOST_HOME_Y_MAX
+
+    parser = argparse.ArgumentParser(description="Generate the ghost-escape tablebase")
+    parser.add_argument("output", nargs="?", default=DEFAULT_TABLE_PATH)
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW,
+                        help="size of the two-ghost windows (0 = one-ghost table only)")
+    args = parser.parse_args()
+
+    regions = write_table(args.output, game_map,
+                          (GHOST_HOME_X_MIN, GHOST_HOME_X_MAX, GHOST_HOME_Y_MIN, GHOST_HOME_Y_MAX),
+                          args.window)
+    print(f"{len(regions)} tables written to {args.output} ({os.path.getsize(args.output)} bytes)")
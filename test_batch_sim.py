@@ -0,0 +1,103 @@
+"""
+BatchSim against GameSession, frame by frame.
+
+The batch simulator draws its random ghost moves from NumPy; here a subclass
+draws them with random.choice from a random.Random seeded like the game, in
+the same order as the game draws them, so one batch game and one GameSession
+must stay identical. The session plays the move the batch policy decided in
+the same frame; Pacman, the ghosts, the score and the lives are compared after
+every frame.
+"""
+import random
+
+import numpy
+import pytest
+
+import PacMan
+from batch_sim import DIRECTIONS, SCATTER, BatchSim, greedy_policy, random_policy
+from frame_profiler import FrameProfiler
+from maze_gen import generate_maze
+
+MAZE_GLOBALS = ("game_map", "_initial_map", "total_food", "GRID_WIDTH", "GRID_HEIGHT", "WIDTH", "HEIGHT",
+                "GHOST_HOME_X_MIN", "GHOST_HOME_X_MAX", "GHOST_HOME_Y_MIN", "GHOST_HOME_Y_MAX",
+                "GHOST_CORNERS", "PACMAN_START", "GHOST_STARTS", "HOME_EXIT", "_ghost_steering")
+
+
+class _PythonRandomSim(BatchSim):
+    """BatchSim drawing its random moves like the game (random.choice per row)."""
+
+    def __init__(self, seed):
+        self.py = random.Random(seed)
+        super().__init__(1, seed=seed)
+
+    def _pick(self, mask):
+        return numpy.array([self.py.choice(list(numpy.flatnonzero(row))) for row in mask], dtype=numpy.int64)
+
+
+class _ReplayAI:
+    """Plays the move the batch policy decided in the current frame."""
+
+    def __init__(self):
+        self.move = None
+
+    def get_move(self, state):
+        return self.move
+
+    def search_stats(self):
+        return {}
+
+
+def _session_state(session):
+    pacman = session.pacman
+    ghosts = [((ghost.grid_x, ghost.grid_y), ghost.direction, ghost.frightened, ghost.eaten,
+               ghost.speed, ghost.moving, ghost.mode) for ghost in session.ghosts]
+    return (pacman.grid_x, pacman.grid_y), pacman.score, pacman.lives, session.win, session.game_over, ghosts
+
+
+def _sim_state(sim):
+    cells = sim.compiled.cells
+    ghosts = [(cells[sim.ghost_cell[0, g]], DIRECTIONS[sim.ghost_direction[0, g]], bool(sim.frightened[0, g]),
+               bool(sim.eaten[0, g]), int(sim.ghost_speed[0, g]), bool(sim.ghost_moving[0, g]),
+               PacMan.SCATTER if sim.ghost_mode[0, g] == SCATTER else PacMan.CHASE)
+              for g in range(len(sim.names))]
+    return (cells[sim.pacman_cell[0]], int(sim.score[0]), int(sim.lives[0]), bool(sim.win[0]),
+            bool(sim.game_over[0]), ghosts)
+
+
+def _check_parity(seed, policy):
+    random.seed(seed)
+    PacMan.restore_food()
+    ai = _ReplayAI()
+    session = PacMan.GameSession(ai, governed=False)
+    sim = _PythonRandomSim(seed)
+    profiler = FrameProfiler(enabled=False)
+    decided = []
+
+    def recording_policy(sim, games):
+        moves = policy(sim, games)
+        decided.append(int(moves[0]))
+        return moves
+
+    while not (session.over or session.timed_out):
+        del decided[:]
+        sim.step(recording_policy)
+        ai.move = DIRECTIONS[decided[0]] if decided and decided[0] >= 0 else None
+        session.step(profiler)
+        assert _sim_state(sim) == _session_state(session), (seed, session.frames)
+    assert sim.over[0]
+    assert (bool(sim.win[0]), bool(sim.timed_out[0])) == (session.win, session.timed_out)
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+@pytest.mark.parametrize("policy", [greedy_policy, random_policy], ids=["greedy", "random"])
+def test_classic_map(seed, policy):
+    _check_parity(seed, policy)
+
+
+@pytest.mark.parametrize("policy", [greedy_policy, random_policy], ids=["greedy", "random"])
+def test_generated_maze(policy, monkeypatch):
+    # load_maze rebinds PacMan's map globals: monkeypatch puts them back for the other tests
+    for name in MAZE_GLOBALS:
+        monkeypatch.setattr(PacMan, name, getattr(PacMan, name))
+    PacMan.load_maze(generate_maze(23, 25, seed=3))
+    _check_parity(4, policy)
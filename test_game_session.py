@@ -0,0 +1,78 @@
+"""
+GameSession.advance() against GameSession.step(), frame by frame.
+
+advance() skips the frames where nothing happens and applies them at once with
+the actors' skip_frames(); the game must play out exactly as with one step()
+per frame. Each game is played twice from the same seed, first with step()
+(every frame kept), then with advance(): on every frame advance() plays, Pacman,
+the ghosts (positions, directions, counters, speeds, frightened and flash
+timers, modes), the mode timer, the score, the lives and result() must match.
+"""
+import random
+
+import pytest
+
+import PacMan
+from frame_profiler import FrameProfiler
+from pacman_ai import PacmanAI
+
+
+class _RandomAI:
+    """Seeded random moves: the same game whichever way the session is driven."""
+
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+
+    def get_move(self, game_state):
+        return self.rng.choice(("UP", "DOWN", "LEFT", "RIGHT"))
+
+    def search_stats(self):
+        return {}
+
+
+def _actor_state(actor):
+    return {name: value for name, value in vars(actor).items()
+            if value is None or isinstance(value, (bool, int, float, str, tuple))}
+
+
+def _state(session):
+    return (session.mode_timer, session.mode_index, session.current_mode, session.remaining_food,
+            session.win, session.game_over, _actor_state(session.pacman),
+            [_actor_state(ghost) for ghost in session.ghosts], session.result(session.timed_out))
+
+
+def _play(seed, make_ai, advance):
+    """States by frame number, plus the frightened expiries and mode changes seen."""
+    random.seed(seed)
+    PacMan.restore_food()
+    session = PacMan.GameSession(make_ai(seed), governed=False)
+    profiler = FrameProfiler(enabled=False)
+    play = session.advance if advance else session.step
+    states = {}
+    expiries = mode_changes = 0
+    while not (session.over or session.timed_out):
+        frightened = [ghost.frightened for ghost in session.ghosts]
+        mode_index = session.mode_index
+        play(profiler)
+        states[session.frames] = _state(session)
+        expiries += sum(was and not ghost.frightened and not ghost.eaten
+                        for was, ghost in zip(frightened, session.ghosts))
+        mode_changes += session.mode_index != mode_index
+    return states, expiries, mode_changes
+
+
+@pytest.mark.parametrize("seed, make_ai", [
+    (3, _RandomAI),
+    (4, _RandomAI),
+    (6, _RandomAI),
+    (1, lambda seed: PacmanAI(depth=3, escape_table=None)),
+], ids=["random-3", "random-4", "random-6", "pacman-ai-1"])
+def test_advance_matches_step(seed, make_ai):
+    stepped, expiries, mode_changes = _play(seed, make_ai, advance=False)
+    advanced, _, _ = _play(seed, make_ai, advance=True)
+    # The game covers the end of frightened mode and mode changes
+    assert expiries and mode_changes
+    assert len(advanced) < len(stepped)
+    for frame, state in advanced.items():
+        assert state == stepped[frame], frame
+    assert max(advanced) == max(stepped)
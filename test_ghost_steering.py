@@ -0,0 +1,117 @@
+"""
+The GhostSteering tables against the ghost steering they replaced.
+
+The reference functions below are Ghost.get_valid_directions and
+Ghost.choose_direction_to_target as they were before ghost_steering.py
+(wrap-around, ghost-home and wall tests per direction, Euclidean distance,
+priority_order.index tie-break). Every open cell, heading and home flag is
+checked against a grid of targets on and around the maze.
+"""
+import math
+import random
+
+import PacMan
+from ghost_steering import GhostSteering
+from maze_gen import generate_maze
+
+HEADINGS = ("UP", "DOWN", "LEFT", "RIGHT", None)
+OPPOSITE = {"UP": "DOWN", "DOWN": "UP", "LEFT": "RIGHT", "RIGHT": "LEFT"}
+
+
+def _reference_step(game_map, cell, direction):
+    width, height = len(game_map[0]), len(game_map)
+    next_x, next_y = cell
+    if direction == "UP":
+        next_y -= 1
+    elif direction == "DOWN":
+        next_y += 1
+    elif direction == "LEFT":
+        next_x -= 1
+    elif direction == "RIGHT":
+        next_x += 1
+    if next_x < 0:
+        next_x = width - 1
+    elif next_x >= width:
+        next_x = 0
+    if next_y < 0:
+        next_y = height - 1
+    elif next_y >= height:
+        next_y = 0
+    return next_x, next_y
+
+
+def _entering_home(ghost_home, cell):
+    x_min, x_max, y_min, y_max = ghost_home
+    return x_min <= cell[0] <= x_max and y_min <= cell[1] <= y_max
+
+
+def _reference_valid_directions(game_map, ghost_home, cell, blocked):
+    valid_directions = []
+    for direction in ["UP", "DOWN", "LEFT", "RIGHT"]:
+        next_x, next_y = _reference_step(game_map, cell, direction)
+        if blocked and _entering_home(ghost_home, (next_x, next_y)):
+            continue
+        if game_map[next_y][next_x] != 1:
+            valid_directions.append(direction)
+    return valid_directions
+
+
+def _reference_choose(game_map, ghost_home, cell, heading, blocked, target_x, target_y):
+    valid_directions = _reference_valid_directions(game_map, ghost_home, cell, blocked)
+    opposite = OPPOSITE.get(heading)
+    if opposite in valid_directions and len(valid_directions) > 1:
+        valid_directions.remove(opposite)
+    if not valid_directions:
+        return None
+    best_direction = None
+    min_distance = float('inf')
+    priority_order = ["UP", "LEFT", "DOWN", "RIGHT"]
+    for direction in valid_directions:
+        next_x, next_y = _reference_step(game_map, cell, direction)
+        if blocked and _entering_home(ghost_home, (next_x, next_y)):
+            continue
+        distance = math.sqrt((next_x - target_x)**2 + (next_y - target_y)**2)
+        if distance < min_distance or (distance == min_distance and priority_order.index(direction) < priority_order.index(best_direction)):
+            min_distance = distance
+            best_direction = direction
+    return best_direction
+
+
+def _targets(game_map, rng):
+    """Every third cell from 4 cells outside the maze, plus random targets further out."""
+    width, height = len(game_map[0]), len(game_map)
+    targets = [(x, y) for x in range(-4, width + 4, 3) for y in range(-4, height + 4, 3)]
+    targets += [(rng.randint(-12, width + 12), rng.randint(-12, height + 12)) for _ in range(40)]
+    return targets
+
+
+def _check_steering(game_map, ghost_home):
+    steering = GhostSteering(game_map, ghost_home)
+    targets = _targets(game_map, random.Random(0))
+    cells = [(x, y) for y, row in enumerate(game_map) for x, value in enumerate(row) if value != 1]
+    for cell in cells:
+        for blocked in (False, True):
+            assert (steering.valid_directions(cell, blocked)
+                    == _reference_valid_directions(game_map, ghost_home, cell, blocked)), (cell, blocked)
+            for heading in HEADINGS:
+                for target_x, target_y in targets:
+                    expected = _reference_choose(game_map, ghost_home, cell, heading, blocked, target_x, target_y)
+                    chosen = steering.choose(cell, heading, blocked, target_x, target_y)
+                    assert chosen == expected, (cell, heading, blocked, target_x, target_y)
+
+
+def test_classic_map():
+    _check_steering(PacMan._initial_map, (PacMan.GHOST_HOME_X_MIN, PacMan.GHOST_HOME_X_MAX,
+                                          PacMan.GHOST_HOME_Y_MIN, PacMan.GHOST_HOME_Y_MAX))
+
+
+def test_generated_maze():
+    maze = generate_maze(23, 25, seed=3)
+    _check_steering(maze.grid, maze.ghost_home)
+
+
+def test_clyde_range_squared():
+    # Clyde chases when farther than 8 cells: sqrt(d2) > 8 is d2 > 8 * 8 on integer offsets
+    for dx in range(-20, 21):
+        for dy in range(-20, 21):
+            assert (math.sqrt(dx**2 + dy**2) > 8) == (dx**2 + dy**2 > 8 * 8)
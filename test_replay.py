@@ -0,0 +1,50 @@
+"""
+Replays of headless games: one record per frame, the same as a game played
+with step() on every frame.
+"""
+import random
+
+import numpy
+
+import PacMan
+from frame_profiler import FrameProfiler
+from pacman_ai import PacmanAI
+from replay import Replay
+
+
+class _RandomAI(PacmanAI):
+    """PacmanAI playing seeded random moves (its settings fill the replay header)."""
+
+    def __init__(self, seed):
+        super().__init__(depth=3, escape_table=None)
+        self.rng = random.Random(seed)
+
+    def get_move(self, game_state):
+        return self.rng.choice(("UP", "DOWN", "LEFT", "RIGHT"))
+
+
+def _record(path, seed, advance):
+    random.seed(seed)
+    PacMan.restore_food()
+    session = PacMan.GameSession(_RandomAI(seed), governed=False)
+    session.record(str(path), seed=seed)
+    profiler = FrameProfiler(enabled=False)
+    play = session.advance if advance else session.step
+    while not (session.over or session.timed_out):
+        play(profiler)
+    session.close()
+    return session.frames
+
+
+def test_headless_replay_has_every_frame(tmp_path):
+    for seed in (3, 4):
+        frames = _record(tmp_path / "stepped.bin", seed, advance=False)
+        assert _record(tmp_path / "advanced.bin", seed, advance=True) == frames
+        with Replay(tmp_path / "stepped.bin") as stepped, Replay(tmp_path / "advanced.bin") as advanced:
+            assert numpy.array_equal(advanced.ticks["frame"], numpy.arange(frames))
+            # Decision latencies are wall-clock times: only the frames with a decision must match
+            latency = numpy.isnan(stepped.ticks["decision_ms"])
+            assert numpy.array_equal(latency, numpy.isnan(advanced.ticks["decision_ms"]))
+            for name in stepped.ticks.dtype.names:
+                if name != "decision_ms":
+                    assert numpy.array_equal(stepped.ticks[name], advanced.ticks[name]), name